@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from sqlmodel import select
+from ..core.database import get_async_session
+from ..core.activity import FEED_PAGE_SIZE, MAX_FEED_PAGE_SIZE, feed_page, serialize_events
+from ..models.project import Project
+from ..models.team_member import TeamMember
+from ..api.auth import get_current_user_id
+
+router = APIRouter()
+
+
+@router.get("/feed")
+async def get_feed(
+    before: Optional[int] = None,
+    limit: int = Query(FEED_PAGE_SIZE, ge=1, le=MAX_FEED_PAGE_SIZE),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    What happened in all of the user's teams, newest first. Pass the
+    returned `next_cursor` as `before` to get the next page.
+    """
+    async with get_async_session() as session:
+        stmt = select(Project.id, Project.title).join(TeamMember, TeamMember.project_id == Project.id).where(
+            TeamMember.user_id == user_id
+        )
+        titles = dict((await session.execute(stmt)).all())
+        events, next_cursor = await feed_page(session, list(titles), before, limit)
+        return {"items": await serialize_events(session, events, titles), "next_cursor": next_cursor}
+
+
+@router.get("/projects/{project_id}")
+async def get_project_activity(
+    project_id: int,
+    before: Optional[int] = None,
+    limit: int = Query(FEED_PAGE_SIZE, ge=1, le=MAX_FEED_PAGE_SIZE),
+    user_id: int = Depends(get_current_user_id)
+):
+    """One team's activity, newest first (members only)."""
+    async with get_async_session() as session:
+        stmt = select(Project.title).join(TeamMember, TeamMember.project_id == Project.id).where(
+            Project.id == project_id,
+            TeamMember.user_id == user_id
+        )
+        title = (await session.execute(stmt)).scalar_one_or_none()
+        if title is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        events, next_cursor = await feed_page(session, [project_id], before, limit)
+        return {"items": await serialize_events(session, events, {project_id: title}), "next_cursor": next_cursor}
@@ -1,39 +1,181 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
-import asyncio
-import os
+from sqlmodel import select
+from typing import Optional, List, Tuple
+from datetime import datetime
+import json
+
+from ..core.database import get_async_session
+from ..core.membership import is_member
+from ..core.ai import stream_mentor_reply
+from ..core.mentor import (
+    MAX_CONTEXT_TASKS,
+    MAX_MESSAGE_CHARS,
+    MAX_UNSUMMARIZED_MESSAGES,
+    build_prompt,
+    compact_history,
+    estimate_tokens,
+    format_project_context,
+)
+from ..models.mentor import MentorConversation, MentorMessage
+from ..models.project import Project
+from ..models.task import Task
+from ..api.auth import get_current_user_id
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
     message: str
+    conversation_id: Optional[int] = None
+    project_id: Optional[int] = None
     context: Optional[str] = None
-    history: Optional[List[dict]] = []
 
 class ChatResponse(BaseModel):
     response: str
+    conversation_id: int
+
+async def _prepare_turn(user_id: int, request: ChatRequest) -> Tuple[int, List[dict]]:
+    """
+    Store the user's message and build a bounded prompt for this turn.
+    Returns (conversation_id, messages).
+    """
+    content = request.message.strip()[:MAX_MESSAGE_CHARS]
+    if not content:
+        raise HTTPException(status_code=400, detail="Message is empty")
+
+    async with get_async_session() as session:
+        # 1. Load or start the conversation
+        if request.conversation_id:
+            conversation = await session.get(MentorConversation, request.conversation_id)
+            if not conversation or conversation.user_id != user_id:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+            if request.project_id and not conversation.project_id:
+                conversation.project_id = request.project_id
+        else:
+            conversation = MentorConversation(user_id=user_id, project_id=request.project_id)
+
+        # 2. Project context (owner or accepted member only)
+        project_context = None
+        if conversation.project_id:
+            project = await session.get(Project, conversation.project_id)
+            if not project:
+                raise HTTPException(status_code=404, detail="Project not found")
+            if project.owner_id != user_id:
+                if not await is_member(session, project.id, user_id):
+                    raise HTTPException(status_code=403, detail="Not a member of this project")
+            task_stmt = select(Task).where(Task.project_id == project.id).order_by(Task.order).limit(MAX_CONTEXT_TASKS)
+            tasks = (await session.execute(task_stmt)).scalars().all()
+            project_context = format_project_context(project, tasks)
+
+        conversation.updated_at = datetime.utcnow()
+        session.add(conversation)
+        await session.commit()
+        await session.refresh(conversation)
+        conversation_id = conversation.id
+        summary = conversation.summary
+        summarized_until = conversation.summarized_until
+
+        # 3. Store the user's message
+        session.add(MentorMessage(
+            conversation_id=conversation_id,
+            role="user",
+            content=content,
+            tokens=estimate_tokens(content)
+        ))
+        await session.commit()
+
+        # 4. Unsummarized history (bounded)
+        history_stmt = select(MentorMessage).where(
+            MentorMessage.conversation_id == conversation_id,
+            MentorMessage.id > summarized_until
+        ).order_by(MentorMessage.id.desc()).limit(MAX_UNSUMMARIZED_MESSAGES)
+        history = list(reversed((await session.execute(history_stmt)).scalars().all()))
+
+    # Summarize OUTSIDE of database session
+    compacted = await compact_history(summary, history)
+    if compacted:
+        summary, summarized_until, history = compacted
+        async with get_async_session() as session:
+            conversation = await session.get(MentorConversation, conversation_id)
+            conversation.summary = summary
+            conversation.summarized_until = summarized_until
+            session.add(conversation)
+            await session.commit()
+
+    return conversation_id, build_prompt(summary, project_context, request.context, history)
+
+async def _save_reply(conversation_id: int, content: str) -> int:
+    async with get_async_session() as session:
+        msg = MentorMessage(
+            conversation_id=conversation_id,
+            role="assistant",
+            content=content,
+            tokens=estimate_tokens(content)
+        )
+        session.add(msg)
+        await session.commit()
+        await session.refresh(msg)
+        return msg.id
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_with_mentor(request: ChatRequest):
-    """
-    Chat with the AI Mentor. 
-    Currently a mock implementation to verify frontend-backend connection.
-    """
-    
-    # Simulate network delay for realism
-    await asyncio.sleep(1)
-    
-    # Mock Response Logic
-    user_msg = request.message.lower()
-    
-    if "hello" in user_msg or "hi" in user_msg:
-        return {"response": "Hello! I'm your AI Mentor. I can help you with code reviews, debugging, or career advice. What are you working on today?"}
-    
-    if "code" in user_msg or "review" in user_msg:
-        return {"response": "I'd be happy to review your code! Please paste the snippet you'd like me to look at."}
-        
-    if "bug" in user_msg:
-        return {"response": "Debugging is part of the process! Tell me what error you're seeing or describe the unexpected behavior."}
-
-    return {"response": f"That's an interesting point about '{request.message}'. As an AI Mentor, I'd suggest breaking this down into smaller steps. Could you provide a bit more context?"}
+async def chat_with_mentor(request: ChatRequest, user_id: int = Depends(get_current_user_id)):
+    """
+    Chat with the AI Mentor. History is kept server-side per conversation;
+    clients only send the new message and `conversation_id`.
+    """
+    conversation_id, messages = await _prepare_turn(user_id, request)
+
+    parts = [delta async for delta in stream_mentor_reply(messages)]
+    reply = "".join(parts)
+    await _save_reply(conversation_id, reply)
+
+    return {"response": reply, "conversation_id": conversation_id}
+
+@router.post("/chat/stream")
+async def stream_chat_with_mentor(request: ChatRequest, user_id: int = Depends(get_current_user_id)):
+    """
+    Streaming variant of /chat. Emits newline-delimited JSON:
+    {"conversation_id": ...}, then {"delta": "..."} chunks, then {"done": true, "message_id": ...}.
+    """
+    conversation_id, messages = await _prepare_turn(user_id, request)
+
+    async def event_stream():
+        yield json.dumps({"conversation_id": conversation_id}) + "\n"
+        parts = []
+        async for delta in stream_mentor_reply(messages):
+            parts.append(delta)
+            yield json.dumps({"delta": delta}) + "\n"
+        message_id = await _save_reply(conversation_id, "".join(parts))
+        yield json.dumps({"done": True, "message_id": message_id}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@router.get("/conversations/{conversation_id}/messages")
+async def get_conversation_messages(conversation_id: int, limit: int = 50, before_id: Optional[int] = None, user_id: int = Depends(get_current_user_id)):
+    """
+    Return the most recent messages of a conversation (oldest first).
+    Page back with `before_id`.
+    """
+    limit = max(1, min(limit, 100))
+
+    async with get_async_session() as session:
+        conversation = await session.get(MentorConversation, conversation_id)
+        if not conversation or conversation.user_id != user_id:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        stmt = select(MentorMessage).where(MentorMessage.conversation_id == conversation_id)
+        if before_id:
+            stmt = stmt.where(MentorMessage.id < before_id)
+        stmt = stmt.order_by(MentorMessage.id.desc()).limit(limit)
+        messages = (await session.execute(stmt)).scalars().all()
+
+        return [
+            {
+                "id": m.id,
+                "role": m.role,
+                "content": m.content,
+                "created_at": m.created_at.isoformat()
+            }
+            for m in reversed(messages)
+        ]
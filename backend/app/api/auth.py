@@ -1,14 +1,23 @@
 import os
+import time
+import hashlib
 import secrets
-import httpx
-from fastapi import APIRouter, Depends, Request, Response, HTTPException, status, Cookie
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, Request, Response, HTTPException, status, Cookie, WebSocket
+from sqlmodel import Session, select, update
 from datetime import datetime, timedelta
 import jwt
-import bcrypt  # Native bcrypt usage
 
 from ..core.database import get_async_session
+from ..core import github
+from ..core.usage import set_usage_user
+from ..core.passwords import password_hasher, HasherBusy
+from ..core.cache import TTLCache
+from ..core.ratelimit import RateLimit, rate_limiter, limit_by_ip
+from ..core.revocation import revocation_list
+from ..core.matching import matching_index
+from ..core.profiles import load_profile, bump_profile_version
 from ..models.user import User
+from ..models.auth_token import RefreshToken
 from pydantic import BaseModel, EmailStr
 
 router = APIRouter()
@@ -28,38 +37,182 @@ class UserLogin(BaseModel):
 # ----------------------------------------------------------------------
 # Config
 # ----------------------------------------------------------------------
-GITHUB_CLIENT_ID = os.getenv("GITHUB_CLIENT_ID", "")
-GITHUB_CLIENT_SECRET = os.getenv("GITHUB_CLIENT_SECRET", "")
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-key")
 JWT_ALGORITHM = "HS256"
-JWT_EXPIRE_MINUTES = 60 * 24 * 30   # 30 days
+# Access tokens are short-lived; the refresh token (rotated on every use)
+# keeps the session alive
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# A rotated refresh token presented again within this window is treated as a
+# concurrent refresh (e.g. two tabs), not as theft
+REFRESH_REUSE_GRACE_SECONDS = 10
+COOKIE_SECURE = os.getenv("COOKIE_SECURE", "false").lower() == "true"
+
+# Brute-force protection: login attempts per client IP and per account,
+# sign-ups per client IP
+LOGIN_IP_LIMIT = RateLimit.from_env("LOGIN_RATE_LIMIT", "10/60")
+LOGIN_ACCOUNT_LIMIT = RateLimit.from_env("LOGIN_ACCOUNT_RATE_LIMIT", "10/900")
+REGISTER_LIMIT = RateLimit.from_env("REGISTER_RATE_LIMIT", "5/3600")
+
+# Verified tokens -> user id, and user snapshots, kept briefly in memory so
+# requests skip repeated HMAC verification and user lookups
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "300"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+_token_cache = TTLCache(maxsize=10_000, ttl=TOKEN_CACHE_TTL)
+_user_cache = TTLCache(maxsize=5_000, ttl=USER_CACHE_TTL)
 
 # ----------------------------------------------------------------------
 # Helpers
 # ----------------------------------------------------------------------
 def create_jwt_token(user_id: int) -> str:
-    expire = datetime.utcnow() + timedelta(minutes=JWT_EXPIRE_MINUTES)
-    payload = {"sub": str(user_id), "exp": expire}
+    now = datetime.utcnow()
+    payload = {
+        "sub": str(user_id),
+        "jti": secrets.token_urlsafe(12),
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def _decode_claims(token: str) -> tuple:
+    """(user_id, jti, issued_at, expires_at) of a valid access token."""
+    claims = _token_cache.get(token)
+    if claims is None:
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM], options={"require": ["exp", "iat", "jti"]})
+            claims = (int(payload["sub"]), payload["jti"], payload["iat"], payload["exp"])
+        except Exception:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        # Never cache past the token's own expiry
+        _token_cache.set(token, claims, ttl=min(TOKEN_CACHE_TTL, claims[3] - time.time()))
+    if revocation_list.is_revoked(claims[1], claims[0], claims[2]):
+        _token_cache.pop(token)
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return claims
+
 def decode_jwt_token(token: str) -> int:
+    user_id = _decode_claims(token)[0]
+    # Attribute AI usage made while serving this request
+    set_usage_user(user_id)
+    return user_id
+
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _new_refresh_token(user_id: int, family_id: str | None = None) -> tuple:
+    """Return (raw token, RefreshToken row); only the hash is stored."""
+    raw = secrets.token_urlsafe(32)
+    row = RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_refresh_token(raw),
+        family_id=family_id or secrets.token_urlsafe(12),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    return raw, row
+
+def _set_auth_cookies(response: Response, access_token: str, refresh_token: str):
+    response.set_cookie(
+        key="access_token",
+        value=access_token,
+        httponly=True,
+        max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        samesite="lax",
+        secure=COOKIE_SECURE
+    )
+    # Only sent to /auth/*, never with ordinary API calls
+    response.set_cookie(
+        key="refresh_token",
+        value=refresh_token,
+        httponly=True,
+        max_age=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
+        samesite="lax",
+        secure=COOKIE_SECURE,
+        path="/auth"
+    )
+
+def _clear_auth_cookies(response: Response):
+    response.delete_cookie("access_token")
+    response.delete_cookie("refresh_token", path="/auth")
+
+async def issue_tokens(response: Response, user_id: int):
+    """Start a new session: set a fresh access/refresh token pair as cookies."""
+    raw, row = _new_refresh_token(user_id)
+    async with get_async_session() as session:
+        session.add(row)
+        await session.commit()
+    _set_auth_cookies(response, create_jwt_token(user_id), raw)
+
+async def _revoke_family(session, family_id: str):
+    stmt = update(RefreshToken).where(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).values(revoked_at=datetime.utcnow())
+    await session.execute(stmt)
+
+async def get_current_user_id(access_token: str | None = Cookie(default=None)) -> int:
+    """
+    FastAPI dependency: the authenticated user's id from the access_token cookie.
+    """
+    if not access_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return decode_jwt_token(access_token)
+
+def websocket_user_id(websocket: WebSocket, token: str | None) -> int | None:
+    """User id from a `token` query param or the access_token cookie; None if invalid."""
+    token = token or websocket.cookies.get("access_token")
+    if not token:
+        return None
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return int(payload["sub"])
+        return decode_jwt_token(token)
     except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+        return None
+
+async def load_user_snapshot(user_id: int) -> User | None:
+    """
+    Read-only copy of a user, served from a short-lived cache.
+    Load the user in your own session if you need to modify it.
+    """
+    snapshot = _user_cache.get(user_id)
+    if snapshot is None:
+        async with get_async_session() as session:
+            user = await session.get(User, user_id)
+            if not user:
+                return None
+            snapshot = user.model_dump()
+        _user_cache.set(user_id, snapshot)
+    return User.model_validate(snapshot)
+
+async def get_current_user(user_id: int = Depends(get_current_user_id)) -> User:
+    """
+    FastAPI dependency: a read-only snapshot of the authenticated user.
+    """
+    user = await load_user_snapshot(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def invalidate_user_cache(user_id: int):
+    """Drop the cached snapshot after the user's profile changes."""
+    _user_cache.pop(user_id)
+    bump_profile_version(user_id)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please try again")
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please try again")
 
 # ----------------------------------------------------------------------
 # Local Auth Routes
 # ----------------------------------------------------------------------
 
-@router.post("/register")
+@router.post("/register", dependencies=[Depends(limit_by_ip("auth:register", REGISTER_LIMIT))])
 async def register(user_data: UserRegister, response: Response):
     async with get_async_session() as session:
         # Check if email exists
@@ -75,7 +228,7 @@ async def register(user_data: UserRegister, response: Response):
             raise HTTPException(status_code=400, detail="Username already taken")
 
         # Create user
-        hashed_pw = hash_password(user_data.password)
+        hashed_pw = await hash_password(user_data.password)
         db_user = User(
             username=user_data.username,
             email=user_data.email,
@@ -85,19 +238,13 @@ async def register(user_data: UserRegister, response: Response):
         await session.commit()
         await session.refresh(db_user)
         
-        token = create_jwt_token(db_user.id)
-        response.set_cookie(
-            key="access_token",
-            value=token,
-            httponly=True,
-            max_age=JWT_EXPIRE_MINUTES * 60,
-            samesite="lax",
-            secure=False
-        )
+        await issue_tokens(response, db_user.id)
         return db_user
 
-@router.post("/login/email")
+@router.post("/login/email", dependencies=[Depends(limit_by_ip("auth:login", LOGIN_IP_LIMIT))])
 async def login_email(credentials: UserLogin, response: Response):
+    # Also cap attempts per account, against guessing spread over many IPs
+    await rate_limiter.check("auth:login", f"email:{credentials.email.lower()}", LOGIN_ACCOUNT_LIMIT)
     async with get_async_session() as session:
         stmt = select(User).where(User.email == credentials.email)
         result = await session.execute(stmt)
@@ -106,18 +253,18 @@ async def login_email(credentials: UserLogin, response: Response):
         if not user or not user.hashed_password:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        if not verify_password(credentials.password, user.hashed_password):
+        if not await verify_password(credentials.password, user.hashed_password):
             raise HTTPException(status_code=401, detail="Invalid email or password")
+
+        # Transparently upgrade hashes made with an older cost factor
+        if password_hasher.needs_rehash(user.hashed_password):
+            user.hashed_password = await hash_password(credentials.password)
+            session.add(user)
+            await session.commit()
+            await session.refresh(user)
+            invalidate_user_cache(user.id)
             
-        token = create_jwt_token(user.id)
-        response.set_cookie(
-            key="access_token",
-            value=token,
-            httponly=True,
-            max_age=JWT_EXPIRE_MINUTES * 60,
-            samesite="lax",
-            secure=False
-        )
+        await issue_tokens(response, user.id)
         return user
 
 # ----------------------------------------------------------------------
@@ -127,42 +274,20 @@ async def login_email(credentials: UserLogin, response: Response):
 def login():
     state = secrets.token_urlsafe(16)
     redirect_uri = "http://localhost:8000/auth/callback"
-    github_auth_url = (
-        f"https://github.com/login/oauth/authorize"
-        f"?client_id={GITHUB_CLIENT_ID}"
-        f"&redirect_uri={redirect_uri}"
-        f"&state={state}"
-        "&scope=read:user user:email"
-    )
-    return Response(status_code=status.HTTP_302_FOUND, headers={"Location": github_auth_url})
+    return Response(status_code=status.HTTP_302_FOUND, headers={"Location": github.authorize_url(redirect_uri, state)})
 
 @router.get("/callback")
 async def callback(code: str = None, state: str = None):
     if not code:
         raise HTTPException(status_code=400, detail="Missing code")
 
-    token_url = "https://github.com/login/oauth/access_token"
-    async with httpx.AsyncClient() as client:
-        token_resp = await client.post(
-            token_url,
-            data={
-                "client_id": GITHUB_CLIENT_ID,
-                "client_secret": GITHUB_CLIENT_SECRET,
-                "code": code,
-            },
-            headers={"Accept": "application/json"},
-        )
-        token_data = token_resp.json()
-        access_token = token_data.get("access_token")
-        
+    try:
+        access_token = await github.exchange_code(code)
         if not access_token:
             raise HTTPException(status_code=400, detail="Failed to obtain access token")
-
-        user_resp = await client.get(
-            "https://api.github.com/user",
-            headers={"Authorization": f"token {access_token}"},
-        )
-        gh_user = user_resp.json()
+        gh_user = await github.fetch_user(access_token)
+    except github.GitHubError:
+        raise HTTPException(status_code=502, detail="GitHub is unavailable, please try again")
 
     async with get_async_session() as session:
         stmt = select(User).where(User.github_id == str(gh_user["id"]))
@@ -183,46 +308,113 @@ async def callback(code: str = None, state: str = None):
 
         await session.commit()
         await session.refresh(db_user)
-        token = create_jwt_token(db_user.id)
+        invalidate_user_cache(db_user.id)
+        user_id = db_user.id
 
     FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
     response = Response(status_code=status.HTTP_302_FOUND, headers={"Location": f"{FRONTEND_URL}/dashboard"})
-    response.set_cookie(
-        key="access_token",
-        value=token,
-        httponly=True,
-        max_age=JWT_EXPIRE_MINUTES * 60,
-        samesite="lax"
-    )
+    await issue_tokens(response, user_id)
     return response
 
-@router.get("/me")
-async def me(access_token: str = Cookie(None)):
+# ----------------------------------------------------------------------
+# Session Routes
+# ----------------------------------------------------------------------
+@router.post("/refresh")
+async def refresh(response: Response, refresh_token: str | None = Cookie(default=None)):
     """
-    Return the logged-in user's profile.
+    Exchange the refresh token for a new access/refresh pair. The presented
+    token is rotated out; presenting it again later revokes the whole family.
     """
-    if not access_token:
+    if not refresh_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    user_id = decode_jwt_token(access_token)
+
+    now = datetime.utcnow()
     async with get_async_session() as session:
-        stmt = select(User).where(User.id == user_id)
-        result = await session.execute(stmt)
-        user = result.scalar_one_or_none()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        return user
+        stmt = select(RefreshToken).where(RefreshToken.token_hash == _hash_refresh_token(refresh_token))
+        stored = (await session.execute(stmt)).scalar_one_or_none()
+        if not stored or stored.expires_at <= now:
+            raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+
+        if stored.revoked_at:
+            if stored.replaced_by is None or (now - stored.revoked_at).total_seconds() > REFRESH_REUSE_GRACE_SECONDS:
+                # Reuse of a rotated token: assume it leaked and end the session everywhere
+                await _revoke_family(session, stored.family_id)
+                await session.commit()
+            raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+
+        user_id = stored.user_id
+        raw, new_row = _new_refresh_token(user_id, stored.family_id)
+        session.add(new_row)
+        await session.flush()
+        stored.revoked_at = now
+        stored.replaced_by = new_row.id
+        session.add(stored)
+        await session.commit()
+
+    _set_auth_cookies(response, create_jwt_token(user_id), raw)
+    return {"status": "success"}
+
+@router.post("/logout")
+async def logout(
+    response: Response,
+    access_token: str | None = Cookie(default=None),
+    refresh_token: str | None = Cookie(default=None)
+):
+    """
+    End the current session: revoke its refresh-token family and access token.
+    """
+    if refresh_token:
+        async with get_async_session() as session:
+            stmt = select(RefreshToken.family_id).where(RefreshToken.token_hash == _hash_refresh_token(refresh_token))
+            family_id = (await session.execute(stmt)).scalar_one_or_none()
+            if family_id:
+                await _revoke_family(session, family_id)
+                await session.commit()
+
+    if access_token:
+        try:
+            user_id, jti, _, expires = _decode_claims(access_token)
+        except HTTPException:
+            pass
+        else:
+            await revocation_list.revoke_token(jti, datetime.utcfromtimestamp(expires))
+
+    _clear_auth_cookies(response)
+    return {"status": "success"}
+
+@router.post("/logout-all")
+async def logout_all(response: Response, user_id: int = Depends(get_current_user_id)):
+    """
+    End every session of the current user on all devices.
+    """
+    async with get_async_session() as session:
+        stmt = update(RefreshToken).where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.revoked_at.is_(None)
+        ).values(revoked_at=datetime.utcnow())
+        await session.execute(stmt)
+        await session.commit()
+
+    expires = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    await revocation_list.revoke_user(user_id, expires)
+    _clear_auth_cookies(response)
+    return {"status": "success"}
+
+@router.get("/me")
+async def me(user: User = Depends(get_current_user)):
+    """
+    Return the logged-in user's profile.
+    """
+    return user
 
 @router.patch("/me")
 async def update_me(
     user_update: dict,
-    access_token: str = Cookie(None)
+    user_id: int = Depends(get_current_user_id)
 ):
     """
     Update the logged-in user's profile (stack, level, goal).
     """
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    user_id = decode_jwt_token(access_token)
     async with get_async_session() as session:
         stmt = select(User).where(User.id == user_id)
         result = await session.execute(stmt)
@@ -241,4 +433,8 @@ async def update_me(
         session.add(db_user)
         await session.commit()
         await session.refresh(db_user)
+        invalidate_user_cache(user_id)
+        if matching_index.loaded:
+            profile = await load_profile(user_id)
+            matching_index.update_user(db_user, profile["skills"])
         return db_user
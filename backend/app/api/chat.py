@@ -1,4 +1,4 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query, Cookie
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Dict, Optional
@@ -6,88 +6,60 @@ import json
 import asyncio
 
 from ..core.database import get_async_session, async_engine
-from ..models.chat import Channel, Message
+from ..models.chat import Message
 from ..models.user import User
-from ..api.auth import decode_jwt_token
+from ..api.auth import get_current_user, get_current_user_id, load_user_snapshot, websocket_user_id
+from ..core.ratelimit import RateLimit, rate_limiter
+from ..core.channels import can_access, channels_for_user, chat_manager
+from ..core.activity import record_activity
+from ..core.chat_archive import history_page
+from ..core.tracing import span
 
 router = APIRouter()
 
+# Messages per user, shared by the REST endpoint and the WebSocket
+CHAT_MESSAGE_LIMIT = RateLimit.from_env("CHAT_MESSAGE_RATE_LIMIT", "30/60")
+
 # Dependency wrapper for FastAPI
 async def get_session():
     async with get_async_session() as session:
         yield session
 
-# WebSocket Manager to handle connections
-class ConnectionManager:
-    def __init__(self):
-        # channel_id -> List[WebSocket]
-        self.active_connections: Dict[int, List[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, channel_id: int):
-        # WebSocket is already accepted in the endpoint
-        if channel_id not in self.active_connections:
-            self.active_connections[channel_id] = []
-        self.active_connections[channel_id].append(websocket)
-
-    def disconnect(self, websocket: WebSocket, channel_id: int):
-        if channel_id in self.active_connections:
-            if websocket in self.active_connections[channel_id]:
-                self.active_connections[channel_id].remove(websocket)
-            if not self.active_connections[channel_id]:
-                del self.active_connections[channel_id]
-
-    async def broadcast(self, message: dict, channel_id: int):
-        if channel_id in self.active_connections:
-            # Iterate copy to avoid issues if remove happens during iteration
-            for connection in self.active_connections[channel_id][:]:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    # Connection might be closed
-                    pass
+MAX_HISTORY_PAGE = 200
 
-manager = ConnectionManager()
+# Length of the message excerpt shown in the activity feed
+ACTIVITY_PREVIEW_CHARS = 140
+
+def _record_message(session, project_id: int, msg: Message):
+    """Team channel messages show up in the team's activity feed."""
+    record_activity(session, project_id, msg.user_id, "message", subject_id=msg.id,
+                    channel_id=msg.channel_id, preview=msg.content[:ACTIVITY_PREVIEW_CHARS])
 
 @router.get("/channels")
-async def get_channels(session: AsyncSession = Depends(get_session)):
-    stmt = select(Channel)
-    channels = (await session.execute(stmt)).scalars().all()
-    
-    if not channels:
-        # Seed default channels
-        defaults = [
-            {"name": "general", "description": "Platform-wide discussions", "type": "public"},
-            {"name": "help", "description": "Technical questions & support", "type": "public"},
-            {"name": "projects", "description": "Share ideas & find teammates", "type": "public"},
-            {"name": "learning", "description": "Resources & tutorials", "type": "public"},
-            {"name": "career", "description": "Jobs, internships & advice", "type": "public"},
-        ]
-        new_channels = []
-        for c in defaults:
-            ch = Channel(**c)
-            session.add(ch)
-            new_channels.append(ch)
-        await session.commit()
-        for ch in new_channels:
-            await session.refresh(ch)
-        return new_channels
-        
-    return channels
+async def get_channels(user_id: int = Depends(get_current_user_id), session: AsyncSession = Depends(get_session)):
+    """Public channels plus the private channels of the user's teams."""
+    return await channels_for_user(session, user_id)
 
 @router.get("/channels/{channel_id}/messages")
 async def get_messages(
     channel_id: int, 
-    limit: int = 50, 
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=MAX_HISTORY_PAGE),
+    before: Optional[int] = None,
+    user_id: int = Depends(get_current_user_id),
     session: AsyncSession = Depends(get_session)
 ):
-    # Fetch messages with user info
-    # We'll fetch messages and then users manually to be safe with async
-    stmt = select(Message).where(Message.channel_id == channel_id).order_by(Message.created_at.desc()).offset(offset).limit(limit)
-    messages = (await session.execute(stmt)).scalars().all()
+    """
+    Up to `limit` messages older than message id `before` (the latest when
+    omitted), oldest first. Pages past the hot table are read from the archive.
+    """
+    allowed, _ = await can_access(session, channel_id, user_id)
+    if not allowed:
+        raise HTTPException(status_code=404, detail="Channel not found")
+
+    messages = await history_page(session, channel_id, before, limit)
     
     # Collect user IDs
-    user_ids = {msg.user_id for msg in messages}
+    user_ids = {msg["user_id"] for msg in messages}
     if not user_ids:
         return []
         
@@ -97,15 +69,15 @@ async def get_messages(
     
     results = []
     for msg in reversed(messages):
-        user = user_map.get(msg.user_id)
+        user = user_map.get(msg["user_id"])
         results.append({
-            "id": msg.id,
-            "content": msg.content,
-            "user_id": msg.user_id,
+            "id": msg["id"],
+            "content": msg["content"],
+            "user_id": msg["user_id"],
             "username": user.username if user else "Unknown",
             "avatar_url": user.avatar_url if user else None,
-            "created_at": msg.created_at.isoformat(),
-            "parent_id": msg.parent_id
+            "created_at": msg["created_at"],
+            "parent_id": msg["parent_id"]
         })
     return results
 
@@ -115,27 +87,29 @@ async def websocket_endpoint(
     channel_id: int, 
     token: Optional[str] = Query(None)
 ):
-    # Try to get from Cookie if query param is missing
     await websocket.accept()
-    
-    final_token = token
-    if not final_token:
-        final_token = websocket.cookies.get("access_token")
-    
-    if not final_token:
-        print("WS Auth Failed: No token")
+    # Token from the query param, else the access_token cookie
+    user_id = websocket_user_id(websocket, token)
+    if user_id is None:
         await websocket.close(code=1008)
         return
 
-    try:
-        user_id = decode_jwt_token(final_token)
-    except Exception as e:
-        print(f"WS Auth Failed: {e}")
+    # Sender details are needed for every broadcast; look them up once
+    db_user = await load_user_snapshot(user_id)
+    if not db_user:
         await websocket.close(code=1008)
         return
-        
+
+    # Team channels are members only; since only members can subscribe,
+    # broadcasts to the channel only reach members
+    async with get_async_session() as session:
+        allowed, project_id = await can_access(session, channel_id, user_id)
+    if not allowed:
+        await websocket.close(code=1008)
+        return
+
     # If connection was already accepted, we maintain it.
-    await manager.connect(websocket, channel_id)
+    await chat_manager.connect(websocket, channel_id)
     
     try:
         while True:
@@ -144,26 +118,45 @@ async def websocket_endpoint(
             content = data.get("content")
             if not content:
                 continue
-                
-            # Save to DB
-            try:
-                # We reuse the async_engine from global import
-                # expire_on_commit=False is crucial to avoid MissingGreenlet on property access after commit
-                async with AsyncSession(async_engine, expire_on_commit=False) as session:
-                    # 1. Fetch user to get details for broadcast
-                    u_stmt = select(User).where(User.id == user_id)
-                    db_user = (await session.execute(u_stmt)).scalar_one_or_none()
-                    
-                    if db_user:
-                        # 2. Create Message
+
+            # One span per inbound message: rate limit, save, fan-out
+            with span("chat.message", kind="consumer", **{"chat.channel_id": channel_id, "enduser.id": user_id}):
+                try:
+                    await rate_limiter.check("chat:message", f"user:{user_id}", CHAT_MESSAGE_LIMIT)
+                except HTTPException as e:
+                    await websocket.send_json({
+                        "type": "error",
+                        "status": e.status_code,
+                        "detail": e.detail,
+                        "retry_after": int(e.headers["Retry-After"])
+                    })
+                    continue
+
+                # Access can end while the socket is open (member removed, project deleted)
+                if project_id is not None:
+                    async with get_async_session() as session:
+                        allowed, _ = await can_access(session, channel_id, user_id)
+                    if not allowed:
+                        await websocket.close(code=1008)
+                        return
+
+                # Save to DB
+                try:
+                    # We reuse the async_engine from global import
+                    # expire_on_commit=False is crucial to avoid MissingGreenlet on property access after commit
+                    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                        # 1. Create Message
                         msg = Message(
                             content=content,
                             channel_id=channel_id,
                             user_id=user_id
                         )
                         session.add(msg)
+                        if project_id is not None:
+                            await session.flush()
+                            _record_message(session, project_id, msg)
                         await session.commit()
-                        
+                    
                         # Safe refresh: Check ID, then maybe reload if needed, 
                         # but usually commit populates ID. 
                         # We use session.get to be absolutely safe against implicit IO errors
@@ -173,8 +166,8 @@ async def websocket_endpoint(
                             refreshed_msg = await session.get(Message, msg.id)
                             if refreshed_msg:
                                 msg = refreshed_msg
-                        
-                        # 3. Broadcast
+                    
+                        # 2. Broadcast
                         response_data = {
                             "id": msg.id,
                             "content": msg.content,
@@ -184,13 +177,15 @@ async def websocket_endpoint(
                             "created_at": msg.created_at.isoformat(),
                             "parent_id": msg.parent_id
                         }
-                        await manager.broadcast(response_data, channel_id)
-            except Exception as e:
-                print(f"Error processing message: {e}")
-                # Do not close connection, just log error
+                        await chat_manager.broadcast(response_data, channel_id)
+                except Exception as e:
+                    print(f"Error processing message: {e}")
+                    # Do not close connection, just log error
                     
     except WebSocketDisconnect:
-        manager.disconnect(websocket, channel_id)
+        pass
+    finally:
+        chat_manager.disconnect(websocket, channel_id)
 
 from pydantic import BaseModel
 
@@ -201,34 +196,33 @@ class MessageCreate(BaseModel):
 async def create_message(
     channel_id: int, 
     message: MessageCreate,
-    access_token: str | None = Cookie(default=None, alias="access_token")
+    user: User = Depends(get_current_user)
 ):
     """
     Post a message to a channel via REST API (e.g. for sharing projects).
     Broadcasts to WebSocket listeners.
     """
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
+    user_id = user.id
+    await rate_limiter.check("chat:message", f"user:{user_id}", CHAT_MESSAGE_LIMIT)
     async with AsyncSession(async_engine, expire_on_commit=False) as session:
-        # 1. Fetch User
-        user = await session.get(User, user_id)
-        if not user:
-             raise HTTPException(status_code=404, detail="User not found")
+        allowed, project_id = await can_access(session, channel_id, user_id)
+        if not allowed:
+            raise HTTPException(status_code=404, detail="Channel not found")
 
-        # 2. Create Message
+        # 1. Create Message
         msg = Message(
             content=message.content,
             channel_id=channel_id,
             user_id=user_id
         )
         session.add(msg)
+        if project_id is not None:
+            await session.flush()
+            _record_message(session, project_id, msg)
         await session.commit()
         await session.refresh(msg)
         
-        # 3. Broadcast
+        # 2. Broadcast
         response_data = {
             "id": msg.id,
             "content": msg.content,
@@ -238,6 +232,6 @@ async def create_message(
             "created_at": msg.created_at.isoformat(),
             "parent_id": msg.parent_id
         }
-        await manager.broadcast(response_data, channel_id)
+        await chat_manager.broadcast(response_data, channel_id)
         
         return response_data
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from ..core.database import get_async_session
+from ..core.notifications import (
+    PAGE_SIZE,
+    list_notifications,
+    mark_read,
+    notification_manager,
+    serialize_notification,
+    unread_count,
+)
+from ..api.auth import get_current_user_id, websocket_user_id
+
+router = APIRouter()
+
+class MarkRead(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=200)
+
+@router.get("/")
+async def get_notifications(
+    before: Optional[int] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=100),
+    unread_only: bool = False,
+    user_id: int = Depends(get_current_user_id)
+):
+    """Newest first; pass `next_cursor` as `before` for the next page."""
+    async with get_async_session() as session:
+        items = await list_notifications(session, user_id, before, limit + 1, unread_only)
+    next_cursor = items[limit - 1].id if len(items) > limit else None
+    return {
+        "items": [serialize_notification(n) for n in items[:limit]],
+        "next_cursor": next_cursor,
+        "unread": await unread_count(user_id),
+    }
+
+@router.get("/unread-count")
+async def get_unread_count(user_id: int = Depends(get_current_user_id)):
+    return {"unread": await unread_count(user_id)}
+
+@router.post("/read")
+async def read_notifications(body: MarkRead, user_id: int = Depends(get_current_user_id)):
+    return {"unread": await mark_read(user_id, body.ids)}
+
+@router.post("/read-all")
+async def read_all_notifications(user_id: int = Depends(get_current_user_id)):
+    return {"unread": await mark_read(user_id)}
+
+@router.websocket("/ws")
+async def notifications_websocket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    Pushes {"type": "notification", ..., "unread"} as they happen and
+    {"type": "unread", "count"} when the count changes otherwise. The
+    current count is sent on connect.
+    """
+    await websocket.accept()
+    user_id = websocket_user_id(websocket, token)
+    if user_id is None:
+        await websocket.close(code=1008)
+        return
+
+    await notification_manager.connect(websocket, user_id)
+    try:
+        await websocket.send_json({"type": "unread", "count": await unread_count(user_id)})
+        while True:
+            # Nothing is expected from the client; this just waits for the close
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        notification_manager.disconnect(websocket, user_id)
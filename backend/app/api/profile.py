@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, Cookie
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import select, func
+from sqlalchemy import case
 from sqlmodel.ext.asyncio.session import AsyncSession
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
@@ -7,10 +8,26 @@ from ..core.database import get_async_session
 from ..models.user import User
 from ..models.project import Project
 from ..models.task import Task
-from ..api.auth import decode_jwt_token
+from ..core.matching import matching_index
+from ..core.profiles import (
+    PUBLIC_PROFILE_TTL,
+    find_users_by_skill,
+    get_public_render,
+    invalidate_profile,
+    load_profile,
+    profile_version,
+    save_profile,
+    set_public_render,
+)
+from ..core.conditional import conditional_response, make_etag, render_json
+from ..api.auth import get_current_user_id, invalidate_user_cache
 
 router = APIRouter()
 
+# Shared caches may keep a public profile as long as this worker does, then
+# serve it while revalidating
+PUBLIC_PROFILE_CACHE_CONTROL = f"public, max-age={PUBLIC_PROFILE_TTL}, stale-while-revalidate={PUBLIC_PROFILE_TTL * 5}"
+
 class OnboardingData(BaseModel):
     # 1. Personal
     first_name: str
@@ -47,15 +64,10 @@ class OnboardingData(BaseModel):
     ai_preference: Dict[str, Any]   # { guidance, areas }
 
 @router.get("/me")
-async def get_my_profile(access_token: str = Cookie(None)):
+async def get_my_profile(user_id: int = Depends(get_current_user_id)):
     """
     Returns the full profile data for the authenticated user.
     """
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         stmt = select(User).where(User.id == user_id)
         result = await session.execute(stmt)
@@ -67,15 +79,22 @@ async def get_my_profile(access_token: str = Cookie(None)):
         proj_stmt = select(Project).where(Project.owner_id == user_id)
         projects = (await session.execute(proj_stmt)).scalars().all()
 
+        # Task counts for every project in one grouped query
+        task_counts = {}
+        if projects:
+            done = func.sum(case((Task.status == "done", 1), else_=0))
+            count_stmt = select(Task.project_id, func.count(Task.id), done).where(
+                Task.project_id.in_([proj.id for proj in projects])
+            ).group_by(Task.project_id)
+            task_counts = {pid: (total, d or 0) for pid, total, d in (await session.execute(count_stmt)).all()}
+
         profile_projects = []
         total_tasks = 0
         total_done = 0
         
         for proj in projects:
-            task_stmt = select(Task).where(Task.project_id == proj.id)
-            tasks = (await session.execute(task_stmt)).scalars().all()
-            done_count = len([t for t in tasks if t.status == "done"])
-            total_tasks += len(tasks)
+            tasks_count, done_count = task_counts.get(proj.id, (0, 0))
+            total_tasks += tasks_count
             total_done += done_count
             
             profile_projects.append({
@@ -83,15 +102,12 @@ async def get_my_profile(access_token: str = Cookie(None)):
                 "title": proj.title,
                 "stack": proj.stack,
                 "type": proj.type,
-                "tasks_count": len(tasks),
+                "tasks_count": tasks_count,
                 "tasks_done": done_count
             })
 
-        import json
-        def safe_json_load(json_str):
-            if not json_str: return {}
-            try: return json.loads(json_str)
-            except: return {}
+        # Parsed JSON fields come from the profile read model
+        profile = await load_profile(user_id, fresh=True)
 
         return {
             "id": user.id,
@@ -106,13 +122,13 @@ async def get_my_profile(access_token: str = Cookie(None)):
             "timezone": user.timezone,
             "primary_role": user.primary_role,
             "level": user.level,
-            "skills": safe_json_load(user.skills),
-            "social_links": safe_json_load(user.social_links),
+            "skills": profile["skills"],
+            "social_links": profile["social_links"],
             "work_experience": user.work_experience,
             "primary_goal": user.primary_goal,
             "weekly_availability": user.weekly_availability,
-            "work_preferences": safe_json_load(user.work_preferences),
-            "ai_preferences": safe_json_load(user.ai_preferences),
+            "work_preferences": profile["work_preferences"],
+            "ai_preferences": profile["ai_preferences"],
             "is_onboarding_completed": user.is_onboarding_completed,
             "projects": profile_projects,
             "stats": {
@@ -122,16 +138,55 @@ async def get_my_profile(access_token: str = Cookie(None)):
             }
         }
 
+@router.get("/search")
+async def search_by_skill(skill: str, min_level: Optional[str] = None, limit: int = 50, user_id: int = Depends(get_current_user_id)):
+    """
+    Users with `skill` at `min_level` or above (e.g. React >= Intermediate),
+    strongest first.
+    """
+    async with get_async_session() as session:
+        matches = await find_users_by_skill(session, skill, min_level, max(1, min(limit, 200)))
+        user_ids = [m.user_id for m in matches]
+        users = {}
+        if user_ids:
+            stmt = select(User).where(User.id.in_(user_ids))
+            users = {u.id: u for u in (await session.execute(stmt)).scalars().all()}
+
+    results = []
+    for m in matches:
+        user = users.get(m.user_id)
+        if not user:
+            continue
+        results.append({
+            "id": user.id,
+            "username": user.username,
+            "avatar_url": user.avatar_url,
+            "primary_role": user.primary_role,
+            "skill": m.name,
+            "skill_level": m.level
+        })
+    return results
+
 @router.get("/{user_id}")
-async def get_user_profile(user_id: int):
+async def get_user_profile(user_id: int, request: Request):
     """
     Returns public profile data for a specific user.
+    Rendered once per profile version and served with a strong ETag, so
+    clients and proxies can revalidate with If-None-Match (304).
     """
+    cached = get_public_render(user_id)
+    if cached is None:
+        version = profile_version(user_id)
+        body = await _render_public_profile(user_id)
+        cached = (body, make_etag(body))
+        set_public_render(user_id, version, *cached)
+    body, etag = cached
+    return conditional_response(request, body, etag, PUBLIC_PROFILE_CACHE_CONTROL)
+
+async def _render_public_profile(user_id: int) -> bytes:
+    # Read past the user and profile caches: the render is cached in their place
     async with get_async_session() as session:
-        stmt = select(User).where(User.id == user_id)
-        result = await session.execute(stmt)
-        user = result.scalar_one_or_none()
-        
+        user = await session.get(User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -148,13 +203,10 @@ async def get_user_profile(user_id: int):
                 "type": proj.type
             })
 
-        import json
-        def safe_json_load(json_str):
-            if not json_str: return {}
-            try: return json.loads(json_str)
-            except: return {}
+        # Parsed JSON fields come from the profile read model
+        profile = await load_profile(user_id, fresh=True)
 
-        return {
+        return render_json({
             "id": user.id,
             "username": user.username,
             "avatar_url": user.avatar_url,
@@ -164,26 +216,21 @@ async def get_user_profile(user_id: int):
             "country": user.country,
             "primary_role": user.primary_role,
             "level": user.level,
-            "skills": safe_json_load(user.skills),
-            "social_links": safe_json_load(user.social_links),
+            "skills": profile["skills"],
+            "social_links": profile["social_links"],
             "stats": {
                 "projects_count": len(projects)
             }
-        }
+        })
 
 @router.put("/onboarding")
 async def complete_onboarding(
     data: OnboardingData,
-    access_token: str = Cookie(None)
+    user_id: int = Depends(get_current_user_id)
 ):
     """
     Submit full profile data and mark onboarding as complete.
     """
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-        
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         stmt = select(User).where(User.id == user_id)
         result = await session.execute(stmt)
@@ -217,7 +264,18 @@ async def complete_onboarding(
         user.is_onboarding_completed = True
         
         session.add(user)
+        await save_profile(
+            session,
+            user_id,
+            skills=data.skills,
+            social_links=data.social_links,
+            work_preferences=data.work_preference,
+            ai_preferences=data.ai_preference
+        )
         await session.commit()
         await session.refresh(user)
+        invalidate_user_cache(user_id)
+        invalidate_profile(user_id)
+        matching_index.update_user(user, data.skills)
         
         return {"status": "success", "user": user}
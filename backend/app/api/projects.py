@@ -1,30 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Cookie
-from sqlmodel import select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlmodel import select, func
 from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
 from ..core.database import get_async_session
 from ..models.project import Project
 from ..models.user import User
 from ..core.ai import generate_project_idea
-from ..api.auth import decode_jwt_token
+from ..core.suggestions import (
+    SUGGESTIONS_PER_USER,
+    ensure_idea_index,
+    profile_inputs,
+    reusable_ideas,
+    serialize_suggestion,
+    suggestion_from_idea,
+)
+from ..core.idea_index import DuplicateFilter, idea_index
+from ..core.matching import matching_index
+from ..core.profiles import bump_profile_version
+from ..core.membership import add_member, add_owner
+from ..core.deletion import project_purger, soft_delete_project
+from ..core.activity import record_activity
+from ..core.task_sync import add_generated_tasks, publish
+from ..core.notifications import deliver, mark_read, notify
+from ..core.channels import close_team_channel, invalidate_user_channels, rename_project_channel
+from ..core.conditional import etag_matches
+from ..core.versioning import check_if_match, flush_or_conflict, version_etag
+from ..models.team_member import TeamMember
+from ..core.usage import record_cache_hit
+from ..api.auth import get_current_user_id, load_user_snapshot
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Project])
-async def list_projects(access_token: str = Cookie(None)):
+async def list_projects(user_id: int = Depends(get_current_user_id)):
     """List all projects for the authenticated user."""
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         stmt = select(Project).where(Project.owner_id == user_id).order_by(Project.created_at.desc())
         result = await session.execute(stmt)
         return result.scalars().all()
 
 @router.get("/suggestions")
-async def get_project_suggestions(access_token: str | None = Cookie(default=None, alias="access_token")):
+async def get_project_suggestions(user_id: int = Depends(get_current_user_id)):
     """
     Get personalized project suggestions based on user profile.
     Uses cached suggestions from DB if available, otherwise generates them.
@@ -32,11 +48,6 @@ async def get_project_suggestions(access_token: str | None = Cookie(default=None
     from ..core.ai import generate_personalized_ideas
     from ..models.suggestion import ProjectSuggestion
     
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         user = await session.get(User, user_id)
         if not user:
@@ -46,87 +57,65 @@ async def get_project_suggestions(access_token: str | None = Cookie(default=None
         stmt = select(ProjectSuggestion).where(ProjectSuggestion.user_id == user_id)
         existing_suggestions = (await session.execute(stmt)).scalars().all()
         
-        if existing_suggestions and len(existing_suggestions) >= 3:
-            # Return top 3
-            return [
-                {
-                    "id": s.id, 
-                    "title": s.title, 
-                    "description": s.description, 
-                    "stack": s.stack, 
-                    "difficulty": s.difficulty,
-                    "created_at": s.created_at
-                } 
-                for s in existing_suggestions[:3]
-            ]
+        if existing_suggestions and len(existing_suggestions) >= SUGGESTIONS_PER_USER:
+            # Pre-generated by pregenerate_suggestions.py or a previous visit
+            record_cache_hit("generate_personalized_ideas")
+            return [serialize_suggestion(s) for s in existing_suggestions[:SUGGESTIONS_PER_USER]]
             
         # If we have some but less than 3, keep them
-        current_titles = {s.title for s in existing_suggestions}
         saved_ideas = list(existing_suggestions)
+        count_needed = SUGGESTIONS_PER_USER - len(saved_ideas)
+
+        # Anything close to what the user already has or owns is a near-duplicate
+        proj_stmt = select(Project).where(Project.owner_id == user_id)
+        owned_projects = (await session.execute(proj_stmt)).scalars().all()
+        dedup = DuplicateFilter(
+            [serialize_suggestion(s) for s in existing_suggestions]
+            + [{"title": p.title, "description": p.description, "stack": p.stack} for p in owned_projects]
+        )
+
+        role, level, skills = profile_inputs(user)
+
+        # 1. Reuse cached ideas generated for similar profiles
+        index = await ensure_idea_index(session)
+        ideas = reusable_ideas(index, role, level, skills, dedup, count_needed)
+
+        # 2. Only pay for a generation if the cache could not fill the gap
+        if len(ideas) >= count_needed:
+            record_cache_hit("generate_personalized_ideas")
+        else:
+            generated = await generate_personalized_ideas(role, level, skills)
+            for idea in generated:
+                if len(ideas) >= count_needed:
+                    break
+                if dedup.try_accept(idea):
+                    ideas.append(idea)
+            index.add_many({**idea, "source": "suggestion"} for idea in generated)
 
-        # Generate new to fill the gap
-        # Note: We ask for 3 (default) and filter, or we could update AI prompt to take 'count'
-        # For simplicity, we ask for 3 and pick the first ones that are unique
-        role = user.primary_role or "Fullstack Developer"
-        level = user.level or "Junior"
-        skills = user.skills or "React, Python, SQL"
-        
-        # Call AI
-        ideas = await generate_personalized_ideas(role, level, skills)
-        
-        # Save new unique ones to DB
-        count_needed = 3 - len(saved_ideas)
-        added_count = 0
-        
         for idea in ideas:
-            if added_count >= count_needed:
-                break
-            if idea["title"] not in current_titles:
-                db_suggestion = ProjectSuggestion(
-                    user_id=user_id,
-                    title=idea["title"],
-                    description=idea["description"],
-                    stack=idea["stack"] if isinstance(idea["stack"], str) else ", ".join(idea["stack"]),
-                    difficulty=idea["difficulty"]
-                )
-                session.add(db_suggestion)
-                saved_ideas.append(db_suggestion)
-                current_titles.add(idea["title"])
-                added_count += 1
+            db_suggestion = suggestion_from_idea(user_id, idea)
+            session.add(db_suggestion)
+            saved_ideas.append(db_suggestion)
             
         await session.commit()
         for s in saved_ideas:
             await session.refresh(s)
             
-        return [
-            {
-                "id": s.id, 
-                "title": s.title, 
-                "description": s.description, 
-                "stack": s.stack, 
-                "difficulty": s.difficulty,
-                "created_at": s.created_at
-            } 
-            for s in saved_ideas
-        ]
+        return [serialize_suggestion(s) for s in saved_ideas]
 
 @router.post("/suggestions/refresh")
-async def refresh_suggestions(access_token: str | None = Cookie(default=None, alias="access_token")):
+async def refresh_suggestions(user_id: int = Depends(get_current_user_id)):
     """
     Force regenerate suggestions (clears old ones).
     """
     from ..core.ai import generate_personalized_ideas
     from ..models.suggestion import ProjectSuggestion
     
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         # 1. Clear existing
         stmt = select(ProjectSuggestion).where(ProjectSuggestion.user_id == user_id)
         existing = (await session.execute(stmt)).scalars().all()
+        discarded = [s.title for s in existing]
         for s in existing:
             await session.delete(s)
             
@@ -135,23 +124,22 @@ async def refresh_suggestions(access_token: str | None = Cookie(default=None, al
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
             
-        role = user.primary_role or "Fullstack Developer"
-        level = user.level or "Junior"
-        skills = user.skills or "React, Python, SQL"
+        role, level, skills = profile_inputs(user)
         
-        # 3. Generate New
+        # 3. Generate New (dropping near-duplicates within the batch)
         ideas = await generate_personalized_ideas(role, level, skills)
+        dedup = DuplicateFilter()
+        ideas = [idea for idea in ideas if dedup.try_accept(idea)]
+        index = await ensure_idea_index(session)
+        # Don't hand the replaced ideas on to other users with similar profiles
+        for title in discarded:
+            index.remove(title, source="suggestion")
+        index.add_many({**idea, "source": "suggestion"} for idea in ideas)
         
         # 4. Save
         saved_ideas = []
         for idea in ideas:
-            db_suggestion = ProjectSuggestion(
-                user_id=user_id,
-                title=idea["title"],
-                description=idea["description"],
-                stack=idea["stack"] if isinstance(idea["stack"], str) else ", ".join(idea["stack"]),
-                difficulty=idea["difficulty"]
-            )
+            db_suggestion = suggestion_from_idea(user_id, idea)
             session.add(db_suggestion)
             saved_ideas.append(db_suggestion)
             
@@ -159,30 +147,15 @@ async def refresh_suggestions(access_token: str | None = Cookie(default=None, al
         for s in saved_ideas:
             await session.refresh(s)
             
-        return [
-            {
-                "id": s.id, 
-                "title": s.title, 
-                "description": s.description, 
-                "stack": s.stack, 
-                "difficulty": s.difficulty,
-                "created_at": s.created_at
-            } 
-            for s in saved_ideas
-        ]
+        return [serialize_suggestion(s) for s in saved_ideas]
 
 @router.delete("/suggestions/{suggestion_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_suggestion(suggestion_id: int, access_token: str | None = Cookie(default=None, alias="access_token")):
+async def delete_suggestion(suggestion_id: int, user_id: int = Depends(get_current_user_id)):
     """
     Remove a suggestion.
     """
     from ..models.suggestion import ProjectSuggestion
     
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         suggestion = await session.get(ProjectSuggestion, suggestion_id)
         if not suggestion:
@@ -191,8 +164,11 @@ async def delete_suggestion(suggestion_id: int, access_token: str | None = Cooki
         if suggestion.user_id != user_id:
              raise HTTPException(status_code=403, detail="Not authorized")
              
+        title = suggestion.title
         await session.delete(suggestion)
         await session.commit()
+        # Don't hand a discarded idea on to other users with similar profiles
+        idea_index.remove(title, source="suggestion")
 
 from pydantic import BaseModel
 
@@ -203,12 +179,7 @@ class ProjectCreate(BaseModel):
     type: str = "solo"
 
 @router.post("/", response_model=Project, status_code=status.HTTP_201_CREATED)
-async def create_project(project_in: ProjectCreate, access_token: str = Cookie(None)):
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
+async def create_project(project_in: ProjectCreate, user_id: int = Depends(get_current_user_id)):
     # Create DB model from input + owner_id
     project = Project(
         owner_id=user_id,
@@ -220,24 +191,24 @@ async def create_project(project_in: ProjectCreate, access_token: str = Cookie(N
     
     async with get_async_session() as session:
         session.add(project)
+        await session.flush()
+        await add_owner(session, project)
+        record_activity(session, project.id, user_id, "project_created", title=project.title)
         await session.commit()
         await session.refresh(project)
+        invalidate_user_channels(user_id)
+        matching_index.update_project(project)
+        bump_profile_version(user_id)
         return project
 
 @router.post("/generate", response_model=dict)
-async def generate_project(access_token: str = Cookie(None)):
+async def generate_project(user_id: int = Depends(get_current_user_id)):
     """
     Generate a new project idea for the logged-in user using AI.
     Also automatically generates tasks for the project.
     """
-    from ..models.task import Task
     from ..core.ai import break_down_tasks
     
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     # First, fetch user preferences
     async with get_async_session() as session:
         stmt = select(User).where(User.id == user_id)
@@ -268,8 +239,13 @@ async def generate_project(access_token: str = Cookie(None)):
         )
         
         session.add(new_project)
+        await session.flush()
+        await add_owner(session, new_project)
+        record_activity(session, new_project.id, user_id, "project_created", title=new_project.title)
         await session.commit()
         await session.refresh(new_project)
+        invalidate_user_channels(user_id)
+        bump_profile_version(user_id)
         
         project_id = new_project.id
         project_data = {
@@ -290,28 +266,18 @@ async def generate_project(access_token: str = Cookie(None)):
             stack=project_data["stack"]
         )
         
-        # Save tasks to database
+        # Save tasks to database, logged and broadcast like POST /tasks/{id}/generate
         async with get_async_session() as session:
-            db_tasks = []
-            for t in ai_tasks:
-                db_task = Task(
-                    project_id=project_id,
-                    title=t["title"],
-                    description=t["description"],
-                    order=t["order"]
-                )
-                session.add(db_task)
-                db_tasks.append(db_task)
-            
+            db_tasks, messages = await add_generated_tasks(session, project_id, ai_tasks)
+            # Read before commit expires them
+            tasks_data = [{"id": t.id, "title": t.title, "description": t.description, "status": t.status, "order": t.order} for t in db_tasks]
             await session.commit()
-            
-            for task in db_tasks:
-                await session.refresh(task)
-                
-            return {
-                "project": project_data,
-                "tasks": [{"id": t.id, "title": t.title, "description": t.description, "status": t.status, "order": t.order} for t in db_tasks]
-            }
+        await publish(project_id, messages)
+
+        return {
+            "project": project_data,
+            "tasks": tasks_data
+        }
     except Exception as e:
         # If task generation fails, still return the project
         return {
@@ -321,13 +287,8 @@ async def generate_project(access_token: str = Cookie(None)):
 
 
 @router.get("/{project_id}", response_model=Project)
-async def get_project(project_id: int, access_token: str = Cookie(None)):
-    """Get a specific project by ID."""
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
+async def get_project(project_id: int, request: Request, response: Response, user_id: int = Depends(get_current_user_id)):
+    """Get a specific project by ID (304 if If-None-Match has its version)."""
     async with get_async_session() as session:
         stmt = select(Project).where(Project.id == project_id, Project.owner_id == user_id)
         result = await session.execute(stmt)
@@ -336,16 +297,15 @@ async def get_project(project_id: int, access_token: str = Cookie(None)):
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
+        headers = {"ETag": version_etag(project.version), "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
         return project
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_project(project_id: int, access_token: str = Cookie(None)):
-    """Delete a project."""
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
+async def delete_project(project_id: int, user_id: int = Depends(get_current_user_id)):
+    """Delete a project (and, shortly after, everything that belongs to it)."""
     async with get_async_session() as session:
         stmt = select(Project).where(Project.id == project_id, Project.owner_id == user_id)
         result = await session.execute(stmt)
@@ -354,8 +314,14 @@ async def delete_project(project_id: int, access_token: str = Cookie(None)):
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
-        await session.delete(project)
+        # Instant: the project disappears now, its tasks etc. are purged in the background
+        member_ids = await soft_delete_project(session, project)
         await session.commit()
+        invalidate_user_channels(*member_ids)
+        await close_team_channel(session, project_id)
+        project_purger.notify()
+        matching_index.remove_project(project_id)
+        bump_profile_version(user_id)
 
 from pydantic import BaseModel
 class ProjectUpdate(BaseModel):
@@ -364,13 +330,11 @@ class ProjectUpdate(BaseModel):
     stack: str | None = None
 
 @router.patch("/{project_id}", response_model=Project)
-async def update_project(project_id: int, project_update: ProjectUpdate, access_token: str = Cookie(None)):
-    """Update a project."""
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
+async def update_project(project_id: int, project_update: ProjectUpdate, request: Request, response: Response, user_id: int = Depends(get_current_user_id)):
+    """
+    Update a project. Send If-Match with the project's version ETag to get
+    a 409 with the current project instead of overwriting a concurrent edit.
+    """
     async with get_async_session() as session:
         stmt = select(Project).where(Project.id == project_id, Project.owner_id == user_id)
         result = await session.execute(stmt)
@@ -379,28 +343,29 @@ async def update_project(project_id: int, project_update: ProjectUpdate, access_
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
+        check_if_match(request, project)
         update_data = project_update.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(project, key, value)
             
         session.add(project)
+        # UPDATE ... WHERE version = <read version>
+        await flush_or_conflict(session, Project, project_id)
+        if "title" in update_data:
+            await rename_project_channel(session, project_id, project.title)
         await session.commit()
         await session.refresh(project)
+        matching_index.update_project(project)
+        bump_profile_version(user_id)
+        response.headers["ETag"] = version_etag(project.version)
         return project
 
 @router.get("/community/all", response_model=List[dict])
-async def list_community_projects(access_token: str = Cookie(None)):
+async def list_community_projects(user_id: int = Depends(get_current_user_id)):
     """
     List all projects NOT owned by the current user (Community Projects),
     with member counts.
     """
-    from ..models.join_request import JoinRequest
-    
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         # Fetch all projects (Community includes everyone's projects)
         stmt = select(Project).where(Project.type != "solo").order_by(Project.created_at.desc())
@@ -408,15 +373,6 @@ async def list_community_projects(access_token: str = Cookie(None)):
         
         results = []
         for project in projects:
-            # Count accepted members (Owner + Accepted Requests)
-            count_stmt = select(JoinRequest).where(
-                JoinRequest.project_id == project.id, 
-                JoinRequest.status == "accepted"
-            )
-            accepted_requests = (await session.execute(count_stmt)).scalars().all()
-            # Start with 1 (Owner) + accepted requests
-            members_count = 1 + len(accepted_requests)
-            
             project_dict = {
                 "id": project.id,
                 "owner_id": project.owner_id,
@@ -425,24 +381,93 @@ async def list_community_projects(access_token: str = Cookie(None)):
                 "stack": project.stack,
                 "type": project.type,
                 "created_at": project.created_at,
-                "members_count": members_count
+                "members_count": project.members_count
             }
             results.append(project_dict)
             
         return results
 
+@router.get("/community/recommended", response_model=List[dict])
+async def recommend_projects(k: int = 10, user_id: int = Depends(get_current_user_id)):
+    """
+    Team projects ranked by how well they fit the current user's skills,
+    level, availability and timezone.
+    """
+    from ..models.join_request import JoinRequest
+
+    async with get_async_session() as session:
+        await matching_index.ensure_loaded(session)
+        stmt = select(JoinRequest.project_id).where(JoinRequest.user_id == user_id)
+        requested = set((await session.execute(stmt)).scalars().all())
+
+        ranked = matching_index.projects_for_user(user_id, max(1, min(k, 50)), requested)
+        if not ranked:
+            return []
+        stmt = select(Project).where(Project.id.in_([pid for pid, _ in ranked]))
+        projects = {p.id: p for p in (await session.execute(stmt)).scalars().all()}
+
+    return [
+        {
+            "id": p.id,
+            "owner_id": p.owner_id,
+            "title": p.title,
+            "description": p.description,
+            "stack": p.stack,
+            "type": p.type,
+            "created_at": p.created_at,
+            "match_score": score
+        }
+        for pid, score in ranked
+        if (p := projects.get(pid))
+    ]
+
+@router.get("/{project_id}/candidates", response_model=List[dict])
+async def list_project_candidates(project_id: int, k: int = 10, user_id: int = Depends(get_current_user_id)):
+    """
+    Top-k users who would fit this team project (owner only). Users who
+    already requested to join are left out.
+    """
+    from ..models.join_request import JoinRequest
+
+    async with get_async_session() as session:
+        project = await session.get(Project, project_id)
+        if not project or project.owner_id != user_id:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+        await matching_index.ensure_loaded(session)
+        stmt = select(JoinRequest.user_id).where(JoinRequest.project_id == project_id)
+        requested = set((await session.execute(stmt)).scalars().all())
+
+        ranked = matching_index.candidates_for_project(project_id, max(1, min(k, 50)), requested)
+        if not ranked:
+            return []
+        stmt = select(User).where(User.id.in_([uid for uid, _ in ranked]))
+        users = {u.id: u for u in (await session.execute(stmt)).scalars().all()}
+
+    return [
+        {
+            "id": u.id,
+            "username": u.username,
+            "first_name": u.first_name,
+            "last_name": u.last_name,
+            "avatar_url": u.avatar_url,
+            "primary_role": u.primary_role,
+            "level": u.level,
+            "timezone": u.timezone,
+            "weekly_availability": u.weekly_availability,
+            "match_score": score
+        }
+        for uid, score in ranked
+        if (u := users.get(uid))
+    ]
+
 @router.post("/{project_id}/join", status_code=status.HTTP_201_CREATED)
-async def join_project(project_id: int, access_token: str = Cookie(None)):
+async def join_project(project_id: int, user_id: int = Depends(get_current_user_id)):
     """
     Request to join a project.
     """
     from ..models.join_request import JoinRequest
 
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         # Check if project exists
         project = await session.get(Project, project_id)
@@ -470,20 +495,26 @@ async def join_project(project_id: int, access_token: str = Cookie(None)):
         )
         
         session.add(join_req)
+        await session.flush()
+        applicant = await load_user_snapshot(user_id)
+        message = await notify(
+            session, project.owner_id, "join_request", project_id=project_id, actor_id=user_id,
+            subject_id=join_req.id, project_title=project.title,
+            username=applicant.username if applicant else None
+        )
         await session.commit()
+        await deliver([message])
         
         return {"status": "success", "message": "Join request sent"}
 
 @router.get("/{project_id}/members", response_model=List[dict])
-async def list_project_members(project_id: int, access_token: str = Cookie(None)):
+async def list_project_members(project_id: int, user_id: int = Depends(get_current_user_id)):
     """
-    List all accepted members of a project (including owner).
+    List all members of a project (owner first).
     """
-    from ..models.join_request import JoinRequest
+    from ..models.task import Task
+    from sqlalchemy import case
 
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
     # We don't strictly enforce that the requester is a member to view members, 
     # but for privacy maybe we should? For now, let's allow it if they are logged in.
     
@@ -492,72 +523,44 @@ async def list_project_members(project_id: int, access_token: str = Cookie(None)
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
 
-        # 1. Get Owner
-        owner = await session.get(User, project.owner_id)
-        
-        # Helper to get stats
-        from ..models.task import Task
-        async def get_stats(uid):
-            total_stmt = select(Task).where(Task.project_id == project_id, Task.assigned_to == uid)
-            all_tasks = (await session.execute(total_stmt)).scalars().all()
-            return {
-                "tasks_done": len([t for t in all_tasks if t.status == "done"]),
-                "tasks_active": len([t for t in all_tasks if t.status != "done"])
-            }
-
-        owner_stats = await get_stats(owner.id)
-
-        members = [{
-            "id": owner.id,
-            "username": owner.username,
-            "first_name": owner.first_name,
-            "last_name": owner.last_name,
-            "avatar_url": owner.avatar_url,
-            "role": "Owner",
-            "primary_role": owner.primary_role,
-            "level": owner.level,
-            "skills": owner.skills,
-            "stats": owner_stats
-        }]
-
-        # 2. Get Accepted Join Requests
-        stmt = select(JoinRequest).where(
-            JoinRequest.project_id == project_id, 
-            JoinRequest.status == "accepted"
-        )
-        join_requests = (await session.execute(stmt)).scalars().all()
-
-        for req in join_requests:
-            user = await session.get(User, req.user_id)
-            if user:
-                 user_stats = await get_stats(user.id)
-                 members.append({
-                    "id": user.id,
-                    "username": user.username,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                    "avatar_url": user.avatar_url,
-                    "role": "Member",
-                    "primary_role": user.primary_role,
-                    "level": user.level,
-                    "skills": user.skills,
-                    "stats": user_stats
-                })
+        stmt = select(TeamMember, User).join(User, User.id == TeamMember.user_id).where(
+            TeamMember.project_id == project_id
+        ).order_by((TeamMember.role == "owner").desc(), TeamMember.joined_at)
+        rows = (await session.execute(stmt)).all()
+
+        # Task stats for every member in one grouped query
+        done = func.sum(case((Task.status == "done", 1), else_=0))
+        stats_stmt = select(Task.assigned_to, done, func.count(Task.id)).where(
+            Task.project_id == project_id,
+            Task.assigned_to.is_not(None)
+        ).group_by(Task.assigned_to)
+        stats = {uid: (d or 0, total - (d or 0)) for uid, d, total in (await session.execute(stats_stmt)).all()}
+
+        members = []
+        for member, user in rows:
+            tasks_done, tasks_active = stats.get(user.id, (0, 0))
+            members.append({
+                "id": user.id,
+                "username": user.username,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "avatar_url": user.avatar_url,
+                "role": "Owner" if member.role == "owner" else "Member",
+                "primary_role": user.primary_role,
+                "level": user.level,
+                "skills": user.skills,
+                "stats": {"tasks_done": tasks_done, "tasks_active": tasks_active}
+            })
         
         return members
 
 @router.get("/{project_id}/requests", response_model=List[dict])
-async def list_project_requests(project_id: int, access_token: str = Cookie(None)):
+async def list_project_requests(project_id: int, user_id: int = Depends(get_current_user_id)):
     """
     List pending join requests (Owner only).
     """
     from ..models.join_request import JoinRequest
 
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         project = await session.get(Project, project_id)
         if not project:
@@ -571,10 +574,16 @@ async def list_project_requests(project_id: int, access_token: str = Cookie(None
             JoinRequest.status == "pending"
         )
         requests = (await session.execute(stmt)).scalars().all()
+
+        # Applicants in one query rather than one per request
+        applicant_ids = {req.user_id for req in requests}
+        users = {}
+        if applicant_ids:
+            users = {u.id: u for u in (await session.execute(select(User).where(User.id.in_(applicant_ids)))).scalars().all()}
         
         result = []
         for req in requests:
-            user = await session.get(User, req.user_id)
+            user = users.get(req.user_id)
             if user:
                 result.append({
                     "request_id": req.id,
@@ -596,18 +605,13 @@ async def list_project_requests(project_id: int, access_token: str = Cookie(None
         return result
 
 @router.post("/{project_id}/requests/{request_id}/{action}")
-async def handle_join_request(project_id: int, request_id: int, action: str, access_token: str = Cookie(None)):
+async def handle_join_request(project_id: int, request_id: int, action: str, user_id: int = Depends(get_current_user_id)):
     """
     Accept or reject a join request (Owner only).
     Action must be 'accept' or 'reject'.
     """
     from ..models.join_request import JoinRequest
 
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     if action not in ["accept", "reject"]:
         raise HTTPException(status_code=400, detail="Invalid action")
 
@@ -628,98 +632,79 @@ async def handle_join_request(project_id: int, request_id: int, action: str, acc
         if req.project_id != project_id:
              raise HTTPException(status_code=400, detail="Request does not belong to this project")
 
+        became_team = False
         if action == "accept":
             req.status = "accepted"
             # If this was a solo project, upgrade it to team?
             if project.type == "solo":
                 project.type = "team"
                 session.add(project)
+                became_team = True
+            if await add_member(session, project, req.user_id):
+                record_activity(session, project_id, req.user_id, "member_joined", subject_id=req.user_id)
         else:
             req.status = "rejected"
             
         session.add(req)
+        message = await notify(
+            session, req.user_id, "join_accepted" if action == "accept" else "join_rejected",
+            project_id=project_id, actor_id=user_id, subject_id=request_id, project_title=project.title
+        )
+        applicant_id = req.user_id
         await session.commit()
+        if became_team:
+            # Now listed for matching like any other team project
+            await session.refresh(project)
+            matching_index.update_project(project)
+        if action == "accept":
+            # Both now see the team channel
+            invalidate_user_channels(applicant_id, user_id)
+        await deliver([message])
+        # The owner's "new request" notification is dealt with
+        await mark_read(user_id, kind="join_request", subject_id=request_id)
         
         return {"status": "success", "action": action}
 
 @router.get("/teams/mine", response_model=List[dict])
-async def list_my_teams(access_token: str = Cookie(None)):
+async def list_my_teams(user_id: int = Depends(get_current_user_id)):
     """
     List all 'team' projects the current user is part of (Owner OR Member).
     """
-    from ..models.join_request import JoinRequest
-    from ..models.task import Task
-    from sqlalchemy import or_
-
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
-        # 1. Projects I own that are type='team'
-        stmt_owned = select(Project).where(
-            Project.owner_id == user_id, 
+        stmt = select(Project, TeamMember.role).join(TeamMember, TeamMember.project_id == Project.id).where(
+            TeamMember.user_id == user_id,
             Project.type == "team"
         )
-        owned_projects = (await session.execute(stmt_owned)).scalars().all()
+        memberships = (await session.execute(stmt)).all()
+        if not memberships:
+            return []
 
-        # 2. Projects I have joined (status='accepted')
-        stmt_joined = select(Project).join(JoinRequest).where(
-            JoinRequest.user_id == user_id,
-            JoinRequest.status == "accepted"
-        )
-        joined_projects = (await session.execute(stmt_joined)).scalars().all()
+        # We'll use the User's primary_role from their profile for display
+        user = await session.get(User, user_id)
+        display_role = user.primary_role if user else "Member"
+
+        # Member avatars for the circles: owner first, then earliest joiners
+        project_ids = [p.id for p, _ in memberships]
+        preview_stmt = select(TeamMember.project_id, User).join(User, User.id == TeamMember.user_id).where(
+            TeamMember.project_id.in_(project_ids)
+        ).order_by(TeamMember.project_id, (TeamMember.role == "owner").desc(), TeamMember.joined_at)
+        previews = {}
+        for project_id, member in (await session.execute(preview_stmt)).all():
+            members = previews.setdefault(project_id, [])
+            if len(members) < 4:
+                members.append({"id": member.id, "username": member.username, "avatar_url": member.avatar_url})
 
-        # Combine and deduplicate (though logic shouldn't overlap usually, unless I joined my own project which is blocked)
-        all_projects = list({p.id: p for p in (owned_projects + joined_projects)}.values())
-        
         results = []
-        for project in all_projects:
-            # Get Member Count
-            count_stmt = select(JoinRequest).where(
-                JoinRequest.project_id == project.id, 
-                JoinRequest.status == "accepted"
-            )
-            accepted_requests = (await session.execute(count_stmt)).scalars().all()
-            members_count = 1 + len(accepted_requests)
-
-            # Get User Role in this project
-            is_owner = (project.owner_id == user_id)
-            user_role_in_project = "Owner"
-            if not is_owner:
-                # Find the specific request to see if there's any specialized role info? 
-                # For now just 'Member' or fetch from User profile
-                 user_role_in_project = "Member"
-
-            # Get User's specific info for this project (e.g. assigned role if we had one in JoinRequest? No.)
-            # We'll use the User's primary_role from their profile for display
-            user = await session.get(User, user_id)
-            display_role = user.primary_role if user else "Member"
-
-            # Get some member avatars (for the circles)
-            # Owner
-            owner = await session.get(User, project.owner_id)
-            preview_members = [owner]
-            # Add up to 3 others
-            for req in accepted_requests[:3]:
-                m = await session.get(User, req.user_id)
-                if m: preview_members.append(m)
-            
-            # Deduplicate just in case
-            preview_members = list({u.id: u for u in preview_members}.values())
-
+        for project, role in memberships:
+            is_owner = role == "owner"
             results.append({
                 "id": project.id,
                 "title": project.title,
                 "description": project.description,
                 "stack": project.stack,
                 "user_role": display_role if not is_owner else "Team Lead", # Mock logic for "Your Role"
-                "members_count": members_count,
-                "preview_members": [
-                    {"id": m.id, "username": m.username, "avatar_url": m.avatar_url} 
-                    for m in preview_members[:4]
-                ]
+                "members_count": project.members_count,
+                "preview_members": previews.get(project.id, [])
             })
 
         return results
@@ -729,15 +714,12 @@ class BrainstormRequest(BaseModel):
     level: str = "Junior"
 
 @router.post("/brainstorm")
-async def brainstorm_project(request: BrainstormRequest, access_token: str | None = Cookie(default=None, alias="access_token")):
+async def brainstorm_project(request: BrainstormRequest, user_id: int = Depends(get_current_user_id)):
     """
     Brainstorm project ideas based on the provided stack and level.
     """
     from ..core.ai import generate_brainstorm_ideas
     
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
     ideas = await generate_brainstorm_ideas(request.stack, request.level)
     return ideas
 
@@ -1,46 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Cookie
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from sqlalchemy import func, update
+from sqlalchemy.orm.exc import StaleDataError
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import List
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
 from ..core.database import get_async_session
+from ..core.task_order import NoGap, position_between, rebalance
+from ..core.task_sync import add_generated_tasks, board_manager, catch_up, changed_fields, latest_seq, publish, record_events, snapshot
+from ..core.membership import is_member
+from ..core.activity import record_activity
+from ..core.conditional import etag_matches
+from ..core.versioning import check_if_match, conflict, flush_or_conflict, version_etag
 from ..models.task import Task
 from ..models.project import Project
+from ..models.team_member import TeamMember
 from ..core.ai import break_down_tasks, generate_task_guide
-from ..api.auth import decode_jwt_token
+from ..core.usage import record_cache_hit
+from ..api.auth import get_current_user_id, websocket_user_id
 
 router = APIRouter()
 
+MAX_BULK_CHANGES = 200
+
+# Set by the server only
+READ_ONLY_FIELDS = {"id", "project_id", "created_at", "version"}
+
+class TaskChange(BaseModel):
+    """
+    One task's changes. Only fields that are sent are applied; send
+    `assigned_to: null` to unassign. Sending `after_id` and/or `before_id`
+    moves the task between those neighbours (null = start/end of the list).
+    Send `version` to have the change apply only if the task is still at
+    that version.
+    """
+    id: int
+    version: Optional[int] = None
+    status: Optional[Literal["todo", "in_progress", "done"]] = None
+    assigned_to: Optional[int] = None
+    after_id: Optional[int] = None
+    before_id: Optional[int] = None
+
+    @property
+    def moves(self) -> bool:
+        return bool({"after_id", "before_id"} & self.model_fields_set)
+
+class BulkTaskUpdate(BaseModel):
+    changes: List[TaskChange] = Field(..., min_length=1, max_length=MAX_BULK_CHANGES)
+
 @router.get("/{project_id}", response_model=List[Task])
-async def list_tasks(project_id: int, access_token: str = Cookie(None)):
-    """List tasks for a project (only if user owns the project)."""
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
+async def list_tasks(project_id: int, request: Request, response: Response, user_id: int = Depends(get_current_user_id)):
+    """
+    List tasks for a project (only if user is on the team). X-Task-Seq is
+    the board's change-log position to resume the live channel from.
+    Supports If-None-Match: an unchanged board costs one aggregate query.
+    """
     async with get_async_session() as session:
-        # Verify project ownership
-        proj_stmt = select(Project).where(Project.id == project_id, Project.owner_id == user_id)
-        proj_res = await session.execute(proj_stmt)
-        project = proj_res.scalar_one_or_none()
-        
-        if not project:
+        # Verify team membership
+        if not await is_member(session, project_id, user_id):
             raise HTTPException(status_code=404, detail="Project not found")
-        
+
+        # Read the cursor first: anything committed after it is replayed
+        seq = await latest_seq(session, project_id)
+        # Creates and deletes advance the log, every update bumps a version
+        count, versions = (await session.execute(
+            select(func.count(Task.id), func.coalesce(func.sum(Task.version), 0)).where(Task.project_id == project_id)
+        )).one()
+        headers = {
+            "ETag": f'"{seq}-{count}-{versions}"',
+            "Cache-Control": "private, no-cache",
+            "X-Task-Seq": str(seq),
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+
         stmt = select(Task).where(Task.project_id == project_id).order_by(Task.order)
         result = await session.execute(stmt)
         return result.scalars().all()
 
 @router.post("/{project_id}/generate", response_model=List[Task])
-async def generate_tasks(project_id: int, access_token: str = Cookie(None)):
+async def generate_tasks(project_id: int, user_id: int = Depends(get_current_user_id)):
     """
     Generate tasks for a project using AI.
     """
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         # Verify the project exists and belongs to the user
         proj_stmt = select(Project).where(Project.id == project_id, Project.owner_id == user_id)
@@ -56,33 +99,112 @@ async def generate_tasks(project_id: int, access_token: str = Cookie(None)):
             stack=project.stack
         )
 
-        db_tasks = []
-        for t in ai_tasks:
-            db_task = Task(
-                project_id=project_id,
-                title=t["title"],
-                description=t["description"],
-                order=t["order"]
+        db_tasks, messages = await add_generated_tasks(session, project_id, ai_tasks)
+        ids = [task.id for task in db_tasks]
+        await session.commit()
+        await publish(project_id, messages)
+
+        # Reload the committed tasks in one query rather than one refresh each
+        stmt = select(Task).where(Task.id.in_(ids)).order_by(Task.order)
+        return (await session.execute(stmt)).scalars().all()
+
+@router.post("/{project_id}/bulk", response_model=List[Task])
+async def bulk_update_tasks(project_id: int, update: BulkTaskUpdate, user_id: int = Depends(get_current_user_id)):
+    """
+    Apply a batch of status / assignee / position changes in one transaction
+    (all or nothing). Changes are applied in the order given, so a board can
+    send its drag-and-drop moves as they happened. Returns the changed tasks.
+    """
+    changes = update.changes
+    async with get_async_session() as session:
+        # Verify project ownership (once for the whole batch)
+        proj_stmt = select(Project).where(Project.id == project_id, Project.owner_id == user_id)
+        if not (await session.execute(proj_stmt)).scalar_one_or_none():
+            raise HTTPException(status_code=404, detail="Project not found")
+
+        # Changed tasks and their neighbours in one query
+        ids = {c.id for c in changes}
+        ids |= {n for c in changes for n in (c.after_id, c.before_id) if n is not None}
+        stmt = select(Task).where(Task.project_id == project_id, Task.id.in_(ids))
+        tasks = {t.id: t for t in (await session.execute(stmt)).scalars().all()}
+        missing = ids - tasks.keys()
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Tasks not found in this project: {sorted(missing)}")
+
+        assignees = {c.assigned_to for c in changes if "assigned_to" in c.model_fields_set and c.assigned_to is not None}
+        if assignees:
+            member_stmt = select(TeamMember.user_id).where(
+                TeamMember.project_id == project_id,
+                TeamMember.user_id.in_(assignees)
             )
-            session.add(db_task)
-            db_tasks.append(db_task)
-        
+            invalid = assignees - set((await session.execute(member_stmt)).scalars().all())
+            if invalid:
+                raise HTTPException(status_code=400, detail=f"Not members of this project: {sorted(invalid)}")
+
+        stale = [tasks[c.id] for c in changes if c.version is not None and c.version != tasks[c.id].version]
+        if stale:
+            raise conflict(stale)
+
+        snapshots = {task_id: snapshot(task) for task_id, task in tasks.items()}
+        for change in changes:
+            task = tasks[change.id]
+            if change.status is not None:
+                task.status = change.status
+            if "assigned_to" in change.model_fields_set:
+                task.assigned_to = change.assigned_to
+            if change.moves:
+                if change.id in (change.after_id, change.before_id):
+                    raise HTTPException(status_code=400, detail="A task cannot be its own neighbour")
+                after = tasks[change.after_id].order if change.after_id is not None else None
+                before = tasks[change.before_id].order if change.before_id is not None else None
+                if after is not None and before is not None and after > before:
+                    raise HTTPException(status_code=400, detail="after_id must come before before_id")
+                try:
+                    task.order = position_between(after, before)
+                except NoGap:
+                    # Rare: respace the whole list, then retry against the new values
+                    all_stmt = select(Task).where(Task.project_id == project_id).order_by(Task.order, Task.id)
+                    all_tasks = (await session.execute(all_stmt)).scalars().all()
+                    for other in all_tasks:
+                        snapshots.setdefault(other.id, snapshot(other))
+                        tasks.setdefault(other.id, other)
+                    rebalance(all_tasks)
+                    try:
+                        task.order = position_between(tasks[change.after_id].order, tasks[change.before_id].order)
+                    except NoGap:
+                        # Tied orders that rebalanced the other way round: the neighbours were given inverted
+                        raise HTTPException(status_code=400, detail="after_id must come before before_id")
+            session.add(task)
+
+        try:
+            await session.flush()
+        except StaleDataError:
+            # A concurrent write changed one of these tasks since we read it
+            await session.rollback()
+            stmt = select(Task).where(Task.id.in_([c.id for c in changes])).execution_options(populate_existing=True)
+            raise conflict((await session.execute(stmt)).scalars().all())
+
+        # One delta per touched task, including neighbours moved by a rebalance
+        deltas = {task_id: changed_fields(snapshots[task_id], task) for task_id, task in tasks.items()}
+        messages = await record_events(session, project_id, [(task_id, "update", d) for task_id, d in deltas.items()])
+        for task_id, delta in deltas.items():
+            if "status" in delta:
+                record_activity(session, project_id, user_id, "task_status", subject_id=task_id,
+                                title=tasks[task_id].title, status=delta["status"])
         await session.commit()
-        
-        # Refresh all tasks to get IDs
-        for task in db_tasks:
-            await session.refresh(task)
-        
-        return db_tasks
+        await publish(project_id, messages)
+
+        changed_ids = [c.id for c in changes]
+        stmt = select(Task).where(Task.id.in_(changed_ids)).order_by(Task.order)
+        return (await session.execute(stmt)).scalars().all()
 
 @router.patch("/{task_id}", response_model=Task)
-async def update_task(task_id: int, task_update: dict, access_token: str = Cookie(None)):
-    """Update a task status."""
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
+async def update_task(task_id: int, task_update: dict, request: Request, response: Response, user_id: int = Depends(get_current_user_id)):
+    """
+    Update a task status. Send If-Match with the task's version ETag
+    ("<version>") to get a 409 with the current task instead of
+    overwriting someone else's change.
+    """
     async with get_async_session() as session:
         stmt = select(Task).where(Task.id == task_id)
         result = await session.execute(stmt)
@@ -97,23 +219,29 @@ async def update_task(task_id: int, task_update: dict, access_token: str = Cooki
         if not proj_res.scalar_one_or_none():
             raise HTTPException(status_code=403, detail="Not authorized")
         
+        check_if_match(request, db_task)
+        before = snapshot(db_task)
         for key, value in task_update.items():
-            if hasattr(db_task, key):
+            if hasattr(db_task, key) and key not in READ_ONLY_FIELDS:
                 setattr(db_task, key, value)
         
         session.add(db_task)
+        # UPDATE ... WHERE version = <read version>
+        await flush_or_conflict(session, Task, task_id)
+        delta = changed_fields(before, db_task)
+        messages = await record_events(session, db_task.project_id, [(db_task.id, "update", delta)])
+        if "status" in delta:
+            record_activity(session, db_task.project_id, user_id, "task_status", subject_id=db_task.id,
+                            title=db_task.title, status=delta["status"])
         await session.commit()
         await session.refresh(db_task)
+        await publish(db_task.project_id, messages)
+        response.headers["ETag"] = version_etag(db_task.version)
         return db_task
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(task_id: int, access_token: str = Cookie(None)):
-    """Delete a task."""
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
+async def delete_task(task_id: int, request: Request, user_id: int = Depends(get_current_user_id)):
+    """Delete a task (honours If-Match like PATCH)."""
     async with get_async_session() as session:
         stmt = select(Task).where(Task.id == task_id)
         result = await session.execute(stmt)
@@ -128,17 +256,59 @@ async def delete_task(task_id: int, access_token: str = Cookie(None)):
         if not proj_res.scalar_one_or_none():
             raise HTTPException(status_code=403, detail="Not authorized")
         
+        check_if_match(request, db_task)
+        project_id = db_task.project_id
         await session.delete(db_task)
+        await flush_or_conflict(session, Task, task_id)
+        messages = await record_events(session, project_id, [(task_id, "delete", {})])
         await session.commit()
+        await publish(project_id, messages)
+
+@router.websocket("/ws/{project_id}")
+async def board_websocket(
+    websocket: WebSocket,
+    project_id: int,
+    since: Optional[int] = Query(None),
+    token: Optional[str] = Query(None)
+):
+    """
+    Live task deltas for team members:
+    {"type": "task", "seq", "op": "create|update|delete", "task_id", "fields"}.
+    Reconnect with `since` = the last seq seen (or X-Task-Seq from the task
+    list) to replay what was missed; {"type": "resync", "seq"} means refetch
+    the list instead.
+    """
+    await websocket.accept()
+    user_id = websocket_user_id(websocket, token)
+
+    async with get_async_session() as session:
+        if user_id is None or not await is_member(session, project_id, user_id):
+            await websocket.close(code=1008)
+            return
+
+        # Register before reading the log so nothing falls in between;
+        # the client ignores deltas it has already applied (by seq)
+        await board_manager.connect(websocket, project_id)
+        missed = await catch_up(session, project_id, since) if since is not None else None
+        seq = await latest_seq(session, project_id)
+
+    try:
+        if missed is None:
+            await websocket.send_json({"type": "resync", "seq": seq})
+        else:
+            for message in missed:
+                await websocket.send_json(message)
+        while True:
+            # Nothing is expected from the client; this just waits for the close
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        board_manager.disconnect(websocket, project_id)
 
 @router.post("/{task_id}/guide", response_model=dict)
-async def get_task_guide(task_id: int, force: bool = False, access_token: str = Cookie(None)):
+async def get_task_guide(task_id: int, force: bool = False, user_id: int = Depends(get_current_user_id)):
     """Generate or retrieve a detailed guide for a task."""
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user_id = decode_jwt_token(access_token)
-    
     async with get_async_session() as session:
         # Get task
         stmt = select(Task).where(Task.id == task_id)
@@ -158,6 +328,7 @@ async def get_task_guide(task_id: int, force: bool = False, access_token: str =
 
         # Return existing content if available and not forced
         if task.content and not force:
+            record_cache_hit("generate_task_guide")
             return {"content": task.content}
             
         # Generate new guide
@@ -167,8 +338,11 @@ async def get_task_guide(task_id: int, force: bool = False, access_token: str =
             stack=project.stack
         )
         
-        task.content = guide
-        session.add(task)
+        # The guide is cached output, not an edit: store it without bumping the
+        # task's version, or clients holding that version would get a 409
+        await session.execute(
+            update(Task).where(Task.id == task_id).values(content=guide).execution_options(synchronize_session=False)
+        )
         await session.commit()
         
         return {"content": guide}
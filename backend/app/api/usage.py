@@ -0,0 +1,105 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import select, func
+from sqlalchemy import case
+from datetime import datetime, timedelta
+from ..core.database import get_async_session
+from ..core.usage import usage_recorder
+from ..models.ai_usage import AIUsage
+from ..api.auth import get_current_user_id
+
+router = APIRouter()
+
+# Comma-separated user ids allowed to see platform-wide usage reports
+ADMIN_USER_IDS = {int(x) for x in os.getenv("ADMIN_USER_IDS", "").split(",") if x.strip().isdigit()}
+
+def _aggregate_columns():
+    return (
+        func.count(AIUsage.id).label("calls"),
+        func.coalesce(func.sum(AIUsage.prompt_tokens), 0).label("prompt_tokens"),
+        func.coalesce(func.sum(AIUsage.completion_tokens), 0).label("completion_tokens"),
+        func.coalesce(func.avg(AIUsage.latency_ms), 0).label("avg_latency_ms"),
+        func.coalesce(func.max(AIUsage.latency_ms), 0).label("max_latency_ms"),
+        func.coalesce(func.sum(case((AIUsage.outcome.in_(("error", "parse_error")), 1), else_=0)), 0).label("errors"),
+        func.coalesce(func.sum(case((AIUsage.cache_hit == True, 1), else_=0)), 0).label("cache_hits"),  # noqa: E712
+        func.coalesce(func.sum(AIUsage.retries), 0).label("retries"),
+    )
+
+def _row_to_dict(row, *keys) -> dict:
+    data = dict(zip(keys, row[:len(keys)]))
+    calls, prompt, completion, avg_latency, max_latency, errors, cache_hits, retries = row[len(keys):]
+    data.update({
+        "calls": calls,
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": prompt + completion,
+        "avg_latency_ms": round(float(avg_latency)),
+        "max_latency_ms": max_latency,
+        "errors": errors,
+        "error_rate": round(errors / calls, 4) if calls else 0.0,
+        "cache_hits": cache_hits,
+        "retries": retries,
+    })
+    return data
+
+async def require_admin(user_id: int = Depends(get_current_user_id)) -> int:
+    if user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return user_id
+
+@router.get("/me")
+async def get_my_usage(since_hours: int = 24 * 30, user_id: int = Depends(get_current_user_id)):
+    """
+    AI usage of the current user, grouped by function.
+    """
+    since = datetime.utcnow() - timedelta(hours=since_hours)
+    await usage_recorder.flush()
+
+    async with get_async_session() as session:
+        stmt = select(AIUsage.function, *_aggregate_columns()).where(
+            AIUsage.user_id == user_id,
+            AIUsage.created_at >= since
+        ).group_by(AIUsage.function)
+        rows = (await session.execute(stmt)).all()
+
+    by_function = [_row_to_dict(r, "function") for r in rows]
+    return {
+        "since": since,
+        "total_tokens": sum(r["total_tokens"] for r in by_function),
+        "calls": sum(r["calls"] for r in by_function),
+        "by_function": by_function
+    }
+
+@router.get("/endpoints")
+async def get_usage_by_endpoint(since_hours: int = 24 * 7, user_id: int = Depends(require_admin)):
+    """
+    Platform-wide AI usage per endpoint and function, most expensive first (admins only).
+    """
+    since = datetime.utcnow() - timedelta(hours=since_hours)
+    await usage_recorder.flush()
+
+    async with get_async_session() as session:
+        stmt = select(AIUsage.endpoint, AIUsage.function, *_aggregate_columns()).where(
+            AIUsage.created_at >= since
+        ).group_by(AIUsage.endpoint, AIUsage.function)
+        rows = (await session.execute(stmt)).all()
+
+    results = [_row_to_dict(r, "endpoint", "function") for r in rows]
+    return sorted(results, key=lambda r: r["total_tokens"], reverse=True)
+
+@router.get("/users")
+async def get_usage_by_user(since_hours: int = 24 * 7, limit: int = 50, user_id: int = Depends(require_admin)):
+    """
+    Top AI consumers by total tokens (admins only).
+    """
+    since = datetime.utcnow() - timedelta(hours=since_hours)
+    await usage_recorder.flush()
+
+    total = (func.coalesce(func.sum(AIUsage.prompt_tokens), 0) + func.coalesce(func.sum(AIUsage.completion_tokens), 0))
+    async with get_async_session() as session:
+        stmt = select(AIUsage.user_id, *_aggregate_columns()).where(
+            AIUsage.created_at >= since
+        ).group_by(AIUsage.user_id).order_by(total.desc()).limit(max(1, min(limit, 500)))
+        rows = (await session.execute(stmt)).all()
+
+    return [_row_to_dict(r, "user_id") for r in rows]
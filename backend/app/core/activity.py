@@ -0,0 +1,72 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import delete, union_all
+from sqlmodel import select
+from .database import get_async_session
+from ..models.activity import Activity
+from ..models.user import User
+
+FEED_PAGE_SIZE = 30
+MAX_FEED_PAGE_SIZE = 100
+ACTIVITY_RETENTION_DAYS = int(os.getenv("ACTIVITY_RETENTION_DAYS", "90"))
+
+
+def record_activity(session, project_id: int, actor_id: int, kind: str, subject_id: int | None = None, **data):
+    """Append an event to the project's stream in `session` (the caller commits)."""
+    session.add(Activity(project_id=project_id, actor_id=actor_id, kind=kind, subject_id=subject_id, data=data))
+
+
+def _stream_ids(project_id: int, before: Optional[int], limit: int):
+    """Newest-first ids of one project's stream, served by (project_id, id)."""
+    stmt = select(Activity.id).where(Activity.project_id == project_id)
+    if before is not None:
+        stmt = stmt.where(Activity.id < before)
+    return stmt.order_by(Activity.id.desc()).limit(limit)
+
+
+async def feed_page(session, project_ids: Sequence[int], before: Optional[int], limit: int) -> Tuple[List[Activity], Optional[int]]:
+    """
+    One page across several projects and the cursor for the next one
+    (None at the end). No page can take more than `limit` events from a
+    stream, so each stream is read at most `limit + 1` deep; the streams
+    are read and merged in a single UNION ALL statement.
+    """
+    if not project_ids:
+        return [], None
+    streams = [select(_stream_ids(project_id, before, limit + 1).subquery().c.id) for project_id in project_ids]
+    ids = streams[0] if len(streams) == 1 else union_all(*streams)
+    stmt = select(Activity).where(Activity.id.in_(ids)).order_by(Activity.id.desc()).limit(limit + 1)
+    events = (await session.execute(stmt)).scalars().all()
+    if len(events) > limit:
+        return events[:limit], events[limit - 1].id
+    return events, None
+
+
+async def serialize_events(session, events: List[Activity], project_titles: Dict[int, str]) -> List[Dict[str, Any]]:
+    actor_ids = {event.actor_id for event in events}
+    actors = {}
+    if actor_ids:
+        users = (await session.execute(select(User).where(User.id.in_(actor_ids)))).scalars().all()
+        actors = {u.id: {"id": u.id, "username": u.username, "avatar_url": u.avatar_url} for u in users}
+    return [
+        {
+            "id": event.id,
+            "kind": event.kind,
+            "project": {"id": event.project_id, "title": project_titles.get(event.project_id)},
+            "actor": actors.get(event.actor_id),
+            "subject_id": event.subject_id,
+            "data": event.data,
+            "created_at": event.created_at.isoformat(),
+        }
+        for event in events
+    ]
+
+
+async def purge_activity() -> int:
+    """Drop events past the retention window. Returns the count."""
+    cutoff = datetime.utcnow() - timedelta(days=ACTIVITY_RETENTION_DAYS)
+    async with get_async_session() as session:
+        result = await session.execute(delete(Activity).where(Activity.created_at < cutoff))
+        await session.commit()
+    return result.rowcount
@@ -1,6 +1,18 @@
 import os
-import json
+import time
+import groq
 from groq import AsyncGroq
+from pydantic import BaseModel
+from typing import Any, AsyncIterator, Callable, List, Optional, Type, TypeVar
+from .llm_parsing import (
+    JSONExtractionError,
+    ProjectIdea,
+    IdeaList,
+    TaskBreakdown,
+    parse_model,
+)
+from .usage import usage_recorder
+from .tracing import end_span, set_attributes, span, start_span
 
 api_key = os.getenv("GROQ_API_KEY")
 if not api_key:
@@ -10,11 +22,107 @@ else:
     client = AsyncGroq(api_key=api_key)
     print("✅ Groq AI client initialized successfully!")
 
+MODEL = "llama-3.3-70b-versatile"
+# Ask the provider for JSON mode on structured calls (set GROQ_JSON_MODE=false to disable)
+JSON_MODE = os.getenv("GROQ_JSON_MODE", "true").lower() != "false"
+
+M = TypeVar("M", bound=BaseModel)
+
+def _elapsed_ms(started: float) -> int:
+    return int((time.perf_counter() - started) * 1000)
+
+async def _create_completion(function: str, retries: int = 0, parse: Optional[Callable[[str], Any]] = None, **kwargs):
+    """
+    Single entry point for non-streaming completions; records a usage row
+    (tokens, latency, retries, outcome) for every call. With `parse`, returns
+    parse(content) instead of the response, and output it rejects with
+    JSONExtractionError is recorded as a "parse_error".
+    """
+    started = time.perf_counter()
+    with span(f"groq {function}", kind="client", **{
+        "gen_ai.system": "groq", "gen_ai.request.model": kwargs.get("model"), "ai.function": function, "ai.retries": retries
+    }):
+        try:
+            response = await client.chat.completions.create(**kwargs)
+        except Exception as e:
+            usage_recorder.record(function, model=kwargs.get("model"), latency_ms=_elapsed_ms(started),
+                                  retries=retries, outcome="error", error=f"{type(e).__name__}: {e}")
+            raise
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        set_attributes(**{"gen_ai.usage.input_tokens": prompt_tokens, "gen_ai.usage.output_tokens": completion_tokens})
+        outcome, error, result = "ok", None, response
+        try:
+            if parse is not None:
+                result = parse(response.choices[0].message.content)
+        except JSONExtractionError as e:
+            outcome, error = "parse_error", str(e)
+            raise
+        finally:
+            usage_recorder.record(
+                function,
+                model=kwargs.get("model"),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                latency_ms=_elapsed_ms(started),
+                retries=retries,
+                outcome=outcome,
+                error=error
+            )
+    return result
+
+async def _complete_json(function: str, system: str, prompt: str, schema: Type[M], temperature: float, max_tokens: int, list_field: Optional[str] = None) -> M:
+    """
+    Run a chat completion that must return JSON and validate it into `schema`.
+    Uses provider JSON mode when enabled and salvages output the provider
+    rejected instead of throwing the paid generation away.
+    """
+    kwargs = {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    if JSON_MODE:
+        kwargs["response_format"] = {"type": "json_object"}
+
+    def parse(content: str) -> M:
+        return parse_model(content, schema, list_field)
+
+    try:
+        return await _create_completion(function, parse=parse, **kwargs)
+    except groq.BadRequestError as e:
+        if "response_format" not in kwargs:
+            raise
+        # JSON mode validation failed - the raw generation is still in the error body
+        failed = _failed_generation(e)
+        if failed:
+            try:
+                return parse(failed)
+            except JSONExtractionError:
+                pass
+        # Model does not support JSON mode (or output unrecoverable): plain retry
+        kwargs.pop("response_format")
+        return await _create_completion(function, retries=1, parse=parse, **kwargs)
+
+def _failed_generation(error: Exception) -> Optional[str]:
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        err = body.get("error", body)
+        if isinstance(err, dict):
+            return err.get("failed_generation")
+    return None
+
 async def generate_project_idea(stack: str, level: str, goal: str):
     """
     Generate a project idea using Groq AI based on user preferences.
     """
     if not client:
+        usage_recorder.record("generate_project_idea", outcome="offline")
         return {
             "title": "Example Project (No API Key)",
             "description": "Please set GROQ_API_KEY to get real AI-generated projects.",
@@ -37,24 +145,15 @@ async def generate_project_idea(stack: str, level: str, goal: str):
     """
     
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are an expert technical mentor who helps developers build real-world experience. Always respond with valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
+        idea = await _complete_json(
+            function="generate_project_idea",
+            system="You are an expert technical mentor who helps developers build real-world experience. Always respond with valid JSON only.",
+            prompt=prompt,
+            schema=ProjectIdea,
             temperature=0.7,
             max_tokens=500
         )
-        
-        content = response.choices[0].message.content
-        # Clean up response if needed
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        
-        return json.loads(content.strip())
+        return idea.model_dump()
     except Exception as e:
         print(f"Error generating project: {e}")
         return {
@@ -69,6 +168,7 @@ async def break_down_tasks(title: str, description: str, stack: str):
     Break a project into 5-7 actionable tasks using Groq AI.
     """
     if not client:
+        usage_recorder.record("break_down_tasks", outcome="offline")
         return [
             {"title": "Setup Project", "description": "Initialize repo and dependencies", "order": 1},
             {"title": "Build UI", "description": "Create frontend components", "order": 2},
@@ -91,25 +191,16 @@ async def break_down_tasks(title: str, description: str, stack: str):
     """
     
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a senior project manager who breaks down complex features into manageable developer tasks. Always respond with valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
+        result = await _complete_json(
+            function="break_down_tasks",
+            system="You are a senior project manager who breaks down complex features into manageable developer tasks. Always respond with valid JSON only.",
+            prompt=prompt,
+            schema=TaskBreakdown,
             temperature=0.7,
-            max_tokens=800
+            max_tokens=800,
+            list_field="tasks"
         )
-        
-        content = response.choices[0].message.content
-        # Clean up response if needed
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        
-        result = json.loads(content.strip())
-        return result.get("tasks", [])
+        return [t.model_dump() for t in result.tasks]
     except Exception as e:
         print(f"Error generating tasks: {e}")
         return []
@@ -119,6 +210,7 @@ async def generate_task_guide(task_title: str, task_description: str, stack: str
     Generate a detailed step-by-step implementation guide for a specific task.
     """
     if not client:
+        usage_recorder.record("generate_task_guide", outcome="offline")
         return "## Guide not available\n(AI service is offline or GROQ_API_KEY is missing)"
     
     prompt = f"""
@@ -143,8 +235,9 @@ async def generate_task_guide(task_title: str, task_description: str, stack: str
     """
     
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        response = await _create_completion(
+            "generate_task_guide",
+            model=MODEL,
             messages=[
                 {"role": "system", "content": "You are an expert friendly senior developer mentoring a junior. You provide clear, copy-pasteable code examples and specific instructions."},
                 {"role": "user", "content": prompt}
@@ -162,6 +255,7 @@ async def generate_brainstorm_ideas(stack: str, level: str = "Junior"):
     Generate 3 distinct project ideas based on the tech stack and difficulty level.
     """
     if not client:
+        usage_recorder.record("generate_brainstorm_ideas", outcome="offline")
         return [
             {
                 "title": "E-Commerce API (Dummy)",
@@ -199,24 +293,16 @@ async def generate_brainstorm_ideas(stack: str, level: str = "Junior"):
     """
     
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a creative technical mentor. Always respond with valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
+        result = await _complete_json(
+            function="generate_brainstorm_ideas",
+            system="You are a creative technical mentor. Always respond with valid JSON only.",
+            prompt=prompt,
+            schema=IdeaList,
             temperature=0.8,
-            max_tokens=800
+            max_tokens=800,
+            list_field="ideas"
         )
-        
-        content = response.choices[0].message.content
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        
-        result = json.loads(content.strip())
-        return result.get("ideas", [])
+        return [i.model_dump() for i in result.ideas]
     except Exception as e:
         print(f"Error brainstorming: {e}")
         return []
@@ -226,6 +312,7 @@ async def generate_personalized_ideas(role: str, level: str, skills: str):
     Generate 3 distinct project ideas based on the user's profile.
     """
     if not client:
+        usage_recorder.record("generate_personalized_ideas", outcome="offline")
         # Fallback if no API key
         return [
             {
@@ -263,24 +350,116 @@ async def generate_personalized_ideas(role: str, level: str, skills: str):
     """
     
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a career coach for software engineers. Always respond with valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
+        result = await _complete_json(
+            function="generate_personalized_ideas",
+            system="You are a career coach for software engineers. Always respond with valid JSON only.",
+            prompt=prompt,
+            schema=IdeaList,
             temperature=0.7,
-            max_tokens=800
+            max_tokens=800,
+            list_field="ideas"
         )
-        
-        content = response.choices[0].message.content
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        
-        result = json.loads(content.strip())
-        return result.get("ideas", [])
+        return [i.model_dump() for i in result.ideas]
     except Exception as e:
         print(f"Error generating suggestions: {e}")
         return []
+
+MENTOR_SYSTEM_PROMPT = (
+    "You are CoForge's AI mentor, a friendly senior developer helping a junior build real projects. "
+    "Give concise, practical answers with code snippets when useful. "
+    "Use the project context and conversation summary when they are relevant."
+)
+
+async def stream_mentor_reply(messages: List[dict]) -> AsyncIterator[str]:
+    """
+    Stream the mentor's reply for a prepared message list, yielding text deltas.
+    """
+    if not client:
+        usage_recorder.record("stream_mentor_reply", outcome="offline")
+        yield "I'm running in offline mode (GROQ_API_KEY is missing), so I can't give a real answer yet. "
+        yield "Try breaking the problem into smaller steps and tell me where you get stuck."
+        return
+
+    started = time.perf_counter()
+    # Not a current span: the generator yields between start and end
+    llm_span = start_span("groq stream_mentor_reply", kind="client", **{
+        "gen_ai.system": "groq", "gen_ai.request.model": MODEL, "ai.function": "stream_mentor_reply"
+    })
+    usage = None
+    output_chars = 0
+    try:
+        stream = await client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            temperature=0.6,
+            max_tokens=800,
+            stream=True
+        )
+        async for chunk in stream:
+            # Groq reports token usage on the final chunk
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None):
+                usage = x_groq.usage
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                output_chars += len(delta)
+                yield delta
+        prompt_tokens = usage.prompt_tokens if usage else sum(len(m["content"]) for m in messages) // 4
+        completion_tokens = usage.completion_tokens if usage else output_chars // 4
+        end_span(llm_span, **{"gen_ai.usage.input_tokens": prompt_tokens, "gen_ai.usage.output_tokens": completion_tokens})
+        usage_recorder.record(
+            "stream_mentor_reply",
+            model=MODEL,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_ms=_elapsed_ms(started)
+        )
+    except Exception as e:
+        print(f"Mentor chat error: {e}")
+        end_span(llm_span, error=e)
+        usage_recorder.record("stream_mentor_reply", model=MODEL, latency_ms=_elapsed_ms(started),
+                              outcome="error", error=f"{type(e).__name__}: {e}")
+        yield "\n\n(Sorry, I couldn't finish that answer. Please try again.)"
+    except GeneratorExit:
+        # The client went away mid-answer
+        end_span(llm_span, **{"ai.cancelled": True})
+        raise
+
+async def summarize_conversation(previous_summary: Optional[str], transcript: str, max_chars: int = 1200) -> str:
+    """
+    Fold older conversation turns into a short running summary.
+    """
+    if not client:
+        usage_recorder.record("summarize_conversation", outcome="offline")
+        # Offline: keep the most recent part of the transcript verbatim
+        combined = f"{previous_summary}\n{transcript}" if previous_summary else transcript
+        return combined[-max_chars:]
+
+    prompt = f"""
+    Update the running summary of a mentoring conversation between a developer and their AI mentor.
+    Keep facts about the developer's project, decisions made, open problems and code details that may matter later.
+    Write at most 150 words.
+    
+    Current summary:
+    {previous_summary or "(none)"}
+    
+    New turns:
+    {transcript}
+    """
+    
+    try:
+        response = await _create_completion(
+            "summarize_conversation",
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": "You write compact, factual conversation summaries."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            max_tokens=250
+        )
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"Error summarizing conversation: {e}")
+        combined = f"{previous_summary}\n{transcript}" if previous_summary else transcript
+        return combined[-max_chars:]
@@ -0,0 +1,163 @@
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert, inspect, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from .cache import TTLCache
+from .database import engine
+from .membership import is_member
+from .realtime import ConnectionManager
+from ..models.chat import Channel
+from ..models.project import Project
+from ..models.team_member import TeamMember
+
+DEFAULT_CHANNELS = [
+    {"name": "general", "description": "Platform-wide discussions", "type": "public"},
+    {"name": "help", "description": "Technical questions & support", "type": "public"},
+    {"name": "projects", "description": "Share ideas & find teammates", "type": "public"},
+    {"name": "learning", "description": "Resources & tutorials", "type": "public"},
+    {"name": "career", "description": "Jobs, internships & advice", "type": "public"},
+]
+
+# Per-user channel lists (public + the user's team channels). Membership
+# changes invalidate explicitly; the TTL only bounds cross-worker staleness.
+CHANNEL_LIST_TTL = int(os.getenv("CHANNEL_LIST_TTL", "300"))
+_user_channels = TTLCache(maxsize=10_000, ttl=CHANNEL_LIST_TTL)
+# Public channels only change at startup
+_public_channels: List[Dict[str, Any]] = []
+# channel id -> project id (None for public); channels never change scope
+_channel_scope = TTLCache(maxsize=50_000, ttl=24 * 3600)
+
+# Chat connections, keyed by channel id
+chat_manager = ConnectionManager("chat")
+
+
+def serialize_channel(channel: Channel) -> Dict[str, Any]:
+    return {
+        "id": channel.id,
+        "name": channel.name,
+        "description": channel.description,
+        "type": channel.type,
+        "project_id": channel.project_id,
+    }
+
+
+def prepare_channels():
+    """
+    Startup: add Channel.project_id to existing databases, seed the default
+    public channels and load them into memory.
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("channel")}
+    if "project_id" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE channel ADD COLUMN project_id INTEGER REFERENCES project (id)"))
+            conn.execute(text("CREATE UNIQUE INDEX ix_channel_project_id ON channel (project_id)"))
+
+    with Session(engine) as session:
+        existing = set(session.exec(select(Channel.name)).all())
+        for channel in DEFAULT_CHANNELS:
+            if channel["name"] not in existing:
+                session.add(Channel(**channel))
+        session.commit()
+        public = session.exec(select(Channel).where(Channel.project_id.is_(None)).order_by(Channel.id)).all()
+        _public_channels[:] = [serialize_channel(c) for c in public]
+
+
+def _project_channel(project: Project) -> Dict[str, Any]:
+    return {
+        "name": f"project-{project.id}",
+        "description": project.title,
+        "type": "project",
+        "project_id": project.id,
+        "created_at": datetime.utcnow(),
+    }
+
+
+async def channels_for_user(session, user_id: int) -> List[Dict[str, Any]]:
+    """
+    Public channels plus one private channel per team the user is on.
+    Team channels are created the first time a member's list is built.
+    """
+    cached = _user_channels.get(user_id)
+    if cached is not None:
+        return cached
+
+    stmt = select(Project, Channel).join(TeamMember, TeamMember.project_id == Project.id).outerjoin(
+        Channel, Channel.project_id == Project.id
+    ).where(TeamMember.user_id == user_id, Project.type == "team").order_by(Project.id)
+    rows = (await session.execute(stmt)).all()
+
+    # Built before any rollback, which would expire the projects
+    missing = [_project_channel(project) for project, channel in rows if channel is None]
+    if missing:
+        try:
+            # One multi-row INSERT; the rows are read back below
+            await session.execute(insert(Channel), missing)
+            await session.commit()
+        except IntegrityError:
+            # Another member created some concurrently (theirs are as good),
+            # which failed the whole batch: add the rest one at a time
+            await session.rollback()
+            for values in missing:
+                try:
+                    await session.execute(insert(Channel), [values])
+                    await session.commit()
+                except IntegrityError:
+                    await session.rollback()
+        rows = (await session.execute(stmt)).all()
+
+    team = [serialize_channel(channel) for _, channel in rows if channel is not None]
+    channels = _public_channels + team
+    # Never cache a list that is short of a team channel; the next call retries
+    if len(team) == len(rows):
+        _user_channels.set(user_id, channels)
+    return channels
+
+
+async def rename_project_channel(session, project_id: int, title: str):
+    """Keep a team channel's description in step with the project title (the caller commits)."""
+    await session.execute(update(Channel).where(Channel.project_id == project_id).values(description=title))
+    members = (await session.execute(
+        select(TeamMember.user_id).where(TeamMember.project_id == project_id)
+    )).scalars().all()
+    invalidate_user_channels(*members)
+
+
+async def close_team_channel(session, project_id: int):
+    """
+    Disconnect everyone from a team's channel after its membership shrank or
+    the project was deleted. Members who still have access reconnect.
+    """
+    channel_id = (await session.execute(
+        select(Channel.id).where(Channel.project_id == project_id)
+    )).scalar_one_or_none()
+    if channel_id is not None:
+        await chat_manager.close_topic(channel_id)
+
+
+def invalidate_user_channels(*user_ids: int):
+    for user_id in user_ids:
+        _user_channels.pop(user_id)
+
+
+async def channel_scope(session, channel_id: int) -> Tuple[bool, Optional[int]]:
+    """(exists, project id or None for public channels)."""
+    scope = _channel_scope.get(channel_id)
+    if scope is None:
+        channel = await session.get(Channel, channel_id)
+        if channel is None:
+            return False, None
+        scope = (channel.project_id,)
+        _channel_scope.set(channel_id, scope)
+    return True, scope[0]
+
+
+async def can_access(session, channel_id: int, user_id: int) -> Tuple[bool, Optional[int]]:
+    """(allowed, project id) for reading and posting in a channel."""
+    exists, project_id = await channel_scope(session, channel_id)
+    if not exists:
+        return False, None
+    if project_id is None:
+        return True, None
+    return await is_member(session, project_id, user_id), project_id
@@ -0,0 +1,207 @@
+import asyncio
+import bisect
+import heapq
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import delete, text
+from sqlmodel import select
+from .cache import TTLCache
+from .database import engine, get_async_session
+from .tracing import span
+from ..models.chat import Message, MessageSegment, Reaction
+
+# Messages older than this move from the hot table into compressed segments
+MESSAGE_ARCHIVE_AFTER_DAYS = int(os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", "30"))
+MESSAGE_SEGMENT_SIZE = int(os.getenv("MESSAGE_SEGMENT_SIZE", "500"))
+
+# Segments never change once written, so decoded ones can be kept as long as memory allows
+_segments = TTLCache(maxsize=int(os.getenv("MESSAGE_SEGMENT_CACHE_SIZE", "256")), ttl=24 * 3600)
+
+
+def migrate_message_archive():
+    """Idempotent startup migration: index the hot table for (channel_id, id) paging."""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_message_channel_id_id ON message (channel_id, id)"))
+
+
+def _record(message: Message) -> Dict[str, Any]:
+    return {
+        "id": message.id,
+        "user_id": message.user_id,
+        "content": message.content,
+        "parent_id": message.parent_id,
+        "created_at": message.created_at.isoformat(),
+    }
+
+
+def encode_segment(records: List[Dict[str, Any]]) -> bytes:
+    return zlib.compress(json.dumps(records, separators=(",", ":")).encode(), 9)
+
+
+def decode_segment(data: bytes) -> List[Dict[str, Any]]:
+    return json.loads(zlib.decompress(data))
+
+
+async def _load_segment(session, segment_id: int) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """(records, their ids) of one segment, both sorted by id."""
+    cached = _segments.get(segment_id)
+    if cached is None:
+        segment = await session.get(MessageSegment, segment_id)
+        records = decode_segment(segment.data)
+        cached = (records, [r["id"] for r in records])
+        _segments.set(segment_id, cached)
+    return cached
+
+
+async def _archived_page(session, channel_id: int, before: Optional[int], floor: Optional[int], limit: int) -> List[Dict[str, Any]]:
+    """
+    Up to `limit` archived messages below `before`, newest first. Segments
+    ending at or below `floor` cannot make the page, so are never opened.
+    """
+    stmt = select(MessageSegment.id, MessageSegment.last_message_id).where(MessageSegment.channel_id == channel_id)
+    if before is not None:
+        stmt = stmt.where(MessageSegment.first_message_id < before)
+    if floor is not None:
+        stmt = stmt.where(MessageSegment.last_message_id > floor)
+    segments = (await session.execute(stmt.order_by(MessageSegment.last_message_id.desc()))).all()
+
+    page: List[Dict[str, Any]] = []
+    for segment_id, last_id in segments:
+        # Newer segments come first; stop once nothing further down can place
+        if len(page) == limit and page[-1]["id"] > last_id:
+            break
+        records, ids = await _load_segment(session, segment_id)
+        end = len(ids) if before is None else bisect.bisect_left(ids, before)
+        page.extend(records[max(0, end - limit):end])
+        page.sort(key=lambda r: r["id"], reverse=True)
+        del page[limit:]
+    return page
+
+
+async def history_page(session, channel_id: int, before: Optional[int], limit: int) -> List[Dict[str, Any]]:
+    """
+    One page of a channel's history below message id `before`, newest
+    first, read across the hot table and the archive. Recent pages are
+    served by the hot table alone.
+    """
+    stmt = select(Message).where(Message.channel_id == channel_id)
+    if before is not None:
+        stmt = stmt.where(Message.id < before)
+    hot = [_record(m) for m in (await session.execute(stmt.order_by(Message.id.desc()).limit(limit))).scalars().all()]
+    floor = hot[-1]["id"] if len(hot) == limit else None
+    archived = await _archived_page(session, channel_id, before, floor, limit)
+    if not archived:
+        return hot
+    return list(islice(heapq.merge(hot, archived, key=lambda r: r["id"], reverse=True), limit))
+
+
+class MessageArchiver:
+    """
+    Moves chat messages past MESSAGE_ARCHIVE_AFTER_DAYS out of the hot
+    table into append-only MessageSegment rows, one short transaction per
+    segment. The hot table stays small however long a channel's history
+    gets, and archived history compresses several times over.
+    """
+
+    # Pause between segments so archiving yields to request traffic
+    BATCH_PAUSE = float(os.getenv("MESSAGE_ARCHIVE_BATCH_PAUSE", "0.05"))
+    POLL_INTERVAL = 3600.0
+
+    async def _archive_batch(self, channel_id: int, cutoff: datetime, after: int) -> Tuple[int, int]:
+        """
+        Archive the next run of old messages above id `after`. Returns
+        (messages scanned, last id scanned) so the caller can move on.
+        """
+        async with get_async_session() as session:
+            messages = (await session.execute(
+                select(Message).where(
+                    Message.channel_id == channel_id,
+                    Message.created_at < cutoff,
+                    Message.id > after
+                ).order_by(Message.id).limit(MESSAGE_SEGMENT_SIZE)
+            )).scalars().all()
+            if not messages:
+                return 0, after
+            scanned, last_scanned = len(messages), messages[-1].id
+
+            # A message that newer, still-hot replies point at stays hot until they age out too
+            ids = [m.id for m in messages]
+            pinned = set((await session.execute(
+                select(Message.parent_id).where(Message.parent_id.in_(ids), Message.id.not_in(ids))
+            )).scalars().all())
+            # ... and so does everything up its thread within this batch, or a
+            # pinned reply would point at an archived parent
+            parents = {m.id: m.parent_id for m in messages}
+            pending = list(pinned)
+            while pending:
+                parent_id = parents.get(pending.pop())
+                if parent_id in parents and parent_id not in pinned:
+                    pinned.add(parent_id)
+                    pending.append(parent_id)
+            messages = [m for m in messages if m.id not in pinned]
+            if not messages:
+                return scanned, last_scanned
+
+            ids = [m.id for m in messages]
+            reactions: Dict[int, List[List[Any]]] = {}
+            for reaction in (await session.execute(select(Reaction).where(Reaction.message_id.in_(ids)))).scalars().all():
+                reactions.setdefault(reaction.message_id, []).append([reaction.emoji, reaction.user_id])
+            records = []
+            for message in messages:
+                record = _record(message)
+                if message.id in reactions:
+                    record["reactions"] = reactions[message.id]
+                records.append(record)
+
+            session.add(MessageSegment(
+                channel_id=channel_id,
+                first_message_id=ids[0],
+                last_message_id=ids[-1],
+                message_count=len(ids),
+                first_created_at=messages[0].created_at,
+                last_created_at=messages[-1].created_at,
+                data=encode_segment(records),
+            ))
+            await session.execute(delete(Reaction).where(Reaction.message_id.in_(ids)))
+            deleted = (await session.execute(delete(Message).where(Message.id.in_(ids)))).rowcount
+            if deleted != len(ids):
+                # Another worker archived (or the purger removed) some of these first
+                await session.rollback()
+            else:
+                await session.commit()
+            return scanned, last_scanned
+
+    async def archive_channel(self, channel_id: int, cutoff: datetime):
+        after = 0
+        while True:
+            scanned, after = await self._archive_batch(channel_id, cutoff, after)
+            if scanned < MESSAGE_SEGMENT_SIZE:
+                return
+            await asyncio.sleep(self.BATCH_PAUSE)
+
+    async def archive_old(self):
+        """Archive every channel's messages past the threshold."""
+        cutoff = datetime.utcnow() - timedelta(days=MESSAGE_ARCHIVE_AFTER_DAYS)
+        async with get_async_session() as session:
+            channel_ids = (await session.execute(
+                select(Message.channel_id).where(Message.created_at < cutoff).distinct()
+            )).scalars().all()
+        for channel_id in channel_ids:
+            await self.archive_channel(channel_id, cutoff)
+
+    async def run(self):
+        """Background archive loop, started from the app lifespan."""
+        while True:
+            try:
+                with span("message_archiver.archive"):
+                    await self.archive_old()
+            except Exception as e:
+                print(f"Error archiving chat messages: {e}")
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+
+message_archiver = MessageArchiver()
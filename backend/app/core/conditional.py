@@ -0,0 +1,32 @@
+import hashlib
+import json
+from typing import Any
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+def render_json(data: Any) -> bytes:
+    """Serialize like FastAPI would, but once, so the bytes can be cached and hashed."""
+    return json.dumps(jsonable_encoder(data), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """True if an If-None-Match / If-Match header value names `etag`."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in header.split(","))
+
+
+def conditional_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """200 with `body`, or an empty 304 if the client already has `etag`."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
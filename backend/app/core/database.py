@@ -3,14 +3,23 @@ from sqlmodel import SQLModel, create_engine, Session
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from contextlib import asynccontextmanager
+from .tracing import end_span, start_span
 
 # Imports for SQLModel table creation
 from ..models.user import User
 from ..models.project import Project
 from ..models.task import Task
+from ..models.task_event import TaskEvent
+from ..models.activity import Activity
+from ..models.notification import Notification, NotificationCounter
 from ..models.join_request import JoinRequest
+from ..models.team_member import TeamMember
 from ..models.suggestion import ProjectSuggestion
-from ..models.chat import Channel, Message, Reaction
+from ..models.chat import Channel, Message, MessageSegment, Reaction
+from ..models.mentor import MentorConversation, MentorMessage
+from ..models.ai_usage import AIUsage
+from ..models.auth_token import RefreshToken, RevokedToken
+from ..models.profile import UserProfile, UserSkill
 
 # Default to SQLite for easy local dev
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///coforge.db")
@@ -47,5 +56,11 @@ def create_db_and_tables():
 
 @asynccontextmanager
 async def get_async_session() -> AsyncSession:
-    async with AsyncSession(async_engine) as session:
-        yield session
+    # Shows how long each session was held; not made current, since callers
+    # may exit it from a different context than they entered it in
+    session_span = start_span("db session")
+    try:
+        async with AsyncSession(async_engine) as session:
+            yield session
+    finally:
+        end_span(session_span)
@@ -0,0 +1,164 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import List
+from sqlalchemy import event, delete, update, inspect, text
+from sqlalchemy.orm import Session, with_loader_criteria
+from sqlmodel import select
+from .database import engine, get_async_session
+from .tracing import capture_context, span
+from ..models.project import Project
+from ..models.task import Task
+from ..models.task_event import TaskEvent
+from ..models.activity import Activity
+from ..models.join_request import JoinRequest
+from ..models.team_member import TeamMember
+from ..models.mentor import MentorConversation
+from ..models.notification import Notification
+from ..models.chat import Channel, Message, MessageSegment, Reaction
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted_projects(state):
+    """
+    Soft-deleted projects are invisible to every ORM query (including
+    session.get and joins) unless run with include_deleted=True.
+    """
+    if state.is_select and not state.execution_options.get("include_deleted", False):
+        state.statement = state.statement.options(
+            with_loader_criteria(Project, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+        )
+
+
+def migrate_soft_delete():
+    """Idempotent startup migration: add Project.deleted_at to existing databases."""
+    columns = {c["name"] for c in inspect(engine).get_columns("project")}
+    if "deleted_at" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE project ADD COLUMN deleted_at TIMESTAMP"))
+            conn.execute(text("CREATE INDEX ix_project_deleted_at ON project (deleted_at)"))
+
+
+async def soft_delete_project(session, project: Project) -> List[int]:
+    """
+    Hide the project right away (the caller commits). Team rows are few and
+    are dropped in the same transaction so membership checks fail at once;
+    bulky dependents are left to the purger. Returns the former members.
+    """
+    project.deleted_at = datetime.utcnow()
+    session.add(project)
+    member_ids = (await session.execute(
+        select(TeamMember.user_id).where(TeamMember.project_id == project.id)
+    )).scalars().all()
+    await session.execute(delete(TeamMember).where(TeamMember.project_id == project.id))
+    return member_ids
+
+
+class ProjectPurger:
+    """
+    Removes the dependents of soft-deleted projects (tasks, logs, the team
+    channel's messages and archive, ...) in small batches, one
+    short transaction each, then the project row itself. Deleting a big
+    project never holds long locks or blocks the request that deleted it.
+    """
+
+    BATCH_SIZE = int(os.getenv("PROJECT_PURGE_BATCH_SIZE", "500"))
+    # Pause between batches so purges yield to request traffic
+    BATCH_PAUSE = float(os.getenv("PROJECT_PURGE_BATCH_PAUSE", "0.05"))
+    POLL_INTERVAL = 60.0
+
+    def __init__(self):
+        # Created in run(), on the loop that waits on it
+        self._wake: asyncio.Event | None = None
+        # Trace context of the latest request that asked for a purge
+        self._trace_context = None
+
+    def notify(self):
+        """Start purging now instead of on the next poll."""
+        self._trace_context = capture_context()
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _delete_batch(self, model, project_id: int) -> int:
+        async with get_async_session() as session:
+            ids = (await session.execute(
+                select(model.id).where(model.project_id == project_id).limit(self.BATCH_SIZE)
+            )).scalars().all()
+            if ids:
+                await session.execute(delete(model).where(model.id.in_(ids)))
+                await session.commit()
+            return len(ids)
+
+    async def _delete_message_batch(self, channel_id: int) -> int:
+        async with get_async_session() as session:
+            # Newest first, so replies go before the messages they answer
+            ids = (await session.execute(
+                select(Message.id).where(Message.channel_id == channel_id).order_by(Message.id.desc()).limit(self.BATCH_SIZE)
+            )).scalars().all()
+            if ids:
+                await session.execute(delete(Reaction).where(Reaction.message_id.in_(ids)))
+                await session.execute(delete(Message).where(Message.id.in_(ids)))
+                await session.commit()
+            return len(ids)
+
+    async def _delete_segment_batch(self, channel_id: int) -> int:
+        async with get_async_session() as session:
+            ids = (await session.execute(
+                select(MessageSegment.id).where(MessageSegment.channel_id == channel_id).limit(self.BATCH_SIZE)
+            )).scalars().all()
+            if ids:
+                await session.execute(delete(MessageSegment).where(MessageSegment.id.in_(ids)))
+                await session.commit()
+            return len(ids)
+
+    async def purge(self, project_id: int):
+        for model in (Task, TaskEvent, Activity, JoinRequest, TeamMember):
+            while await self._delete_batch(model, project_id) == self.BATCH_SIZE:
+                await asyncio.sleep(self.BATCH_PAUSE)
+
+        async with get_async_session() as session:
+            channel_id = (await session.execute(
+                select(Channel.id).where(Channel.project_id == project_id)
+            )).scalar_one_or_none()
+        if channel_id is not None:
+            while await self._delete_message_batch(channel_id) == self.BATCH_SIZE:
+                await asyncio.sleep(self.BATCH_PAUSE)
+            while await self._delete_segment_batch(channel_id) == self.BATCH_SIZE:
+                await asyncio.sleep(self.BATCH_PAUSE)
+
+        async with get_async_session() as session:
+            # Conversations and notifications belong to the user; keep them, minus the project link
+            for model in (MentorConversation, Notification):
+                await session.execute(update(model).where(model.project_id == project_id).values(project_id=None))
+            await session.execute(delete(Channel).where(Channel.project_id == project_id))
+            await session.execute(delete(Project).where(Project.id == project_id, Project.deleted_at.is_not(None)))
+            await session.commit()
+
+    async def purge_pending(self) -> int:
+        """Purge every soft-deleted project. Returns how many were purged."""
+        async with get_async_session() as session:
+            stmt = select(Project.id).where(Project.deleted_at.is_not(None)).execution_options(include_deleted=True)
+            project_ids = (await session.execute(stmt)).scalars().all()
+        for project_id in project_ids:
+            await self.purge(project_id)
+        return len(project_ids)
+
+    async def run(self):
+        """Background purge loop, started from the app lifespan."""
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # A purge started by a request shows up in that request's trace
+            context, self._trace_context = self._trace_context, None
+            try:
+                with span("project_purger.purge", context=context):
+                    await self.purge_pending()
+            except Exception as e:
+                print(f"Error purging deleted projects: {e}")
+
+
+project_purger = ProjectPurger()
@@ -0,0 +1,53 @@
+import os
+import httpx
+from .http import http_client
+
+# Overridable so a local mock server can stand in for GitHub during development
+GITHUB_OAUTH_URL = os.getenv("GITHUB_OAUTH_URL", "https://github.com").rstrip("/")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+GITHUB_CLIENT_ID = os.getenv("GITHUB_CLIENT_ID", "")
+GITHUB_CLIENT_SECRET = os.getenv("GITHUB_CLIENT_SECRET", "")
+
+
+class GitHubError(Exception):
+    """GitHub was unreachable or returned an unexpected response."""
+
+
+def authorize_url(redirect_uri: str, state: str) -> str:
+    return (
+        f"{GITHUB_OAUTH_URL}/login/oauth/authorize"
+        f"?client_id={GITHUB_CLIENT_ID}"
+        f"&redirect_uri={redirect_uri}"
+        f"&state={state}"
+        "&scope=read:user user:email"
+    )
+
+
+async def exchange_code(code: str) -> str | None:
+    """Trade an OAuth `code` for a user access token (None if rejected)."""
+    try:
+        resp = await http_client.post(
+            f"{GITHUB_OAUTH_URL}/login/oauth/access_token",
+            data={
+                "client_id": GITHUB_CLIENT_ID,
+                "client_secret": GITHUB_CLIENT_SECRET,
+                "code": code,
+            },
+            headers={"Accept": "application/json"},
+        )
+        return resp.json().get("access_token")
+    except (httpx.HTTPError, ValueError) as e:
+        raise GitHubError(f"Token exchange failed: {e}")
+
+
+async def fetch_user(access_token: str) -> dict:
+    try:
+        resp = await http_client.get(
+            f"{GITHUB_API_URL}/user",
+            headers={"Authorization": f"token {access_token}", "Accept": "application/vnd.github+json"},
+        )
+        resp.raise_for_status()
+        return resp.json()
+    except (httpx.HTTPError, ValueError) as e:
+        raise GitHubError(f"Fetching user failed: {e}")
+
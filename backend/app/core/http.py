@@ -0,0 +1,93 @@
+import asyncio
+import os
+import httpx
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+# Retries for connection failures (any method) and 5xx/429 (idempotent methods)
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+    print("WARNING: 'h2' not installed. Outbound HTTP will use HTTP/1.1.")
+
+
+class HTTPClient:
+    """
+    App-wide pooled client for outbound HTTP (GitHub, ...). Connections are
+    kept alive and reused across requests instead of paying TCP/TLS setup
+    on every call. Opened and closed by the app lifespan; scripts get a
+    client lazily on first use.
+    """
+
+    def __init__(self):
+        self._client: httpx.AsyncClient | None = None
+
+    def _create(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=30.0
+        )
+        # Transport-level retries cover failed connection attempts only
+        transport = httpx.AsyncHTTPTransport(retries=HTTP_RETRIES, http2=HTTP2_AVAILABLE, limits=limits)
+        return httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            headers={"User-Agent": "CoForge"}
+        )
+
+    async def start(self):
+        if self._client is None:
+            self._client = self._create()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._create()
+        return self._client
+
+    async def request(self, method: str, url: str, retries: int = HTTP_RETRIES, **kwargs) -> httpx.Response:
+        """
+        Send a request on the shared pool. Idempotent requests are retried
+        with exponential backoff on timeouts and 429/5xx gateway errors.
+        """
+        method = method.upper()
+        can_retry = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                if not (can_retry and response.status_code in RETRY_STATUSES and attempt < retries):
+                    return response
+                await response.aclose()
+            except (httpx.TimeoutException, httpx.NetworkError):
+                if not can_retry or attempt >= retries:
+                    raise
+            await asyncio.sleep(0.25 * 2 ** attempt)
+            attempt += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+
+http_client = HTTPClient()
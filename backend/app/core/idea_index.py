@@ -0,0 +1,194 @@
+import os
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+# ----------------------------------------------------------------------
+# Hashed n-gram vectorizer
+# ----------------------------------------------------------------------
+DIM = 2 ** 12
+
+# An idea is a near-duplicate when its title OR its full text is this close
+# to an existing one ("TaskFlow" vs "Task Flow Pro" ~ 0.82 on titles)
+DUPLICATE_TITLE_THRESHOLD = 0.8
+DUPLICATE_TEXT_THRESHOLD = 0.85
+# Minimum skills/stack similarity for reusing another user's cached idea
+REUSE_THRESHOLD = 0.5
+# Each idea holds two DIM-float rows (32 KB); past this many the oldest are evicted
+IDEA_INDEX_MAX_IDEAS = int(os.getenv("IDEA_INDEX_MAX_IDEAS", "2048"))
+
+_WORD_RE = re.compile(r"[a-z0-9+#.]+")
+
+
+def _bucket(feature: str) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(feature.encode("utf-8")) % DIM
+
+
+def _normalize(vec: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def title_vector(title: str) -> np.ndarray:
+    """Character 3-grams of the title with whitespace/punctuation removed."""
+    compact = re.sub(r"[^a-z0-9]", "", (title or "").lower())
+    vec = np.zeros(DIM, dtype=np.float32)
+    if len(compact) < 3:
+        if compact:
+            vec[_bucket(compact)] = 1.0
+        return vec
+    for i in range(len(compact) - 2):
+        vec[_bucket(compact[i:i + 3])] += 1.0
+    return _normalize(vec)
+
+
+def text_vector(*parts: str, bigrams: bool = True) -> np.ndarray:
+    """Word unigrams (+ bigrams) over the given text fields."""
+    words = _WORD_RE.findall(" ".join(p for p in parts if p).lower())
+    vec = np.zeros(DIM, dtype=np.float32)
+    for i, w in enumerate(words):
+        vec[_bucket(w)] += 1.0
+        if bigrams and i:
+            vec[_bucket(words[i - 1] + " " + w)] += 1.0
+    return _normalize(vec)
+
+
+def profile_vector(skills: str, level: str = "") -> np.ndarray:
+    """Bag of skill/stack words, order-insensitive."""
+    return text_vector(skills, level, bigrams=False)
+
+
+def idea_vectors(idea: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """(title_vector, text_vector) for an idea/suggestion/project dict."""
+    stack = idea.get("stack") or idea.get("stack_details") or ""
+    return (
+        title_vector(idea.get("title", "")),
+        text_vector(idea.get("title", ""), idea.get("description", ""), stack, idea.get("difficulty", "")),
+    )
+
+
+# ----------------------------------------------------------------------
+# Index
+# ----------------------------------------------------------------------
+class IdeaIndex:
+    """
+    In-memory vector index over ideas. Each idea has a "text" row (title,
+    description, stack) for similarity search and a "profile" row (stack,
+    difficulty) for matching against a user's skills. Rows live in
+    preallocated NumPy matrices so a search is one mat-vec. Holds at most
+    `max_size` ideas, evicting the oldest first.
+    """
+
+    def __init__(self, capacity: int = 256, max_size: int = IDEA_INDEX_MAX_IDEAS):
+        capacity = min(capacity, max_size)
+        self.max_size = max_size
+        self._texts = np.zeros((capacity, DIM), dtype=np.float32)
+        self._profiles = np.zeros((capacity, DIM), dtype=np.float32)
+        # Insertion order of each row, for evicting the oldest
+        self._added = np.zeros(capacity, dtype=np.int64)
+        self._counter = 0
+        self._ideas: List[dict] = []
+        self._row_keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._ideas)
+
+    @staticmethod
+    def _key(title: str) -> str:
+        return re.sub(r"\s+", " ", (title or "").strip().lower())
+
+    def add(self, idea: dict):
+        key = self._key(idea["title"])
+        if key in self._rows:
+            return
+        size = len(self._ideas)
+        if size == self.max_size:
+            self._drop(int(np.argmin(self._added[:size])))
+            size -= 1
+        elif size == self._texts.shape[0]:
+            grow = min(size, self.max_size - size)
+            self._texts = np.vstack([self._texts, np.zeros((grow, DIM), dtype=np.float32)])
+            self._profiles = np.vstack([self._profiles, np.zeros((grow, DIM), dtype=np.float32)])
+            self._added = np.concatenate([self._added, np.zeros(grow, dtype=np.int64)])
+        self._texts[size] = idea_vectors(idea)[1]
+        self._profiles[size] = profile_vector(idea.get("stack") or "", idea.get("difficulty") or "")
+        self._added[size] = self._counter
+        self._counter += 1
+        self._ideas.append({k: idea.get(k) for k in ("title", "description", "stack", "difficulty", "source")})
+        self._row_keys.append(key)
+        self._rows[key] = size
+
+    def add_many(self, ideas: Iterable[dict]):
+        for idea in ideas:
+            self.add(idea)
+
+    def remove(self, title: str, source: Optional[str] = None):
+        """Drop the idea titled `title` (only if it came from `source`, when given)."""
+        row = self._rows.get(self._key(title))
+        if row is not None and (source is None or self._ideas[row]["source"] == source):
+            self._drop(row)
+
+    def _drop(self, row: int):
+        # Move the last row into the gap so rows stay contiguous
+        last = len(self._ideas) - 1
+        del self._rows[self._row_keys[row]]
+        if row != last:
+            self._texts[row] = self._texts[last]
+            self._profiles[row] = self._profiles[last]
+            self._added[row] = self._added[last]
+            self._ideas[row] = self._ideas[last]
+            self._row_keys[row] = self._row_keys[last]
+            self._rows[self._row_keys[row]] = row
+        self._ideas.pop()
+        self._row_keys.pop()
+
+    def search(self, query: np.ndarray, k: int = 10, min_score: float = 0.0, field: str = "text") -> List[Tuple[float, dict]]:
+        """Top-k ideas by cosine similarity of `query` to their `field` vectors."""
+        size = len(self._ideas)
+        if not size:
+            return []
+        matrix = self._profiles if field == "profile" else self._texts
+        scores = matrix[:size] @ query
+        k = min(k, size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self._ideas[i]) for i in top if scores[i] >= min_score]
+
+
+class DuplicateFilter:
+    """Rejects ideas that are near-duplicates of anything already accepted."""
+
+    def __init__(self, existing: Iterable[dict] = ()):
+        self._titles: List[np.ndarray] = []
+        self._texts: List[np.ndarray] = []
+        for idea in existing:
+            self.accept(idea)
+
+    def is_duplicate(self, idea: dict, vectors: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> bool:
+        if not self._titles:
+            return False
+        title_vec, text_vec = vectors or idea_vectors(idea)
+        if float(np.max(np.stack(self._titles) @ title_vec)) >= DUPLICATE_TITLE_THRESHOLD:
+            return True
+        return float(np.max(np.stack(self._texts) @ text_vec)) >= DUPLICATE_TEXT_THRESHOLD
+
+    def accept(self, idea: dict, vectors: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+        title_vec, text_vec = vectors or idea_vectors(idea)
+        self._titles.append(title_vec)
+        self._texts.append(text_vec)
+
+    def try_accept(self, idea: dict) -> bool:
+        """Accept `idea` unless it duplicates an earlier one. Returns True if accepted."""
+        vectors = idea_vectors(idea)
+        if self.is_duplicate(idea, vectors):
+            return False
+        self.accept(idea, vectors)
+        return True
+
+
+# Process-wide index of every suggestion and project idea seen so far
+idea_index = IdeaIndex()
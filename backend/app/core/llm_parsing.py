@@ -0,0 +1,168 @@
+import json
+from typing import List, Optional, Type, TypeVar, Union
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+# ----------------------------------------------------------------------
+# Typed response schemas
+# ----------------------------------------------------------------------
+class ProjectIdea(BaseModel):
+    """Single project idea returned by `generate_project_idea`."""
+    title: str
+    description: str
+    stack_details: str = ""
+    difficulty: str = "intermediate"
+
+    @field_validator("stack_details", mode="before")
+    @classmethod
+    def join_stack(cls, value):
+        return _join_stack(value)
+
+
+class SuggestedIdea(BaseModel):
+    """Idea used by brainstorming and personalized suggestions."""
+    title: str
+    description: str
+    stack: str = ""
+    difficulty: str = "Intermediate"
+
+    @field_validator("stack", mode="before")
+    @classmethod
+    def join_stack(cls, value):
+        return _join_stack(value)
+
+
+class IdeaList(BaseModel):
+    ideas: List[SuggestedIdea] = Field(default_factory=list)
+
+
+class TaskItem(BaseModel):
+    title: str
+    description: str = ""
+    order: int = 0
+
+
+class TaskBreakdown(BaseModel):
+    tasks: List[TaskItem] = Field(default_factory=list)
+
+
+def _join_stack(value):
+    # Models sometimes return the stack as a list instead of a string
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return value
+
+
+# ----------------------------------------------------------------------
+# Extraction
+# ----------------------------------------------------------------------
+class JSONExtractionError(ValueError):
+    """Raised when no JSON document could be recovered from a completion."""
+
+
+class JSONStreamExtractor:
+    """
+    Incremental extractor for the first top-level JSON object/array.
+
+    Feed it completion chunks as they arrive; `feed` returns the decoded
+    document as soon as its closing bracket is seen, so a streamed
+    completion can be used (or cut short) without waiting for trailing
+    text. Preamble such as "Sure! Here is your JSON:" or ``` fences is
+    skipped.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self.result: Optional[Union[dict, list]] = None
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def feed(self, chunk: str) -> Optional[Union[dict, list]]:
+        if self.done or not chunk:
+            return self.result
+
+        for ch in chunk:
+            if not self._started:
+                if ch not in "{[":
+                    continue
+                self._started = True
+
+            self._buffer.append(ch)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = "".join(self._buffer)
+                    try:
+                        self.result = json.loads(candidate)
+                        return self.result
+                    except json.JSONDecodeError:
+                        # Bracket-looking prose (e.g. "[optional]") - start over
+                        self._reset()
+        return None
+
+    def _reset(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+
+
+def extract_json(text: str) -> Union[dict, list]:
+    """
+    Recover the first JSON object or array from an LLM completion.
+    Tolerates markdown fences, preamble and trailing commentary.
+    """
+    if not text:
+        raise JSONExtractionError("Empty completion")
+
+    # Fast path: the model followed instructions
+    stripped = text.strip()
+    try:
+        return json.loads(stripped)
+    except json.JSONDecodeError:
+        pass
+
+    extractor = JSONStreamExtractor()
+    result = extractor.feed(text)
+    if result is None:
+        raise JSONExtractionError(f"No JSON document found in completion: {stripped[:80]!r}")
+    return result
+
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def parse_model(text: str, model: Type[M], list_field: Optional[str] = None) -> M:
+    """
+    Extract JSON from `text` and validate it into `model`.
+
+    If the completion is a bare list and `list_field` is given, it is
+    wrapped as `{list_field: [...]}` (models often drop the wrapper key).
+    """
+    data = extract_json(text)
+    if isinstance(data, list) and list_field:
+        data = {list_field: data}
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise JSONExtractionError(f"Completion did not match {model.__name__}: {e}") from e
@@ -0,0 +1,306 @@
+import math
+import re
+import zlib
+from datetime import datetime
+from typing import Dict, List, Tuple
+from zoneinfo import ZoneInfo
+import numpy as np
+from sqlmodel import select
+from ..models.user import User
+from ..models.project import Project
+from ..models.profile import UserProfile
+from .profiles import parse_json_field, skill_rank
+
+# ----------------------------------------------------------------------
+# Features
+# ----------------------------------------------------------------------
+SKILL_DIM = 2 ** 10
+
+# Weights of the fit components; skills dominate, the rest break ties
+SKILL_WEIGHT = 0.6
+LEVEL_WEIGHT = 0.15
+TIMEZONE_WEIGHT = 0.15
+AVAILABILITY_WEIGHT = 0.1
+# Multiplier for users who said they only want solo projects
+SOLO_ONLY_PENALTY = 0.3
+
+# Top candidates remembered per project between profile changes
+CANDIDATES_PER_PROJECT = 100
+
+_SPLIT_RE = re.compile(r"\s*(?:,|\+|/|&|\||\band\b)\s*")
+_HOURS_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _bucket(feature: str) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(feature.encode("utf-8")) % SKILL_DIM
+
+
+def skill_vector(skills: Dict[str, str]) -> np.ndarray:
+    """
+    Hashed skill names weighted by proficiency. Multi-word skills also add
+    their words at half weight so "React Native" partially matches "React".
+    """
+    vec = np.zeros(SKILL_DIM, dtype=np.float32)
+    for name, level in skills.items():
+        name = str(name).strip().lower()
+        if not name:
+            continue
+        weight = 1.0 + 0.25 * skill_rank(level)
+        vec[_bucket(name)] += weight
+        words = name.split()
+        if len(words) > 1:
+            for word in words:
+                vec[_bucket(word)] += weight / 2
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def stack_skills(stack: str) -> Dict[str, str]:
+    """'React + FastAPI, Postgres' -> {"react": "", "fastapi": "", "postgres": ""}"""
+    return {part: "" for part in _SPLIT_RE.split((stack or "").lower()) if part.strip()}
+
+
+def availability_hours(value: str | None) -> float:
+    """'10-20h' -> 15.0, '40h+' -> 40.0; NaN if unknown."""
+    numbers = [float(n) for n in _HOURS_RE.findall(value or "")]
+    return sum(numbers) / len(numbers) if numbers else math.nan
+
+
+def utc_offset_hours(tz: str | None) -> float:
+    """Current UTC offset of an IANA timezone name; NaN if unknown."""
+    if not tz:
+        return math.nan
+    try:
+        offset = ZoneInfo(tz).utcoffset(datetime.utcnow())
+    except Exception:
+        return math.nan
+    return offset.total_seconds() / 3600 if offset is not None else math.nan
+
+
+def user_features(user: User, skills: Dict[str, str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(skill vector, [level, hours, utc offset, open to team])."""
+    mode = (parse_json_field(user.work_preferences).get("mode") or "both").lower()
+    level = skill_rank(user.level)
+    scalars = np.array([
+        level if level else math.nan,
+        availability_hours(user.weekly_availability),
+        utc_offset_hours(user.timezone),
+        0.0 if mode == "solo" else 1.0,
+    ], dtype=np.float32)
+    return skill_vector(skills), scalars
+
+
+# ----------------------------------------------------------------------
+# Scoring
+# ----------------------------------------------------------------------
+def _closeness(values: np.ndarray, target: float, scale: float) -> np.ndarray:
+    """1 when equal, 0 at `scale` apart; 0.5 when either side is unknown."""
+    fit = 1.0 - np.minimum(np.abs(values - target) / scale, 1.0)
+    return np.where(np.isnan(fit), 0.5, fit)
+
+
+def _timezone_fit(offsets: np.ndarray, target: float) -> np.ndarray:
+    diff = np.abs(offsets - target) % 24
+    fit = 1.0 - np.minimum(diff, 24 - diff) / 12
+    return np.where(np.isnan(fit), 0.5, fit)
+
+
+def _availability_fit(hours: np.ndarray, target: float) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fit = np.minimum(hours, target) / np.maximum(hours, target)
+    return np.where(np.isnan(fit), 0.5, fit)
+
+
+def fit_scores(skill_sims: np.ndarray, scalars: np.ndarray, anchor: np.ndarray) -> np.ndarray:
+    """
+    Combined fit of many rows (`skill_sims` and per-row `scalars`) against
+    one anchor's scalars. Rows are users when matching for a project, or
+    project owners when matching projects for a user.
+    """
+    score = (
+        SKILL_WEIGHT * skill_sims
+        + LEVEL_WEIGHT * _closeness(scalars[:, 0], anchor[0], 3.0)
+        + AVAILABILITY_WEIGHT * _availability_fit(scalars[:, 1], anchor[1])
+        + TIMEZONE_WEIGHT * _timezone_fit(scalars[:, 2], anchor[2])
+    )
+    return score * np.where(scalars[:, 3] > 0, 1.0, SOLO_ONLY_PENALTY)
+
+
+def _top_k(scores: np.ndarray, ids: np.ndarray, k: int, exclude: set) -> List[Tuple[int, float]]:
+    if not len(scores):
+        return []
+    # Over-fetch so exclusions rarely leave us short
+    k_fetch = min(len(scores), k + len(exclude))
+    top = np.argpartition(-scores, k_fetch - 1)[:k_fetch]
+    top = top[np.argsort(-scores[top])]
+    results = []
+    for i in top:
+        item_id = int(ids[i])
+        if item_id in exclude:
+            continue
+        if not np.isfinite(scores[i]):
+            break
+        results.append((item_id, round(float(scores[i]), 4)))
+        if len(results) == k:
+            break
+    return results
+
+
+# ----------------------------------------------------------------------
+# Index
+# ----------------------------------------------------------------------
+class _Rows:
+    """Growable matrix of skill vectors + scalar features keyed by id."""
+
+    def __init__(self, capacity: int = 256):
+        self.vectors = np.zeros((capacity, SKILL_DIM), dtype=np.float32)
+        self.scalars = np.full((capacity, 4), math.nan, dtype=np.float32)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.row_of: Dict[int, int] = {}
+        self.size = 0
+
+    def upsert(self, item_id: int, vector: np.ndarray, scalars: np.ndarray) -> int:
+        row = self.row_of.get(item_id)
+        if row is None:
+            if self.size == len(self.ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.row_of[item_id] = row
+            self.ids[row] = item_id
+        self.vectors[row] = vector
+        self.scalars[row] = scalars
+        self.active[row] = True
+        return row
+
+    def remove(self, item_id: int):
+        row = self.row_of.get(item_id)
+        if row is not None:
+            self.active[row] = False
+
+    def _grow(self):
+        self.vectors = np.vstack([self.vectors, np.zeros_like(self.vectors)])
+        self.scalars = np.vstack([self.scalars, np.full_like(self.scalars, math.nan)])
+        self.ids = np.concatenate([self.ids, np.zeros_like(self.ids)])
+        self.active = np.concatenate([self.active, np.zeros_like(self.active)])
+
+    def view(self):
+        """(vectors, scalars, ids, active mask) of used rows, without copying."""
+        n = self.size
+        return self.vectors[:n], self.scalars[:n], self.ids[:n], self.active[:n]
+
+
+class MatchingIndex:
+    """
+    In-memory teammate matching. Users are rows of skill vectors plus
+    level/availability/timezone/mode features; team projects are rows of
+    stack vectors anchored on their owner's features. Ranking is a single
+    mat-vec plus a few vectorized ops over all rows.
+
+    Top candidates per project are cached and patched in place when a
+    single profile changes, instead of being recomputed.
+    """
+
+    def __init__(self):
+        self.users = _Rows()
+        self.projects = _Rows(64)
+        self._project_owner: Dict[int, int] = {}
+        self._candidates: Dict[int, List[Tuple[int, float]]] = {}
+        self.loaded = False
+
+    # -- loading / incremental refresh ---------------------------------
+    async def ensure_loaded(self, session):
+        if self.loaded:
+            return
+        stmt = select(User, UserProfile).outerjoin(UserProfile, UserProfile.user_id == User.id)
+        for user, profile in (await session.execute(stmt)).all():
+            skills = profile.skills if profile else parse_json_field(user.skills)
+            self.users.upsert(user.id, *user_features(user, skills))
+
+        projects = (await session.execute(select(Project).where(Project.type != "solo"))).scalars().all()
+        for project in projects:
+            self._upsert_project(project)
+        self.loaded = True
+
+    def update_user(self, user: User, skills: Dict[str, str]):
+        """Refresh one user's features and patch cached candidate lists."""
+        if not self.loaded:
+            return
+        row = self.users.upsert(user.id, *user_features(user, skills))
+        vector, scalars = self.users.vectors[row], self.users.scalars[row:row + 1]
+
+        # Projects owned by the user are anchored on the owner's features
+        for project_id, owner_id in self._project_owner.items():
+            if owner_id == user.id:
+                self.projects.scalars[self.projects.row_of[project_id]] = scalars[0]
+                self._candidates.pop(project_id, None)
+
+        for project_id, candidates in list(self._candidates.items()):
+            project_row = self.projects.row_of[project_id]
+            sim = np.array([self.projects.vectors[project_row] @ vector])
+            score = round(float(fit_scores(sim, scalars, self.projects.scalars[project_row])[0]), 4)
+
+            rest = [c for c in candidates if c[0] != user.id]
+            if len(candidates) >= CANDIDATES_PER_PROJECT:
+                was_listed = len(rest) < len(candidates)
+                if score < rest[-1][1]:
+                    if was_listed:
+                        # Someone we never kept may now outrank the user: rebuild lazily
+                        self._candidates.pop(project_id)
+                    continue
+            rest.append((user.id, score))
+            rest.sort(key=lambda c: -c[1])
+            self._candidates[project_id] = rest[:CANDIDATES_PER_PROJECT]
+
+    def update_project(self, project: Project):
+        if not self.loaded:
+            return
+        self._candidates.pop(project.id, None)
+        if project.type == "solo":
+            self.remove_project(project.id)
+        else:
+            self._upsert_project(project)
+
+    def remove_project(self, project_id: int):
+        self.projects.remove(project_id)
+        self._project_owner.pop(project_id, None)
+        self._candidates.pop(project_id, None)
+
+    def _upsert_project(self, project: Project):
+        owner_row = self.users.row_of.get(project.owner_id)
+        anchor = self.users.scalars[owner_row] if owner_row is not None else np.full(4, math.nan, dtype=np.float32)
+        self.projects.upsert(project.id, skill_vector(stack_skills(project.stack)), anchor)
+        self._project_owner[project.id] = project.owner_id
+
+    # -- queries --------------------------------------------------------
+    def candidates_for_project(self, project_id: int, k: int = 10, exclude: set = frozenset()) -> List[Tuple[int, float]]:
+        """Top-k (user_id, score) for a team project."""
+        cached = self._candidates.get(project_id)
+        if cached is None:
+            row = self.projects.row_of.get(project_id)
+            if row is None or not self.projects.active[row]:
+                return []
+            vectors, scalars, ids, active = self.users.view()
+            scores = fit_scores(vectors @ self.projects.vectors[row], scalars, self.projects.scalars[row])
+            scores = np.where(active, scores, -np.inf)
+            owner = {self._project_owner.get(project_id)}
+            cached = _top_k(scores, ids, CANDIDATES_PER_PROJECT, owner)
+            self._candidates[project_id] = cached
+        return [c for c in cached if c[0] not in exclude][:k]
+
+    def projects_for_user(self, user_id: int, k: int = 10, exclude: set = frozenset()) -> List[Tuple[int, float]]:
+        """Top-k (project_id, score) team projects for a user."""
+        row = self.users.row_of.get(user_id)
+        if row is None:
+            return []
+        vectors, anchors, ids, active = self.projects.view()
+        scores = fit_scores(vectors @ self.users.vectors[row], anchors, self.users.scalars[row])
+        scores = np.where(active, scores, -np.inf)
+        own = {pid for pid, owner in self._project_owner.items() if owner == user_id}
+        return _top_k(scores, ids, k, set(exclude) | own)
+
+
+# Process-wide matching index, loaded on first use
+matching_index = MatchingIndex()
@@ -0,0 +1,70 @@
+from sqlalchemy import inspect, text, insert, update, exists, func, and_
+from sqlmodel import select
+from .database import engine
+from ..models.project import Project
+from ..models.team_member import TeamMember
+from ..models.join_request import JoinRequest
+
+
+async def add_member(session, project: Project, user_id: int, role: str = "member") -> bool:
+    """
+    Add `user_id` to the team and bump the project's members_count in the
+    same transaction (the caller commits). Returns False if already a member.
+    """
+    if await is_member(session, project.id, user_id):
+        return False
+    session.add(TeamMember(user_id=user_id, project_id=project.id, role=role))
+    # Atomic increment, safe against concurrent accepts; the version bump
+    # keeps project ETags honest (and is mirrored onto `project` in the session)
+    await session.execute(
+        update(Project).where(Project.id == project.id).values(
+            members_count=Project.members_count + 1,
+            version=Project.version + 1
+        )
+    )
+    return True
+
+
+async def add_owner(session, project: Project):
+    """Make the creator of a freshly inserted project its first member."""
+    session.add(TeamMember(user_id=project.owner_id, project_id=project.id, role="owner"))
+    project.members_count = 1
+    session.add(project)
+
+
+async def is_member(session, project_id: int, user_id: int) -> bool:
+    stmt = select(TeamMember.id).where(TeamMember.project_id == project_id, TeamMember.user_id == user_id)
+    return (await session.execute(stmt)).first() is not None
+
+
+def migrate_team_members():
+    """
+    Idempotent startup migration: add Project.members_count to existing
+    databases, copy owners and accepted join requests into TeamMember, and
+    recount. Runs set-based statements only, so it is cheap once backfilled.
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("project")}
+    with engine.begin() as conn:
+        if "members_count" not in columns:
+            conn.execute(text("ALTER TABLE project ADD COLUMN members_count INTEGER NOT NULL DEFAULT 0"))
+
+        not_member = lambda project_id, user_id: ~exists().where(  # noqa: E731
+            and_(TeamMember.project_id == project_id, TeamMember.user_id == user_id)
+        )
+        owners = select(Project.owner_id, Project.id, text("'owner'"), Project.created_at).where(
+            not_member(Project.id, Project.owner_id)
+        )
+        conn.execute(insert(TeamMember).from_select(["user_id", "project_id", "role", "joined_at"], owners))
+
+        accepted = select(
+            JoinRequest.user_id, JoinRequest.project_id, text("'member'"), func.min(JoinRequest.created_at)
+        ).where(
+            JoinRequest.status == "accepted",
+            not_member(JoinRequest.project_id, JoinRequest.user_id)
+        ).group_by(JoinRequest.user_id, JoinRequest.project_id)
+        conn.execute(insert(TeamMember).from_select(["user_id", "project_id", "role", "joined_at"], accepted))
+
+        actual = select(func.count(TeamMember.id)).where(TeamMember.project_id == Project.id).scalar_subquery()
+        conn.execute(update(Project).where(Project.members_count != actual).values(
+            members_count=actual, version=Project.version + 1
+        ))
@@ -0,0 +1,93 @@
+import os
+from typing import List, Optional, Sequence, Tuple
+from .ai import MENTOR_SYSTEM_PROMPT, summarize_conversation
+from ..models.mentor import MentorMessage
+from ..models.project import Project
+from ..models.task import Task
+
+# ----------------------------------------------------------------------
+# Budgets (approximate tokens, ~4 characters each)
+# ----------------------------------------------------------------------
+HISTORY_TOKEN_BUDGET = int(os.getenv("MENTOR_HISTORY_TOKENS", "1500"))
+# Unsummarized history beyond this is folded into the conversation summary
+SUMMARIZE_AFTER_TOKENS = 2 * HISTORY_TOKEN_BUDGET
+CONTEXT_TOKEN_BUDGET = 500
+TRANSCRIPT_TURN_TOKENS = 300
+MAX_MESSAGE_CHARS = 4000
+MAX_CONTEXT_TASKS = 15
+# Hard cap on rows loaded per turn, whatever the summarizer state
+MAX_UNSUMMARIZED_MESSAGES = 60
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text or "") // 4)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    limit = budget * 4
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + "…"
+
+
+def select_recent(messages: Sequence[MentorMessage], budget: int = HISTORY_TOKEN_BUDGET) -> List[MentorMessage]:
+    """Newest messages (in chronological order) that fit in `budget`. Always keeps the last one."""
+    picked = []
+    used = 0
+    for msg in reversed(messages):
+        cost = msg.tokens or estimate_tokens(msg.content)
+        if picked and used + cost > budget:
+            break
+        picked.append(msg)
+        used += cost
+    return list(reversed(picked))
+
+
+def format_project_context(project: Project, tasks: Sequence[Task]) -> str:
+    lines = [
+        f"Project: {project.title} ({project.type})",
+        f"Stack: {project.stack}",
+        f"Description: {project.description}",
+    ]
+    if tasks:
+        lines.append("Tasks:")
+        for t in tasks:
+            lines.append(f"- [{t.status}] {t.title}")
+    return truncate_to_tokens("\n".join(lines), CONTEXT_TOKEN_BUDGET)
+
+
+async def compact_history(summary: Optional[str], history: Sequence[MentorMessage]) -> Optional[Tuple[str, int, List[MentorMessage]]]:
+    """
+    Fold older turns into the summary once unsummarized history exceeds
+    SUMMARIZE_AFTER_TOKENS. Returns (new_summary, summarized_until, kept_history)
+    or None when nothing needs compacting.
+    """
+    total = sum(m.tokens or estimate_tokens(m.content) for m in history)
+    if total <= SUMMARIZE_AFTER_TOKENS:
+        return None
+
+    kept = select_recent(history)
+    older = history[:len(history) - len(kept)]
+    if not older:
+        return None
+
+    transcript = "\n".join(
+        f"{m.role}: {truncate_to_tokens(m.content, TRANSCRIPT_TURN_TOKENS)}" for m in older
+    )
+    new_summary = await summarize_conversation(summary, transcript)
+    return new_summary, older[-1].id, kept
+
+
+def build_prompt(summary: Optional[str], project_context: Optional[str], extra_context: Optional[str], history: Sequence[MentorMessage]) -> List[dict]:
+    """System prompt + bounded context + the recent turns (ending with the user's message)."""
+    system = MENTOR_SYSTEM_PROMPT
+    if project_context:
+        system += f"\n\nProject context:\n{project_context}"
+    if extra_context:
+        system += f"\n\nAdditional context from the user:\n{truncate_to_tokens(extra_context, CONTEXT_TOKEN_BUDGET)}"
+    if summary:
+        system += f"\n\nSummary of the earlier conversation:\n{summary}"
+
+    messages = [{"role": "system", "content": system}]
+    messages.extend({"role": m.role, "content": m.content} for m in select_recent(history))
+    return messages
@@ -0,0 +1,236 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+from sqlalchemy import event
+from starlette.routing import replace_params
+from .query_budget import check_budget, current_queries, end_request, start_request
+
+# Prometheus text exposition without a client library. Metrics are kept per
+# worker process; scrape each worker (or run one) to see the whole picture.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+_INF_BUCKET = 'le="+Inf"'
+
+
+def _number(value: float) -> str:
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()])
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _number(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, _INF_BUCKET)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# ----------------------------------------------------------------------
+# Metrics
+# ----------------------------------------------------------------------
+http_requests = Counter("http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+http_in_progress = Gauge("http_requests_in_progress", "HTTP requests being handled.")
+http_db_queries = Histogram("http_request_db_queries", "DB queries issued per HTTP request.", ("method", "route"),
+                            buckets=QUERY_COUNT_BUCKETS)
+http_db_time = Histogram("http_request_db_duration_seconds", "Time spent in DB queries per HTTP request.", ("method", "route"))
+db_queries = Counter("db_queries_total", "DB queries issued, in and out of requests.")
+db_query_time = Histogram("db_query_duration_seconds", "DB query latency.")
+llm_latency = Histogram("llm_request_duration_seconds", "LLM call latency.", ("function", "outcome"), buckets=LLM_BUCKETS)
+websocket_connections = Gauge("websocket_connections", "Open WebSocket connections.", ("channel",))
+websocket_broadcast_time = Histogram("websocket_broadcast_duration_seconds", "Time to fan a message out to a topic.", ("channel",))
+websocket_messages = Counter("websocket_messages_sent_total", "Messages delivered to WebSocket clients.", ("channel",))
+password_hash_in_flight = Gauge("password_hash_in_flight", "bcrypt jobs running or waiting for a worker.")
+password_hash_queued = Gauge("password_hash_queued", "bcrypt jobs waiting for a free worker.")
+password_hash_rejected = Counter("password_hash_rejected_total", "bcrypt jobs refused because the queue was full.")
+password_hash_wait = Histogram("password_hash_wait_seconds", "Time bcrypt jobs waited for a worker.")
+password_hash_time = Histogram("password_hash_duration_seconds", "bcrypt hash/verify run time.")
+
+
+# ----------------------------------------------------------------------
+# DB instrumentation
+# ----------------------------------------------------------------------
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    db_queries.inc()
+    db_query_time.observe(elapsed)
+    queries = current_queries()
+    if queries is not None:
+        # INSERT/UPDATE/DELETE (flushes included) are writes; everything else is a read
+        queries.add(statement, elapsed, not (context.isinsert or context.isupdate or context.isdelete))
+
+
+def instrument_engine(engine):
+    """Count and time every query run through `engine` (a sync Engine or AsyncEngine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+
+
+# ----------------------------------------------------------------------
+# HTTP middleware
+# ----------------------------------------------------------------------
+def route_label(scope) -> str:
+    """
+    The route template a request matched, e.g. "/projects/{project_id}".
+    Templates keep the label set bounded; unmatched paths share one label.
+    """
+    route = scope.get("route")
+    if route is None or not hasattr(route, "path_format"):
+        return "unmatched"
+    # A route in an included router only knows its own part of the template.
+    # Fill in its parameters to get the part of the path it matched; what
+    # precedes that is the router prefix.
+    path = scope.get("path", "")
+    matched, _ = replace_params(route.path_format, route.param_convertors, dict(scope.get("path_params") or {}))
+    prefix = path[:-len(matched)] if matched and path.endswith(matched) else ""
+    return prefix + route.path_format
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status and DB work per route,
+    and holding each request to its query budget (see query_budget). The
+    budget is checked when the response starts, so in strict mode a
+    violation fails the request instead of surfacing after it was sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                check_budget(f"{scope['method']} {route_label(scope)}", queries)
+            await send(message)
+
+        queries, token = start_request()
+        http_in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_progress.dec()
+            end_request(token)
+            method, route = scope["method"], route_label(scope)
+            http_requests.inc(method=method, route=route, status=str(status))
+            http_latency.observe(elapsed, method=method, route=route)
+            http_db_queries.observe(queries.count, method=method, route=route)
+            http_db_time.observe(queries.seconds, method=method, route=route)
+
+
+# Set METRICS_TOKEN to require "Authorization: Bearer <token>" on /metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
@@ -0,0 +1,127 @@
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import case, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+from .cache import TTLCache
+from .database import get_async_session
+from .realtime import ConnectionManager
+from ..models.notification import Notification, NotificationCounter
+
+PAGE_SIZE = 30
+
+# Unread counts are read on every page load; serve them from memory. A
+# process refreshes its copy whenever it changes a count, so only other
+# workers' changes can lag, by at most the TTL.
+UNREAD_CACHE_TTL = int(os.getenv("UNREAD_CACHE_TTL", "30"))
+_unread_cache = TTLCache(maxsize=10_000, ttl=UNREAD_CACHE_TTL)
+
+# Per-user sockets, keyed by user id
+notification_manager = ConnectionManager("notifications")
+
+
+def serialize_notification(notification: Notification) -> Dict[str, Any]:
+    return {
+        "id": notification.id,
+        "kind": notification.kind,
+        "project_id": notification.project_id,
+        "actor_id": notification.actor_id,
+        "subject_id": notification.subject_id,
+        "data": notification.data,
+        "read": notification.read_at is not None,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def _increment_unread(session, user_id: int):
+    """INSERT ... ON CONFLICT DO UPDATE, atomic under concurrent notifications."""
+    dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(NotificationCounter).values(user_id=user_id, unread=1)
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"unread": NotificationCounter.unread + 1}
+    )
+
+
+async def notify(
+    session, user_id: int, kind: str, project_id: int | None = None,
+    actor_id: int | None = None, subject_id: int | None = None, **data
+) -> Dict[str, Any]:
+    """
+    Store a notification and bump the user's unread count in `session`.
+    Returns the message to `deliver` once the caller has committed.
+    """
+    notification = Notification(
+        user_id=user_id, kind=kind, project_id=project_id, actor_id=actor_id, subject_id=subject_id, data=data
+    )
+    session.add(notification)
+    await session.execute(_increment_unread(session, user_id))
+    # Assign the id now; attributes expire on commit
+    await session.flush()
+    return serialize_notification(notification) | {"user_id": user_id}
+
+
+async def _load_unread(session, user_id: int) -> int:
+    counter = await session.get(NotificationCounter, user_id, populate_existing=True)
+    count = counter.unread if counter else 0
+    _unread_cache.set(user_id, count)
+    return count
+
+
+async def deliver(messages: List[Dict[str, Any]]):
+    """Push committed notifications to the recipients' open sockets."""
+    if not messages:
+        return
+    async with get_async_session() as session:
+        counts = {user_id: await _load_unread(session, user_id) for user_id in {m["user_id"] for m in messages}}
+    for message in messages:
+        user_id = message["user_id"]
+        payload = {k: v for k, v in message.items() if k != "user_id"}
+        await notification_manager.broadcast({"type": "notification", **payload, "unread": counts[user_id]}, user_id)
+
+
+async def unread_count(user_id: int) -> int:
+    count = _unread_cache.get(user_id)
+    if count is None:
+        async with get_async_session() as session:
+            count = await _load_unread(session, user_id)
+    return count
+
+
+async def list_notifications(session, user_id: int, before: Optional[int], limit: int, unread_only: bool = False) -> List[Notification]:
+    stmt = select(Notification).where(Notification.user_id == user_id)
+    if before is not None:
+        stmt = stmt.where(Notification.id < before)
+    if unread_only:
+        stmt = stmt.where(Notification.read_at.is_(None))
+    stmt = stmt.order_by(Notification.id.desc()).limit(limit)
+    return (await session.execute(stmt)).scalars().all()
+
+
+async def mark_read(user_id: int, ids: Optional[List[int]] = None, kind: str | None = None, subject_id: int | None = None) -> int:
+    """
+    Mark the user's notifications read (all, or those matching `ids` /
+    `kind` + `subject_id`) and return the new unread count. The counter
+    drops by exactly the rows that flipped, so it stays right when reads
+    race new notifications.
+    """
+    async with get_async_session() as session:
+        stmt = update(Notification).where(Notification.user_id == user_id, Notification.read_at.is_(None))
+        if ids is not None:
+            stmt = stmt.where(Notification.id.in_(ids))
+        if kind is not None:
+            stmt = stmt.where(Notification.kind == kind, Notification.subject_id == subject_id)
+        flipped = (await session.execute(stmt.values(read_at=datetime.utcnow()))).rowcount
+        if flipped:
+            remaining = NotificationCounter.unread - flipped
+            await session.execute(
+                update(NotificationCounter).where(NotificationCounter.user_id == user_id).values(
+                    unread=case((remaining < 0, 0), else_=remaining)
+                )
+            )
+        await session.commit()
+        count = await _load_unread(session, user_id)
+    if flipped:
+        await notification_manager.broadcast({"type": "unread", "count": count}, user_id)
+    return count
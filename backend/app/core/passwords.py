@@ -0,0 +1,92 @@
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from .metrics import password_hash_in_flight, password_hash_queued, password_hash_rejected, password_hash_time, password_hash_wait
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so threads give real parallelism
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests waiting beyond this are rejected instead of piling up
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "64"))
+
+_COST_RE = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a bounded thread pool so hashing never blocks the event
+    loop. Queue depth and timings are exported as password_hash_* metrics.
+    """
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = BCRYPT_WORKERS, max_queue: int = BCRYPT_MAX_QUEUE):
+        self.rounds = rounds
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0
+
+    def _set_in_flight(self, value: int):
+        self.in_flight = value
+        password_hash_in_flight.set(value)
+        password_hash_queued.set(self.queued)
+
+    async def _run(self, fn, *args):
+        if self.queued >= self.max_queue:
+            password_hash_rejected.inc()
+            raise HasherBusy()
+
+        submitted = time.perf_counter()
+        started = None
+
+        def job():
+            nonlocal started
+            started = time.perf_counter()
+            return fn(*args)
+
+        self._set_in_flight(self.in_flight + 1)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            finished = time.perf_counter()
+            self._set_in_flight(self.in_flight - 1)
+            if started is not None:
+                password_hash_wait.observe(started - submitted)
+                password_hash_time.observe(finished - started)
+
+    async def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        hashed = await self._run(bcrypt.hashpw, password.encode("utf-8"), salt)
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        try:
+            return await self._run(bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+        except ValueError:
+            # Malformed stored hash
+            return False
+
+    @property
+    def queued(self) -> int:
+        """Jobs waiting for a free worker."""
+        return max(0, self.in_flight - self.workers)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True if `hashed` was made with a lower cost than currently configured."""
+        match = _COST_RE.match(hashed or "")
+        return not match or int(match.group(1)) < self.rounds
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
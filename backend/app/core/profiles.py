@@ -0,0 +1,163 @@
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+from sqlmodel import select, delete
+from .cache import TTLCache
+from .database import get_async_session
+from ..models.user import User
+from ..models.profile import UserProfile, UserSkill
+
+STRUCTURED_FIELDS = ("skills", "social_links", "work_preferences", "ai_preferences")
+
+# Ordered proficiency levels; aliases map to the same rank
+SKILL_LEVELS = {
+    "beginner": 1, "novice": 1, "junior": 1,
+    "intermediate": 2, "mid": 2, "mid-level": 2,
+    "advanced": 3, "senior": 3,
+    "expert": 4,
+}
+
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "300"))
+_profile_cache = TTLCache(maxsize=5_000, ttl=PROFILE_CACHE_TTL)
+
+# Rendered public profiles, keyed by user and that user's version counter.
+# Versions are per process, so other workers see a change once their render
+# expires (PUBLIC_PROFILE_TTL); renders read their inputs fresh so no other
+# cache adds to that, and the HTTP max-age is kept within the same bound.
+PUBLIC_PROFILE_TTL = int(os.getenv("PUBLIC_PROFILE_TTL", "60"))
+_public_cache = TTLCache(maxsize=10_000, ttl=PUBLIC_PROFILE_TTL)
+_profile_versions: Dict[int, int] = {}
+
+
+def skill_rank(level: str | None) -> int:
+    """Numeric rank of a skill level (0 if unknown)."""
+    return SKILL_LEVELS.get((level or "").strip().lower(), 0)
+
+
+def parse_json_field(value: Any) -> Dict[str, Any]:
+    """Legacy JSON text column -> dict ({} if empty or malformed)."""
+    if isinstance(value, dict):
+        return value
+    if not value:
+        return {}
+    try:
+        parsed = json.loads(value)
+    except (ValueError, TypeError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _profile_dict(profile: UserProfile) -> Dict[str, Any]:
+    return {field: getattr(profile, field) or {} for field in STRUCTURED_FIELDS}
+
+
+def _skill_rows(user_id: int, skills: Dict[str, Any]) -> List[UserSkill]:
+    rows = {}
+    for name, level in skills.items():
+        key = str(name).strip().lower()
+        if key:
+            rows[key] = UserSkill(user_id=user_id, skill=key, name=str(name).strip(), level=str(level), rank=skill_rank(str(level)))
+    return list(rows.values())
+
+
+async def save_profile(session, user_id: int, **fields: Dict[str, Any]) -> UserProfile:
+    """
+    Upsert the structured profile and its skill index rows in `session`
+    (the caller commits). Call `invalidate_profile` after committing.
+    """
+    profile = await session.get(UserProfile, user_id)
+    if profile is None:
+        profile = UserProfile(user_id=user_id)
+    for field in STRUCTURED_FIELDS:
+        if field in fields:
+            setattr(profile, field, fields[field] or {})
+    profile.updated_at = datetime.utcnow()
+    session.add(profile)
+
+    if "skills" in fields:
+        await session.execute(delete(UserSkill).where(UserSkill.user_id == user_id))
+        session.add_all(_skill_rows(user_id, profile.skills))
+    return profile
+
+
+def _fields_from_user(user: User) -> Dict[str, Dict[str, Any]]:
+    return {field: parse_json_field(getattr(user, field)) for field in STRUCTURED_FIELDS}
+
+
+async def load_profile(user_id: int, fresh: bool = False) -> Dict[str, Any] | None:
+    """
+    Parsed skills / social links / preferences of a user, served from cache
+    (`fresh` reads through it). Users predating the read model are migrated
+    on first read.
+    """
+    cached = None if fresh else _profile_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    async with get_async_session() as session:
+        profile = await session.get(UserProfile, user_id)
+        if profile is not None:
+            data = _profile_dict(profile)
+        else:
+            user = await session.get(User, user_id)
+            if not user:
+                return None
+            data = _fields_from_user(user)
+            await save_profile(session, user_id, **data)
+            await session.commit()
+
+    _profile_cache.set(user_id, data)
+    return data
+
+
+def invalidate_profile(user_id: int):
+    _profile_cache.pop(user_id)
+    bump_profile_version(user_id)
+
+
+def bump_profile_version(user_id: int):
+    """Mark everything rendered from `user_id`'s profile or projects as stale."""
+    _profile_versions[user_id] = _profile_versions.get(user_id, 0) + 1
+
+
+def get_public_render(user_id: int) -> tuple | None:
+    """(body, etag) of the current rendered public profile, if cached."""
+    return _public_cache.get((user_id, _profile_versions.get(user_id, 0)))
+
+
+def set_public_render(user_id: int, version: int, body: bytes, etag: str):
+    _public_cache.set((user_id, version), (body, etag))
+
+
+def profile_version(user_id: int) -> int:
+    return _profile_versions.get(user_id, 0)
+
+
+async def backfill_profiles(batch_size: int = 500) -> int:
+    """Create read-model rows for users that have none. Returns the count."""
+    created = 0
+    while True:
+        async with get_async_session() as session:
+            stmt = select(User).outerjoin(UserProfile, UserProfile.user_id == User.id).where(
+                UserProfile.user_id.is_(None)
+            ).limit(batch_size)
+            users = (await session.execute(stmt)).scalars().all()
+            if not users:
+                return created
+            for user in users:
+                await save_profile(session, user.id, **_fields_from_user(user))
+            await session.commit()
+            created += len(users)
+
+
+async def find_users_by_skill(session, skill: str, min_level: str | None = None, limit: int = 50) -> List[UserSkill]:
+    """
+    Users having `skill` at `min_level` or above, strongest first.
+    Served by the (skill, rank) index.
+    """
+    stmt = select(UserSkill).where(UserSkill.skill == skill.strip().lower())
+    if min_level:
+        stmt = stmt.where(UserSkill.rank >= skill_rank(min_level))
+    stmt = stmt.order_by(UserSkill.rank.desc(), UserSkill.user_id).limit(limit)
+    return (await session.execute(stmt)).scalars().all()
@@ -0,0 +1,83 @@
+import os
+import re
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+# Reads one request may issue before it is reported. Writes are left out: the
+# ORM flushes one INSERT/UPDATE per changed row, which is expected, not a loop
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "25"))
+# The same statement this many times in one request looks like a query in a loop (N+1)
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+# Raise instead of warning; always on under pytest so N+1 regressions fail the suite
+SQL_QUERY_BUDGET_STRICT = os.getenv("SQL_QUERY_BUDGET_STRICT", "false").lower() == "true"
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists render one placeholder per value; fold them so batch sizes share a shape
+_PLACEHOLDER = r"(?:\?|\$\d+(?:::\w+)?|%\(\w+\)s)"
+_IN_LIST = re.compile(rf"IN \({_PLACEHOLDER}(?:, {_PLACEHOLDER})*\)")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class RequestQueries:
+    """Statements run while handling one request. Only reads are held to the budget."""
+
+    __slots__ = ("count", "seconds", "reads", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.reads = 0
+        self.shapes: Counter = Counter()
+
+    def add(self, statement: str, elapsed: float, is_read: bool = True):
+        self.count += 1
+        self.seconds += elapsed
+        if is_read:
+            self.reads += 1
+            self.shapes[statement] += 1
+
+    def repeated(self) -> List[Tuple[str, int]]:
+        """Read shapes run at least SQL_REPEAT_THRESHOLD times, most frequent first."""
+        shapes: Counter = Counter()
+        for statement, n in self.shapes.items():
+            shapes[_IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", statement))] += n
+        return [(shape, n) for shape, n in shapes.most_common() if n >= SQL_REPEAT_THRESHOLD]
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+def start_request() -> Tuple[RequestQueries, object]:
+    queries = RequestQueries()
+    return queries, _current.set(queries)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_queries() -> Optional[RequestQueries]:
+    return _current.get()
+
+
+def _strict() -> bool:
+    return SQL_QUERY_BUDGET_STRICT or "PYTEST_CURRENT_TEST" in os.environ
+
+
+def check_budget(endpoint: str, queries: RequestQueries):
+    """Report a request that ran more reads than budgeted or repeated one."""
+    problems = []
+    if queries.reads > SQL_QUERY_BUDGET:
+        problems.append(f"{queries.reads} reads of {queries.count} queries ({queries.seconds * 1000:.0f} ms), budget {SQL_QUERY_BUDGET}")
+    for shape, n in queries.repeated():
+        problems.append(f"{n}x {shape[:200]}")
+    if not problems:
+        return
+    report = f"{endpoint}: " + "; ".join(problems)
+    if _strict():
+        raise QueryBudgetExceeded(report)
+    print(f"WARNING: query budget: {report}")
@@ -0,0 +1,179 @@
+import os
+import time
+from typing import Dict, List, NamedTuple
+from fastapi import HTTPException, Request
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Set to share counters between workers (requires the `redis` package)
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "")
+# Only trust X-Forwarded-For when running behind a proxy that sets it
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"
+
+
+class RateLimit(NamedTuple):
+    limit: int
+    window: float   # seconds
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """'10/60' -> 10 hits per 60 seconds."""
+        limit, window = value.split("/")
+        return cls(int(limit), float(window))
+
+    @classmethod
+    def from_env(cls, name: str, default: str) -> "RateLimit":
+        return cls.parse(os.getenv(name, default))
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+
+def _estimate(previous: int, current: int, elapsed: float, window: float) -> float:
+    """
+    Sliding-window estimate from two fixed-window counters: the previous
+    window's count is weighted by how much of it still overlaps the last
+    `window` seconds. O(1) state and work per key.
+    """
+    return previous * (1 - elapsed / window) + current
+
+
+def _result(estimate: float, rule: RateLimit, elapsed: float) -> RateLimitResult:
+    if estimate > rule.limit:
+        return RateLimitResult(False, 0, max(1.0, rule.window - elapsed))
+    return RateLimitResult(True, int(rule.limit - estimate), 0.0)
+
+
+class MemoryBackend:
+    """Per-process counters. Each worker enforces the limit on its own."""
+
+    SWEEP_EVERY = 10_000
+
+    def __init__(self):
+        # key -> [window index, current count, previous count]
+        self._counters: Dict[str, List[int]] = {}
+        self._ops = 0
+
+    async def hit(self, key: str, rule: RateLimit) -> RateLimitResult:
+        now = time.time()
+        index = int(now // rule.window)
+        elapsed = now - index * rule.window
+
+        entry = self._counters.get(key)
+        if entry is None or entry[0] < index - 1:
+            entry = [index, 0, 0]
+        elif entry[0] == index - 1:
+            entry = [index, 0, entry[1]]
+        entry[1] += 1
+        self._counters[key] = entry
+
+        self._ops += 1
+        if self._ops % self.SWEEP_EVERY == 0:
+            self._sweep(now)
+        return _result(_estimate(entry[2], entry[1], elapsed, rule.window), rule, elapsed)
+
+    def _sweep(self, now: float):
+        # Keys are "<rule window>:..." so stale entries can be found without the rule
+        stale = []
+        for key, (index, _, _) in self._counters.items():
+            window = float(key.split(":", 1)[0])
+            if index < int(now // window) - 1:
+                stale.append(key)
+        for key in stale:
+            del self._counters[key]
+
+    def reset(self):
+        self._counters.clear()
+
+
+class RedisBackend:
+    """Counters shared by all workers; one pipelined round trip per check."""
+
+    def __init__(self, url: str):
+        self._redis = redis_asyncio.from_url(url)
+
+    async def hit(self, key: str, rule: RateLimit) -> RateLimitResult:
+        now = time.time()
+        index = int(now // rule.window)
+        elapsed = now - index * rule.window
+        current_key = f"rl:{key}:{index}"
+
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(rule.window * 2) + 1)
+        pipe.get(f"rl:{key}:{index - 1}")
+        current, _, previous = await pipe.execute()
+        return _result(_estimate(int(previous or 0), int(current), elapsed, rule.window), rule, elapsed)
+
+
+class RateLimiter:
+    """
+    Checks hits against named limits keyed by route and identity
+    (client IP, user id, email, ...). Exceeding a limit raises 429.
+    """
+
+    def __init__(self):
+        self.memory = MemoryBackend()
+        self.backend = self.memory
+        if RATE_LIMIT_REDIS_URL:
+            if redis_asyncio is None:
+                print("WARNING: RATE_LIMIT_REDIS_URL set but 'redis' not installed. Using per-worker rate limits.")
+            else:
+                self.backend = RedisBackend(RATE_LIMIT_REDIS_URL)
+        self.rejected = 0
+
+    async def hit(self, route: str, identity: str, rule: RateLimit) -> RateLimitResult:
+        key = f"{rule.window:g}:{route}:{identity}"
+        try:
+            result = await self.backend.hit(key, rule)
+        except Exception as e:
+            # Shared store unavailable: keep protecting this worker
+            print(f"Rate limit backend error, using local counters: {e}")
+            result = await self.memory.hit(key, rule)
+        if not result.allowed:
+            self.rejected += 1
+        return result
+
+    async def check(self, route: str, identity: str, rule: RateLimit):
+        """Count a hit and raise 429 if `identity` is over the limit on `route`."""
+        if not RATE_LIMIT_ENABLED:
+            return
+        result = await self.hit(route, identity, rule)
+        if not result.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please slow down",
+                headers={
+                    "Retry-After": str(int(result.retry_after + 0.999)),
+                    "X-RateLimit-Limit": str(rule.limit),
+                    "X-RateLimit-Remaining": "0",
+                }
+            )
+
+
+def client_ip(request: Request) -> str:
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def limit_by_ip(route: str, rule: RateLimit):
+    """FastAPI dependency factory: limit `route` per client IP."""
+    async def dependency(request: Request):
+        await rate_limiter.check(route, f"ip:{client_ip(request)}", rule)
+    return dependency
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,59 @@
+import time
+from typing import Dict, Hashable, List
+from fastapi import WebSocket
+from .metrics import websocket_broadcast_time, websocket_connections, websocket_messages
+from .tracing import span
+
+
+class ConnectionManager:
+    """
+    WebSocket connections grouped by topic (a chat channel, a project
+    board, ...). Connections are per worker process.
+    """
+
+    def __init__(self, name: str):
+        # Metrics label, e.g. "chat"
+        self.name = name
+        # topic -> List[WebSocket]
+        self.active_connections: Dict[Hashable, List[WebSocket]] = {}
+
+    async def connect(self, websocket: WebSocket, topic: Hashable):
+        # WebSocket is already accepted in the endpoint
+        if topic not in self.active_connections:
+            self.active_connections[topic] = []
+        self.active_connections[topic].append(websocket)
+        websocket_connections.inc(channel=self.name)
+
+    def disconnect(self, websocket: WebSocket, topic: Hashable):
+        if topic in self.active_connections:
+            if websocket in self.active_connections[topic]:
+                self.active_connections[topic].remove(websocket)
+                websocket_connections.dec(channel=self.name)
+            if not self.active_connections[topic]:
+                del self.active_connections[topic]
+
+    async def close_topic(self, topic: Hashable, code: int = 1008):
+        """Close every connection on `topic`, e.g. once access to it is revoked."""
+        for connection in self.active_connections.pop(topic, []):
+            websocket_connections.dec(channel=self.name)
+            try:
+                await connection.close(code=code)
+            except Exception:
+                # Already gone
+                pass
+
+    async def broadcast(self, message: dict, topic: Hashable):
+        if topic in self.active_connections:
+            with span("ws broadcast", **{"ws.channel": self.name, "ws.recipients": len(self.active_connections[topic])}):
+                started = time.perf_counter()
+                sent = 0
+                # Iterate copy to avoid issues if remove happens during iteration
+                for connection in self.active_connections[topic][:]:
+                    try:
+                        await connection.send_json(message)
+                        sent += 1
+                    except Exception:
+                        # Connection might be closed
+                        pass
+                websocket_messages.inc(sent, channel=self.name)
+                websocket_broadcast_time.observe(time.perf_counter() - started, channel=self.name)
@@ -0,0 +1,101 @@
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict
+from sqlmodel import select, delete
+from .database import get_async_session
+from ..models.auth_token import RevokedToken
+
+
+def _epoch(dt: datetime) -> float:
+    """Epoch seconds of a naive UTC datetime."""
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationList:
+    """
+    In-memory view of the RevokedToken table, checked on every token decode
+    with two dict lookups (no DB query). Access tokens are short-lived, so
+    only a handful of unexpired entries are ever held.
+
+    Revocations made by this worker apply immediately; other workers pick
+    them up on the next `sync` (every SYNC_INTERVAL seconds).
+    """
+
+    SYNC_INTERVAL = 15.0
+
+    def __init__(self):
+        self._jtis: Dict[str, float] = {}            # jti -> expires_at (epoch seconds)
+        self._users: Dict[int, tuple] = {}           # user_id -> (revoked_before, expires_at)
+        self._last_id = 0
+
+    def is_revoked(self, jti: str, user_id: int, issued_at: float) -> bool:
+        if jti in self._jtis:
+            return True
+        entry = self._users.get(user_id)
+        return entry is not None and issued_at < entry[0]
+
+    def _apply(self, row: RevokedToken):
+        expires = _epoch(row.expires_at)
+        if row.jti:
+            self._jtis[row.jti] = expires
+        if row.user_id is not None and row.revoked_before is not None:
+            # Token iat has whole seconds only: with a fractional cutoff, a token
+            # issued later in the same second would count as revoked
+            before = math.floor(_epoch(row.revoked_before))
+            current = self._users.get(row.user_id)
+            if not current or before > current[0]:
+                self._users[row.user_id] = (before, expires)
+
+    async def _persist(self, row: RevokedToken):
+        async with get_async_session() as session:
+            session.add(row)
+            await session.commit()
+            await session.refresh(row)
+        self._apply(row)
+
+    async def revoke_token(self, jti: str, expires_at: datetime):
+        """Revoke a single access token until it would have expired anyway."""
+        await self._persist(RevokedToken(jti=jti, expires_at=expires_at))
+
+    async def revoke_user(self, user_id: int, expires_at: datetime):
+        """Revoke every access token of `user_id` issued before now."""
+        revoked_before = datetime.utcnow().replace(microsecond=0)
+        await self._persist(RevokedToken(user_id=user_id, revoked_before=revoked_before, expires_at=expires_at))
+
+    async def sync(self):
+        """Load revocations written since the last sync (by any worker)."""
+        async with get_async_session() as session:
+            stmt = select(RevokedToken).where(
+                RevokedToken.id > self._last_id,
+                RevokedToken.expires_at > datetime.utcnow()
+            ).order_by(RevokedToken.id)
+            rows = (await session.execute(stmt)).scalars().all()
+        for row in rows:
+            self._apply(row)
+            self._last_id = max(self._last_id, row.id)
+        self.prune()
+
+    def prune(self):
+        now = time.time()
+        self._jtis = {k: exp for k, exp in self._jtis.items() if exp > now}
+        self._users = {k: v for k, v in self._users.items() if v[1] > now}
+
+    async def purge_expired(self):
+        """Delete table rows that can no longer match a valid token."""
+        async with get_async_session() as session:
+            await session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+            await session.commit()
+
+    async def run(self):
+        """Background sync loop, started from the app lifespan."""
+        while True:
+            await asyncio.sleep(self.SYNC_INTERVAL)
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"Error syncing token revocations: {e}")
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,106 @@
+import json
+from typing import Tuple
+from sqlmodel import select
+from ..models.suggestion import ProjectSuggestion
+from ..models.project import Project
+from ..models.user import User
+from .idea_index import REUSE_THRESHOLD, DuplicateFilter, IdeaIndex, idea_index, profile_vector
+
+SUGGESTIONS_PER_USER = 3
+
+DEFAULT_ROLE = "Fullstack Developer"
+DEFAULT_LEVEL = "Junior"
+DEFAULT_SKILLS = "React, Python, SQL"
+
+CohortKey = Tuple[str, str, Tuple[str, ...]]
+
+
+def normalize_skills(skills: str | None) -> Tuple[str, ...]:
+    """
+    Normalize stored skills into a sorted tuple of lowercase names.
+    Accepts the onboarding JSON ({"React": "Intermediate"}) or a
+    comma-separated string.
+    """
+    if not skills:
+        return ()
+    names = None
+    try:
+        parsed = json.loads(skills)
+        if isinstance(parsed, dict):
+            names = parsed.keys()
+        elif isinstance(parsed, list):
+            names = parsed
+    except (ValueError, TypeError):
+        pass
+    if names is None:
+        names = skills.split(",")
+    return tuple(sorted({str(n).strip().lower() for n in names if str(n).strip()}))
+
+
+def profile_inputs(user: User) -> Tuple[str, str, str]:
+    """(role, level, skills) as passed to `generate_personalized_ideas`."""
+    role = user.primary_role or DEFAULT_ROLE
+    level = user.level or DEFAULT_LEVEL
+    skills = ", ".join(normalize_skills(user.skills)) or DEFAULT_SKILLS
+    return role, level, skills
+
+
+def cohort_key(user: User) -> CohortKey:
+    """Users sharing a key receive suggestions from the same generated pool."""
+    role, level, _ = profile_inputs(user)
+    return (role.strip().lower(), level.strip().lower(), normalize_skills(user.skills))
+
+
+def suggestion_from_idea(user_id: int, idea: dict) -> ProjectSuggestion:
+    stack = idea["stack"]
+    return ProjectSuggestion(
+        user_id=user_id,
+        title=idea["title"],
+        description=idea["description"],
+        stack=stack if isinstance(stack, str) else ", ".join(stack),
+        difficulty=idea["difficulty"]
+    )
+
+
+def serialize_suggestion(s: ProjectSuggestion) -> dict:
+    return {
+        "id": s.id,
+        "title": s.title,
+        "description": s.description,
+        "stack": s.stack,
+        "difficulty": s.difficulty,
+        "created_at": s.created_at
+    }
+
+
+async def ensure_idea_index(session) -> IdeaIndex:
+    """
+    Load stored projects and suggestions into `idea_index` once per process.
+    Suggestions go in last, oldest first, so a full index keeps the newest.
+    """
+    if idea_index.loaded:
+        return idea_index
+    projects = (await session.execute(select(Project))).scalars().all()
+    suggestions = (await session.execute(select(ProjectSuggestion).order_by(ProjectSuggestion.id))).scalars().all()
+    idea_index.add_many({"title": p.title, "description": p.description, "stack": p.stack, "source": "project"} for p in projects)
+    idea_index.add_many({**serialize_suggestion(s), "source": "suggestion"} for s in suggestions)
+    idea_index.loaded = True
+    return idea_index
+
+
+def reusable_ideas(index: IdeaIndex, role: str, level: str, skills: str, dedup: DuplicateFilter, count: int) -> list:
+    """
+    Pick up to `count` cached ideas matching the profile that pass `dedup`,
+    so a new generation is only paid for when the cache has nothing close.
+    """
+    query = profile_vector(skills, level)
+    picked = []
+    for _, idea in index.search(query, k=count * 5, min_score=REUSE_THRESHOLD, field="profile"):
+        if len(picked) >= count:
+            break
+        # Projects are indexed for deduplication only
+        if idea["source"] != "suggestion":
+            continue
+        if dedup.try_accept(idea):
+            picked.append(idea)
+    return picked
@@ -0,0 +1,32 @@
+from typing import List, Optional
+from ..models.task import Task
+
+# Tasks are spaced this far apart so a move can usually take the midpoint
+# between its new neighbours and only update the moved row
+ORDER_GAP = 1024
+
+
+class NoGap(Exception):
+    """The neighbours are adjacent; the list must be rebalanced first."""
+
+
+def position_between(after: Optional[int], before: Optional[int]) -> int:
+    """
+    Order value for a task placed after `after` and before `before`
+    (either may be None for the start/end of the list).
+    """
+    if after is None and before is None:
+        return 0
+    if before is None:
+        return after + ORDER_GAP
+    if after is None:
+        return before - ORDER_GAP
+    if before - after < 2:
+        raise NoGap()
+    return (after + before) // 2
+
+
+def rebalance(tasks: List[Task]):
+    """Respace tasks (already in board order) ORDER_GAP apart, keeping their order."""
+    for i, task in enumerate(tasks):
+        task.order = (i + 1) * ORDER_GAP
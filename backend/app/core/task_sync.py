@@ -0,0 +1,122 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import delete, func
+from sqlmodel import select
+from .database import get_async_session
+from .realtime import ConnectionManager
+from .task_order import ORDER_GAP
+from ..models.task import Task
+from ..models.task_event import TaskEvent
+
+# Fields pushed to board clients; `content` (the AI guide) is fetched on demand.
+# Snapshot after flushing so `version` is the row's new version.
+TRACKED_FIELDS = ("title", "description", "status", "order", "assigned_to", "pr_url", "version")
+
+# A client further behind than this refetches the board instead of replaying
+CATCH_UP_LIMIT = int(os.getenv("TASK_SYNC_CATCH_UP_LIMIT", "500"))
+TASK_EVENT_RETENTION_DAYS = int(os.getenv("TASK_EVENT_RETENTION_DAYS", "7"))
+
+# Board connections, keyed by project id
+board_manager = ConnectionManager("board")
+
+# Highest event id purged by this process; older cursors cannot be replayed
+_purged_through = 0
+
+
+def snapshot(task: Task) -> Dict[str, Any]:
+    return {field: getattr(task, field) for field in TRACKED_FIELDS}
+
+
+def changed_fields(before: Dict[str, Any], task: Task) -> Dict[str, Any]:
+    """Tracked fields of `task` that differ from an earlier `snapshot`."""
+    return {field: value for field, value in snapshot(task).items() if before.get(field) != value}
+
+
+def _message(event: TaskEvent) -> Dict[str, Any]:
+    return {
+        "type": "task",
+        "seq": event.id,
+        "op": event.op,
+        "task_id": event.task_id,
+        "fields": event.fields,
+    }
+
+
+async def record_events(session, project_id: int, changes: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    Append (task_id, op, fields) changes to the project's log in `session`
+    and return the messages to `publish` once the caller has committed.
+    Updates with no tracked changes are skipped.
+    """
+    events = [
+        TaskEvent(project_id=project_id, task_id=task_id, op=op, fields=fields)
+        for task_id, op, fields in changes
+        if op != "update" or fields
+    ]
+    if not events:
+        return []
+    session.add_all(events)
+    # Assign ids (the sequence numbers) now; attributes expire on commit
+    await session.flush()
+    return [_message(event) for event in events]
+
+
+async def add_generated_tasks(session, project_id: int, ai_tasks: List[Dict[str, Any]]) -> Tuple[List[Task], List[Dict[str, Any]]]:
+    """
+    Insert AI-generated tasks, spaced ORDER_GAP apart by their "order", and
+    log their creation. Returns (tasks, messages to `publish` after commit).
+    """
+    tasks = [
+        Task(project_id=project_id, title=t["title"], description=t["description"], order=t["order"] * ORDER_GAP)
+        for t in ai_tasks
+    ]
+    session.add_all(tasks)
+    await session.flush()
+    messages = await record_events(session, project_id, [
+        (task.id, "create", {"id": task.id, **snapshot(task)}) for task in tasks
+    ])
+    return tasks, messages
+
+
+async def publish(project_id: int, messages: List[Dict[str, Any]]):
+    for message in messages:
+        await board_manager.broadcast(message, project_id)
+
+
+async def latest_seq(session, project_id: int) -> int:
+    stmt = select(func.max(TaskEvent.id)).where(TaskEvent.project_id == project_id)
+    return (await session.execute(stmt)).scalar() or 0
+
+
+async def catch_up(session, project_id: int, since: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Messages a client that last saw `since` has missed, oldest first, or
+    None if it should refetch the board (too far behind, or log purged).
+    """
+    if since < _purged_through:
+        return None
+    stmt = select(TaskEvent).where(
+        TaskEvent.project_id == project_id,
+        TaskEvent.id > since
+    ).order_by(TaskEvent.id).limit(CATCH_UP_LIMIT + 1)
+    events = (await session.execute(stmt)).scalars().all()
+    if len(events) > CATCH_UP_LIMIT:
+        return None
+    return [_message(event) for event in events]
+
+
+async def purge_task_events() -> int:
+    """Drop log entries past the retention window. Returns the count."""
+    global _purged_through
+    cutoff = datetime.utcnow() - timedelta(days=TASK_EVENT_RETENTION_DAYS)
+    async with get_async_session() as session:
+        through = (await session.execute(
+            select(func.max(TaskEvent.id)).where(TaskEvent.created_at < cutoff)
+        )).scalar()
+        if through is None:
+            return 0
+        result = await session.execute(delete(TaskEvent).where(TaskEvent.id <= through))
+        await session.commit()
+    _purged_through = max(_purged_through, through)
+    return result.rowcount
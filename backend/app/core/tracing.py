@@ -0,0 +1,194 @@
+import os
+from contextlib import nullcontext
+from importlib.util import find_spec
+from typing import Any, Optional
+from sqlalchemy import event
+from .metrics import route_label
+
+# OpenTelemetry tracing. The API alone records nothing; with the SDK installed,
+# TRACING_EXPORTER picks where finished spans go:
+#   console  - stdout, one JSON span per line
+#   file     - append to TRACING_FILE (JSON lines), for offline runs
+#   otlp     - an OTLP/HTTP collector (needs opentelemetry-exporter-otlp-proto-http)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "coforge-backend")
+# Long statements are cut to this length in span attributes
+MAX_STATEMENT_CHARS = 1000
+
+try:
+    from opentelemetry import context as otel_context, propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:
+    trace = None
+    if TRACING_EXPORTER != "none":
+        print("WARNING: 'opentelemetry-api' not installed. Tracing is disabled.")
+
+_provider = None
+# Newer FastAPI opens its own HTTP/WebSocket server spans when OpenTelemetry is
+# installed; TracingMiddleware only fills in on versions that do not
+FRAMEWORK_TRACES_REQUESTS = find_spec("fastapi.telemetry") is not None
+
+
+def _configure():
+    global _provider
+    if trace is None or TRACING_EXPORTER == "none":
+        return
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        print("WARNING: 'opentelemetry-sdk' not installed. Spans will not be exported.")
+        return
+
+    if TRACING_EXPORTER == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("WARNING: 'opentelemetry-exporter-otlp-proto-http' not installed. Spans will not be exported.")
+            return
+        exporter = OTLPSpanExporter()
+    elif TRACING_EXPORTER in ("console", "file"):
+        out = open(TRACING_FILE, "a", buffering=1) if TRACING_EXPORTER == "file" else None
+        kwargs = {"out": out} if out else {}
+        exporter = ConsoleSpanExporter(formatter=lambda span: span.to_json(indent=None) + "\n", **kwargs)
+    else:
+        print(f"WARNING: unknown TRACING_EXPORTER '{TRACING_EXPORTER}'. Spans will not be exported.")
+        return
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+
+
+_configure()
+tracer = trace.get_tracer("coforge") if trace is not None else None
+
+
+def shutdown_tracing():
+    """Flush buffered spans (called on app shutdown)."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def _attributes(attributes):
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+def span(name: str, kind: str = "internal", context=None, **attributes):
+    """
+    Context manager for a child span of the current one (or of `context`),
+    a no-op without OpenTelemetry. Exceptions are recorded on the span.
+    """
+    if tracer is None:
+        return nullcontext()
+    return tracer.start_as_current_span(
+        name, context=context, kind=getattr(SpanKind, kind.upper()), attributes=_attributes(attributes)
+    )
+
+
+def start_span(name: str, kind: str = "internal", **attributes):
+    """
+    A child of the current span that is not made current, for work whose
+    start and end are not in one block (async generators, event hooks).
+    Finish it with end_span().
+    """
+    if tracer is None:
+        return None
+    return tracer.start_span(name, kind=getattr(SpanKind, kind.upper()), attributes=_attributes(attributes))
+
+
+def end_span(started_span, error: Optional[BaseException] = None, **attributes):
+    if started_span is None:
+        return
+    started_span.set_attributes(_attributes(attributes))
+    if error is not None:
+        started_span.record_exception(error)
+        started_span.set_status(Status(StatusCode.ERROR, type(error).__name__))
+    started_span.end()
+
+
+def set_attributes(**attributes):
+    """Add attributes to the current span, e.g. results only known at the end."""
+    if trace is not None:
+        trace.get_current_span().set_attributes(_attributes(attributes))
+
+
+def capture_context() -> Optional[Any]:
+    """The current trace context, to hand to work that runs elsewhere (a background loop)."""
+    return otel_context.get_current() if trace is not None else None
+
+
+# ----------------------------------------------------------------------
+# DB instrumentation
+# ----------------------------------------------------------------------
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    operation = statement.lstrip().split(" ", 1)[0].upper()
+    context._trace_span = start_span(
+        f"db {operation}", kind="client",
+        **{"db.system": conn.dialect.name, "db.operation": operation, "db.statement": statement[:MAX_STATEMENT_CHARS]}
+    )
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    rowcount = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+    end_span(getattr(context, "_trace_span", None), **{"db.rowcount": rowcount})
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    if context is not None:
+        end_span(getattr(context, "_trace_span", None), error=exception_context.original_exception)
+
+
+def trace_engine(engine):
+    """Emit a span per statement run through `engine` (a sync Engine or AsyncEngine.sync_engine)."""
+    if tracer is None:
+        return
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# ----------------------------------------------------------------------
+# HTTP middleware
+# ----------------------------------------------------------------------
+class TracingMiddleware:
+    """
+    Pure ASGI middleware opening a server span per HTTP request, continuing
+    the caller's trace when a W3C traceparent header is sent. The span is
+    renamed after routing to "METHOD /route/{template}". A pass-through
+    where FastAPI traces requests itself.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if tracer is None or FRAMEWORK_TRACES_REQUESTS or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with tracer.start_as_current_span(
+            method, context=propagate.extract(headers), kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope.get("path", "")}
+        ) as request_span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = route_label(scope)
+                request_span.update_name(f"{method} {route}")
+                request_span.set_attribute("http.route", route)
+                request_span.set_attribute("http.response.status_code", status)
+                if status >= 500:
+                    request_span.set_status(Status(StatusCode.ERROR))
@@ -0,0 +1,123 @@
+import asyncio
+from contextvars import ContextVar
+from typing import List, Optional
+from .database import get_async_session
+from .metrics import llm_latency, route_label
+from ..models.ai_usage import AIUsage
+
+# ----------------------------------------------------------------------
+# Request context
+# ----------------------------------------------------------------------
+# Set per request by UsageContextMiddleware / decode_jwt_token, or by
+# scripts via set_usage_context(), so AI helpers need no extra arguments.
+_scope: ContextVar[Optional[dict]] = ContextVar("usage_scope", default=None)
+_job: ContextVar[Optional[str]] = ContextVar("usage_job", default=None)
+_user_id: ContextVar[Optional[int]] = ContextVar("usage_user_id", default=None)
+
+
+class UsageContextMiddleware:
+    """Pure ASGI middleware exposing the current request scope to usage records."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        scope_token = _scope.set(scope)
+        user_token = _user_id.set(None)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope.reset(scope_token)
+            _user_id.reset(user_token)
+
+
+def set_usage_user(user_id: Optional[int]):
+    _user_id.set(user_id)
+
+
+def set_usage_context(job: str, user_id: Optional[int] = None):
+    """Attribute records made outside HTTP requests (CLI jobs, background tasks)."""
+    _job.set(job)
+    _user_id.set(user_id)
+
+
+def current_endpoint() -> Optional[str]:
+    scope = _scope.get()
+    if scope is None:
+        return _job.get()
+    # "/tasks/{task_id}/guide" rather than "/tasks/42/guide", so calls group per route.
+    # Routing sets the route in the shared scope before the endpoint runs.
+    method = scope.get("method", "WS")
+    return f"{method} {route_label(scope)}"
+
+
+# ----------------------------------------------------------------------
+# Recorder
+# ----------------------------------------------------------------------
+class UsageRecorder:
+    """
+    Buffers usage rows in memory and writes them in batches, so recording
+    never adds a DB round-trip to the AI call path.
+    """
+
+    def __init__(self, flush_size: int = 50, interval: float = 5.0):
+        self.flush_size = flush_size
+        self.interval = interval
+        self._pending: List[AIUsage] = []
+        self._lock = asyncio.Lock()
+
+    def record(self, function: str, model: Optional[str] = None, prompt_tokens: int = 0, completion_tokens: int = 0,
+               latency_ms: int = 0, cache_hit: bool = False, retries: int = 0, outcome: str = "ok", error: Optional[str] = None):
+        if outcome in ("ok", "error", "parse_error"):
+            # Calls that reached the provider; cache hits and offline mode never did
+            llm_latency.observe(latency_ms / 1000, function=function, outcome=outcome)
+        self._pending.append(AIUsage(
+            user_id=_user_id.get(),
+            endpoint=current_endpoint(),
+            function=function,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_ms=latency_ms,
+            cache_hit=cache_hit,
+            retries=retries,
+            outcome=outcome,
+            error=error[:120] if error else None,
+        ))
+        if len(self._pending) >= self.flush_size:
+            try:
+                asyncio.get_running_loop().create_task(self.flush())
+            except RuntimeError:
+                pass
+
+    async def flush(self):
+        async with self._lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                async with get_async_session() as session:
+                    session.add_all(batch)
+                    await session.commit()
+            except Exception as e:
+                print(f"Error writing AI usage records: {e}")
+
+    async def run(self):
+        """Background flush loop, started from the app lifespan."""
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            await self.flush()
+            raise
+
+
+usage_recorder = UsageRecorder()
+
+
+def record_cache_hit(function: str):
+    """Record an AI call that was avoided by serving a cached result."""
+    usage_recorder.record(function, cache_hit=True, outcome="cache")
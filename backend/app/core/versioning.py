@@ -0,0 +1,55 @@
+from typing import Any
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import inspect, text
+from sqlalchemy.orm.exc import StaleDataError
+from .conditional import etag_matches
+from .database import engine
+
+VERSIONED_TABLES = ("task", "project")
+
+
+def version_etag(version: int) -> str:
+    """Strong ETag of a versioned row (unique per URL, so the version is enough)."""
+    return f'"{version}"'
+
+
+def conflict(current: Any, version: int | None = None) -> HTTPException:
+    """409 carrying the current state, so the client can merge without a refetch."""
+    return HTTPException(
+        status_code=409,
+        detail={"message": "Modified by someone else", "current": jsonable_encoder(current)},
+        headers={"ETag": version_etag(version)} if version is not None else None
+    )
+
+
+def check_if_match(request: Request, row: Any):
+    """Raise 409 if the request's If-Match names another version of `row`."""
+    header = request.headers.get("if-match")
+    if header and not etag_matches(header, version_etag(row.version)):
+        raise conflict(row, row.version)
+
+
+def migrate_row_versions():
+    """Idempotent startup migration: add the version column to existing databases."""
+    with engine.begin() as conn:
+        for table in VERSIONED_TABLES:
+            columns = {c["name"] for c in inspect(conn).get_columns(table)}
+            if "version" not in columns:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+async def flush_or_conflict(session, model, row_id: int):
+    """
+    Flush pending changes. If a concurrent write won the race (the
+    conditional UPDATE matched no row), roll back and raise 409 with the
+    row as it is now.
+    """
+    try:
+        await session.flush()
+    except StaleDataError:
+        await session.rollback()
+        current = await session.get(model, row_id, populate_existing=True)
+        if current is None:
+            raise HTTPException(status_code=404, detail=f"{model.__name__} not found")
+        raise conflict(current, current.version)
@@ -1,21 +1,69 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import auth, projects, tasks, profile, chat, ai_mentor
-from app.core.database import create_db_and_tables
+from fastapi.responses import PlainTextResponse
+from app.api import auth, projects, tasks, profile, chat, ai_mentor, usage, activity, notifications
+from app.core.database import create_db_and_tables, engine, async_engine
+from app.core.metrics import METRICS_TOKEN, MetricsMiddleware, instrument_engine, render_metrics
+from app.core.tracing import TracingMiddleware, shutdown_tracing, trace_engine
+from app.core.usage import UsageContextMiddleware, usage_recorder
+from app.core.passwords import password_hasher
+from app.core.revocation import revocation_list
+from app.core.http import http_client
+from app.core.profiles import backfill_profiles
+from app.core.membership import migrate_team_members
+from app.core.versioning import migrate_row_versions
+from app.core.deletion import migrate_soft_delete, project_purger
+from app.core.channels import prepare_channels
+from app.core.chat_archive import migrate_message_archive, message_archiver
+from app.core.task_sync import purge_task_events
+from app.core.activity import purge_activity
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Create DB tables
     create_db_and_tables()
+    migrate_row_versions()
+    migrate_soft_delete()
+    migrate_team_members()
+    prepare_channels()
+    migrate_message_archive()
+    await revocation_list.purge_expired()
+    await revocation_list.sync()
+    await http_client.start()
+    await backfill_profiles()
+    await purge_task_events()
+    await purge_activity()
+    background = [
+        asyncio.create_task(usage_recorder.run()),
+        asyncio.create_task(revocation_list.run()),
+        asyncio.create_task(project_purger.run()),
+        asyncio.create_task(message_archiver.run()),
+    ]
     yield
-    # Shutdown
+    # Shutdown: stop background loops (the usage recorder flushes on cancel)
+    for task in background:
+        task.cancel()
+    for task in background:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await http_client.close()
+    password_hasher.shutdown()
+    shutdown_tracing()
 
 app = FastAPI(lifespan=lifespan)
 
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+trace_engine(engine)
+trace_engine(async_engine.sync_engine)
+
 # CORS setup
 origins = [
     "http://localhost:3000",
@@ -29,8 +77,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    # Credentialed requests ignore the "*" wildcard, so name headers the app reads
+    expose_headers=["*", "X-Task-Seq"],
 )
+app.add_middleware(UsageContextMiddleware)
+# Added after the app middleware, so latency covers it
+app.add_middleware(MetricsMiddleware)
+# Request spans wrap everything, including the metrics bookkeeping
+app.add_middleware(TracingMiddleware)
 
 
 # Include Routers
@@ -40,6 +94,16 @@ app.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
 app.include_router(profile.router, prefix="/profile", tags=["profile"])
 app.include_router(chat.router, prefix="/chat", tags=["chat"])
 app.include_router(ai_mentor.router, prefix="/ai", tags=["ai"])
+app.include_router(usage.router, prefix="/usage", tags=["usage"])
+app.include_router(activity.router, prefix="/activity", tags=["activity"])
+app.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus scrape endpoint (this worker's metrics)."""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/hello")
 async def read_root():
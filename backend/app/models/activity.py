@@ -0,0 +1,20 @@
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import Index
+from typing import Any, Dict, Optional
+from datetime import datetime
+from .profile import JSONType
+
+class Activity(SQLModel, table=True):
+    """
+    Append-only team activity, one stream per project. Ids grow with time,
+    so (project_id, id) serves both "latest first" reads and cursors.
+    """
+    __table_args__ = (Index("ix_activity_project_id_id", "project_id", "id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    project_id: int = Field(foreign_key="project.id")
+    actor_id: int = Field(foreign_key="user.id")
+    kind: str = Field(max_length=32)    # task_status / member_joined / project_created / message
+    subject_id: Optional[int] = None    # task, user or message the event is about
+    data: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -0,0 +1,23 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+class AIUsage(SQLModel, table=True):
+    """
+    Append-only record of a single LLM call (or a cache hit that avoided one).
+    Rows are never updated; aggregate them for cost and reliability reports.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    user_id: Optional[int] = Field(default=None, index=True)
+    endpoint: Optional[str] = Field(default=None, max_length=120)   # route template or job name
+    function: str = Field(max_length=60)                            # e.g. "generate_project_idea"
+    model: Optional[str] = Field(default=None, max_length=60)
+    
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: int = 0
+    cache_hit: bool = False
+    retries: int = 0
+    outcome: str = Field(default="ok", max_length=16)   # ok / error / parse_error / offline / cache
+    error: Optional[str] = Field(default=None, max_length=120)
@@ -0,0 +1,33 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+class RefreshToken(SQLModel, table=True):
+    """
+    Long-lived refresh token, stored only as a SHA-256 hash.
+    Each refresh rotates the token; all rotations share a `family_id` so
+    reuse of an already-rotated token can revoke the whole chain.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    token_hash: str = Field(index=True, unique=True)
+    family_id: str = Field(index=True)
+    
+    expires_at: datetime
+    revoked_at: Optional[datetime] = None
+    replaced_by: Optional[int] = None
+    
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class RevokedToken(SQLModel, table=True):
+    """
+    Access-token revocation entry: either a single token (`jti`) or every
+    token of `user_id` issued before `revoked_before`. Rows can be purged
+    once `expires_at` has passed.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    jti: Optional[str] = Field(default=None, index=True)
+    user_id: Optional[int] = Field(default=None, index=True)
+    revoked_before: Optional[datetime] = None
+    expires_at: datetime
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,17 +1,22 @@
 from typing import Optional, List
 from datetime import datetime
-from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index, LargeBinary
+from sqlmodel import SQLModel, Field, Relationship, Column
 
 class Channel(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True, unique=True)
     description: str
-    type: str = Field(default="public") 
+    type: str = Field(default="public")   # "public", or "project" for a team's private channel
+    project_id: Optional[int] = Field(default=None, foreign_key="project.id", unique=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     messages: List["Message"] = Relationship(back_populates="channel")
 
 class Message(SQLModel, table=True):
+    # Hot tier: recent history, paged newest first by (channel_id, id)
+    __table_args__ = (Index("ix_message_channel_id_id", "channel_id", "id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     content: str
     channel_id: int = Field(foreign_key="channel.id")
@@ -26,3 +31,21 @@ class Reaction(SQLModel, table=True):
     emoji: str
     message_id: int = Field(foreign_key="message.id")
     user_id: int = Field(foreign_key="user.id")
+
+class MessageSegment(SQLModel, table=True):
+    """
+    Cold tier: an immutable, compressed run of one channel's archived
+    messages (sorted by id). The id range is the segment's index, so a
+    history page only opens the segments that overlap it.
+    """
+    __table_args__ = (Index("ix_messagesegment_channel_id_last_id", "channel_id", "last_message_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    channel_id: int = Field(foreign_key="channel.id")
+    first_message_id: int
+    last_message_id: int
+    message_count: int
+    first_created_at: datetime
+    last_created_at: datetime
+    data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))   # zlib-compressed JSON
+    created_at: datetime = Field(default_factory=datetime.utcnow)
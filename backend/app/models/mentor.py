@@ -0,0 +1,27 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+class MentorConversation(SQLModel, table=True):
+    """
+    Server-side AI mentor conversation, optionally scoped to a project.
+    Older turns are folded into `summary` so the prompt stays bounded.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    project_id: Optional[int] = Field(default=None, foreign_key="project.id")
+    
+    summary: Optional[str] = None
+    summarized_until: int = 0   # id of the last MentorMessage folded into summary
+    
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class MentorMessage(SQLModel, table=True):
+    """A single turn in a mentor conversation."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    conversation_id: int = Field(foreign_key="mentorconversation.id", index=True)
+    role: str               # user / assistant
+    content: str
+    tokens: int = 0         # estimated prompt tokens for budgeting
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,24 @@
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import Index
+from typing import Any, Dict, Optional
+from datetime import datetime
+from .profile import JSONType
+
+class Notification(SQLModel, table=True):
+    """Something a user should see once (join request received, accepted, ...)."""
+    __table_args__ = (Index("ix_notification_user_id_id", "user_id", "id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    kind: str = Field(max_length=32)    # join_request / join_accepted / join_rejected
+    project_id: Optional[int] = Field(default=None, foreign_key="project.id")
+    actor_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    subject_id: Optional[int] = None    # e.g. the join request
+    data: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType, nullable=False))
+    read_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class NotificationCounter(SQLModel, table=True):
+    """Denormalized unread count, kept in step with Notification.read_at."""
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    unread: int = 0
@@ -0,0 +1,33 @@
+from sqlmodel import SQLModel, Field, Column, Index
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from typing import Any, Dict
+from datetime import datetime
+
+# Native JSON everywhere, JSONB on Postgres
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+class UserProfile(SQLModel, table=True):
+    """
+    Structured read model of the JSON-ish parts of a User profile.
+    Written by onboarding; the User text columns are kept for compatibility.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    skills: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType, nullable=False))
+    social_links: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType, nullable=False))
+    work_preferences: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType, nullable=False))
+    ai_preferences: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType, nullable=False))
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class UserSkill(SQLModel, table=True):
+    """
+    One row per (user, skill) with a numeric level rank, indexed for
+    queries like "users with React >= Intermediate".
+    """
+    __table_args__ = (Index("ix_userskill_skill_rank", "skill", "rank"),)
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    skill: str = Field(primary_key=True)   # lowercase, for matching
+    name: str                              # as entered by the user
+    level: str
+    rank: int
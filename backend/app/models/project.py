@@ -1,7 +1,10 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Column, Integer
 from typing import Optional
 from datetime import datetime
 
+# Optimistic concurrency, see Task
+_version = Column("version", Integer, nullable=False, server_default="1")
+
 class Project(SQLModel, table=True):
     """Project entity – solo or team project created by a user."""
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -10,4 +13,9 @@ class Project(SQLModel, table=True):
     description: str
     stack: str               # e.g. "React + FastAPI"
     type: str = "solo"      # "solo" or "team"
+    members_count: int = 0  # denormalized count of TeamMember rows
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    deleted_at: Optional[datetime] = Field(default=None, index=True)  # set on delete; purged in the background
+    version: int = Field(default=1, sa_column=_version)
+
+    __mapper_args__ = {"version_id_col": _version}
@@ -1,7 +1,11 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Column, Integer
 from typing import Optional
 from datetime import datetime
 
+# Bumped on every ORM update, which then only applies if the row is still at
+# the version that was read (UPDATE ... WHERE version = ?)
+_version = Column("version", Integer, nullable=False, server_default="1")
+
 class Task(SQLModel, table=True):
     """Task entity belonging to a project."""
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -14,3 +18,6 @@ class Task(SQLModel, table=True):
     pr_url: Optional[str] = None
     content: Optional[str] = Field(default=None, description="Detailed AI guide for the task")
     assigned_to: Optional[int] = Field(default=None, foreign_key="user.id", description="User ID who is working on this task")
+    version: int = Field(default=1, sa_column=_version)
+
+    __mapper_args__ = {"version_id_col": _version}
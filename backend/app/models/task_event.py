@@ -0,0 +1,16 @@
+from sqlmodel import SQLModel, Field, Column
+from typing import Any, Dict, Optional
+from datetime import datetime
+from .profile import JSONType
+
+class TaskEvent(SQLModel, table=True):
+    """
+    Per-project task change log. The id doubles as the sequence number
+    clients resume from after reconnecting to the board channel.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    project_id: int = Field(foreign_key="project.id", index=True)
+    task_id: int
+    op: str                 # "create", "update" or "delete"
+    fields: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
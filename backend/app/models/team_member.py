@@ -1,11 +1,16 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, UniqueConstraint
 from typing import Optional
 from datetime import datetime
 
 class TeamMember(SQLModel, table=True):
-    """Link table between Users and Projects with role information."""
+    """
+    Link table between Users and Projects with role information.
+    Authoritative for membership: the owner and every accepted member.
+    """
+    __table_args__ = (UniqueConstraint("project_id", "user_id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id")
-    project_id: int = Field(foreign_key="project.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
+    project_id: int = Field(foreign_key="project.id", index=True)
     role: str = "member"   # e.g. "owner", "maintainer", "member"
     joined_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,139 @@
+"""
+Pre-generate personalized project suggestions offline.
+
+Users are grouped into cohorts by (primary_role, level, normalized skills);
+each cohort gets ONE generated pool of ideas which is copied into the
+ProjectSuggestion rows of every member. /projects/suggestions then only
+reads from the database on first page load.
+
+Meant to run on a schedule, e.g. nightly via cron:
+    0 3 * * *  cd backend && python pregenerate_suggestions.py --concurrency 4
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+import time
+from collections import Counter, defaultdict
+from sqlmodel import select, func, delete
+
+from app.core.database import create_db_and_tables, get_async_session
+from app.core.ai import generate_personalized_ideas
+from app.core.usage import set_usage_context, usage_recorder
+from app.core.idea_index import DuplicateFilter
+from app.core.suggestions import (
+    SUGGESTIONS_PER_USER,
+    cohort_key,
+    profile_inputs,
+    serialize_suggestion,
+    suggestion_from_idea,
+)
+from app.models.project import Project
+from app.models.user import User
+from app.models.suggestion import ProjectSuggestion
+
+
+async def load_cohorts(refresh: bool):
+    """Return {cohort_key: [user, ...]} for users that need suggestions."""
+    async with get_async_session() as session:
+        users = (await session.execute(select(User))).scalars().all()
+
+        counts = {}
+        if not refresh:
+            count_stmt = select(ProjectSuggestion.user_id, func.count()).group_by(ProjectSuggestion.user_id)
+            counts = dict((await session.execute(count_stmt)).all())
+
+    cohorts = defaultdict(list)
+    for user in users:
+        if counts.get(user.id, 0) >= SUGGESTIONS_PER_USER:
+            continue
+        cohorts[cohort_key(user)].append(user)
+    return cohorts
+
+
+async def fill_cohort(users, refresh: bool):
+    """Generate one idea pool for the cohort and save it for every member."""
+    role, level, skills = profile_inputs(users[0])
+    ideas = await generate_personalized_ideas(role, level, skills)
+    if not ideas:
+        return 0
+
+    user_ids = [u.id for u in users]
+    added = 0
+    async with get_async_session() as session:
+        if refresh:
+            await session.execute(delete(ProjectSuggestion).where(ProjectSuggestion.user_id.in_(user_ids)))
+            existing = []
+        else:
+            stmt = select(ProjectSuggestion).where(ProjectSuggestion.user_id.in_(user_ids))
+            existing = (await session.execute(stmt)).scalars().all()
+
+        # Like /projects/suggestions: skip near-duplicates of what each member
+        # already has or owns, not just exact title matches
+        proj_stmt = select(Project).where(Project.owner_id.in_(user_ids))
+        owned = (await session.execute(proj_stmt)).scalars().all()
+        kept_by_user = defaultdict(list)
+        for s in existing:
+            kept_by_user[s.user_id].append(serialize_suggestion(s))
+        for p in owned:
+            kept_by_user[p.owner_id].append({"title": p.title, "description": p.description, "stack": p.stack})
+        counts = Counter(s.user_id for s in existing)
+
+        for user_id in user_ids:
+            dedup = DuplicateFilter(kept_by_user[user_id])
+            for idea in ideas:
+                if counts[user_id] >= SUGGESTIONS_PER_USER:
+                    break
+                if not dedup.try_accept(idea):
+                    continue
+                session.add(suggestion_from_idea(user_id, idea))
+                counts[user_id] += 1
+                added += 1
+
+        await session.commit()
+    return added
+
+
+async def run(concurrency: int, refresh: bool):
+    create_db_and_tables()
+    set_usage_context("pregenerate_suggestions")
+    cohorts = await load_cohorts(refresh)
+    total_users = sum(len(u) for u in cohorts.values())
+    print(f"{total_users} users in {len(cohorts)} cohorts need suggestions (concurrency={concurrency})")
+    if not cohorts:
+        return
+
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+    added_total = 0
+    failed = 0
+    started = time.monotonic()
+
+    async def worker(key, users):
+        nonlocal done, added_total, failed
+        async with semaphore:
+            try:
+                added = await fill_cohort(users, refresh)
+                added_total += added
+                status = f"+{added} suggestions"
+            except Exception as e:
+                failed += 1
+                status = f"FAILED ({e})"
+        done += 1
+        role, level, skills = key
+        print(f"[{done}/{len(cohorts)}] {role} / {level} / {len(skills)} skills, {len(users)} users: {status}")
+
+    await asyncio.gather(*(worker(key, users) for key, users in cohorts.items()))
+    await usage_recorder.flush()
+
+    elapsed = time.monotonic() - started
+    print(f"Done in {elapsed:.1f}s: {added_total} suggestions saved, {failed} cohorts failed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate project suggestions per user cohort.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max concurrent AI calls")
+    parser.add_argument("--refresh", action="store_true", help="Replace existing suggestions for all users")
+    args = parser.parse_args()
+    asyncio.run(run(max(1, args.concurrency), args.refresh))
@@ -0,0 +1,49 @@
+import os
+import tempfile
+from itertools import count
+
+# Configure before the app (and its engine) is imported
+_db_dir = tempfile.mkdtemp(prefix="coforge-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.pop("GROQ_API_KEY", None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+_users = count(1)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.main import app as application
+    # Entering one client runs the lifespan (tables, migrations) for the session
+    with TestClient(application):
+        yield application
+
+
+@pytest.fixture
+def make_user(app):
+    """Register a fresh user and return a client logged in as them (with .user_id set)."""
+    def make(password: str = "password123") -> TestClient:
+        n = next(_users)
+        client = TestClient(app)
+        email = f"user{n}@example.com"
+        response = client.post("/auth/register", json={"username": f"user{n}", "email": email, "password": password})
+        assert response.status_code in (200, 201), response.text
+        response = client.post("/auth/login/email", json={"email": email, "password": password})
+        assert response.status_code == 200, response.text
+        client.email = email
+        client.user_id = client.get("/auth/me").json()["id"]
+        return client
+    return make
+
+
+@pytest.fixture
+def board(make_user):
+    """An owner client and their project's generated tasks, in board order."""
+    owner = make_user()
+    project = owner.post("/projects/", json={"title": "Board", "description": "d", "stack": "React", "type": "team"}).json()
+    tasks = owner.post(f"/tasks/{project['id']}/generate").json()
+    return owner, project["id"], tasks
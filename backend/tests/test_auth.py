@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+import app.api.auth as auth
+import app.core.revocation as revocation
+
+
+def freeze(monkeypatch, moment: datetime):
+    """Pin utcnow() for token issuing and revocation to `moment`."""
+    class Frozen(datetime):
+        @classmethod
+        def utcnow(cls):
+            return moment
+    monkeypatch.setattr(auth, "datetime", Frozen)
+    monkeypatch.setattr(revocation, "datetime", Frozen)
+
+
+def client_with(app, **cookies) -> TestClient:
+    client = TestClient(app)
+    for name, value in cookies.items():
+        client.cookies.set(name, value)
+    return client
+
+
+def login(client):
+    response = client.post("/auth/login/email", json={"email": client.email, "password": "password123"})
+    assert response.status_code == 200, response.text
+
+
+def test_login_in_the_same_second_as_logout_all_survives(app, make_user, monkeypatch):
+    user = make_user()
+    # Late in the second, so a fractional cutoff would land after the new token's iat
+    now = datetime.utcnow().replace(microsecond=999_999)
+    freeze(monkeypatch, now - timedelta(seconds=2))
+    login(user)
+    old_access = user.cookies["access_token"]
+
+    freeze(monkeypatch, now)
+    assert user.post("/auth/logout-all").status_code == 200
+    login(user)
+
+    assert user.get("/auth/me").status_code == 200
+    assert client_with(app, access_token=old_access).get("/auth/me").status_code == 401
+
+
+def test_refresh_rotates_the_token(app, make_user):
+    user = make_user()
+    old_refresh = user.cookies["refresh_token"]
+    assert user.post("/auth/refresh").status_code == 200
+    assert user.cookies["refresh_token"] != old_refresh
+    assert user.get("/auth/me").status_code == 200
+
+
+def test_reuse_within_grace_window_keeps_the_session(app, make_user):
+    user = make_user()
+    old_refresh = user.cookies["refresh_token"]
+    assert user.post("/auth/refresh").status_code == 200
+
+    # A second tab racing the rotation: refused, but nothing else is revoked
+    assert client_with(app, refresh_token=old_refresh).post("/auth/refresh").status_code == 401
+    assert user.post("/auth/refresh").status_code == 200
+
+
+def test_reuse_after_grace_window_revokes_the_family(app, make_user, monkeypatch):
+    monkeypatch.setattr(auth, "REFRESH_REUSE_GRACE_SECONDS", -1)
+    user = make_user()
+    old_refresh = user.cookies["refresh_token"]
+    assert user.post("/auth/refresh").status_code == 200
+
+    assert client_with(app, refresh_token=old_refresh).post("/auth/refresh").status_code == 401
+    # The legitimate holder's newer token went down with the family
+    assert user.post("/auth/refresh").status_code == 401
+
+
+def test_logout_all_revokes_every_session(app, make_user, monkeypatch):
+    user = make_user()
+    freeze(monkeypatch, datetime.utcnow() - timedelta(seconds=2))
+    login(user)
+    other_device = client_with(app, access_token=user.cookies["access_token"], refresh_token=user.cookies["refresh_token"])
+
+    monkeypatch.undo()
+    assert user.post("/auth/logout-all").status_code == 200
+
+    assert other_device.get("/auth/me").status_code == 401
+    assert other_device.post("/auth/refresh").status_code == 401
@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete, select
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.database import engine
+from app.models.chat import Channel
+
+
+def team_project(client, title):
+    return client.post("/projects/", json={"title": title, "description": "d", "stack": "React", "type": "team"}).json()["id"]
+
+
+def team_channels(client):
+    return {c["project_id"] for c in client.get("/chat/channels").json() if c["type"] == "project"}
+
+
+def test_partly_conflicting_channel_creation_is_completed(make_user):
+    owner = make_user()
+    blocked, free = team_project(owner, "Blocked"), team_project(owner, "Free")
+    # A row holding the first project's channel name makes the batch insert fail
+    with Session(engine) as session:
+        session.add(Channel(name=f"project-{blocked}", description=""))
+        session.commit()
+
+    try:
+        # The other team's channel is still created, and the short list is not cached
+        assert team_channels(owner) == {free}
+        with Session(engine) as session:
+            session.exec(delete(Channel).where(Channel.name == f"project-{blocked}"))
+            session.commit()
+        assert team_channels(owner) == {blocked, free}
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(Channel).where(Channel.name == f"project-{blocked}", Channel.project_id.is_(None)))
+            session.commit()
+
+
+@pytest.mark.parametrize("token", [None, "not-a-jwt"])
+def test_chat_socket_needs_a_valid_token(app, token):
+    with Session(engine) as session:
+        channel_id = session.exec(select(Channel.id).where(Channel.name == "general")).one()
+    url = f"/chat/ws/{channel_id}" + (f"?token={token}" if token else "")
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with TestClient(app).websocket_connect(url) as ws:
+            ws.receive_json()
+    assert closed.value.code == 1008
+
+
+def test_chat_socket_refuses_revoked_tokens(app, make_user):
+    user = make_user()
+    token = user.cookies["access_token"]
+    user.post("/auth/logout")
+    with Session(engine) as session:
+        channel_id = session.exec(select(Channel.id).where(Channel.name == "general")).one()
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with TestClient(app).websocket_connect(f"/chat/ws/{channel_id}?token={token}") as ws:
+            ws.receive_json()
+    assert closed.value.code == 1008
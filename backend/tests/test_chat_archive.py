@@ -0,0 +1,44 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from app.core.chat_archive import history_page, message_archiver
+from app.core.database import engine, get_async_session
+from app.models.chat import Channel, Message
+
+
+def post(session, channel, user_id, content, age_days, parent=None) -> Message:
+    message = Message(channel_id=channel.id, user_id=user_id, content=content, parent_id=parent and parent.id,
+                      created_at=datetime.utcnow() - timedelta(days=age_days))
+    session.add(message)
+    session.commit()
+    session.refresh(message)
+    return message
+
+
+def test_whole_thread_stays_hot_while_a_reply_is_recent(make_user):
+    user_id = make_user().user_id
+    with Session(engine) as session:
+        channel = Channel(name=f"archive-{user_id}", description="")
+        session.add(channel)
+        session.commit()
+        session.refresh(channel)
+        loose = post(session, channel, user_id, "unrelated", 90)
+        root = post(session, channel, user_id, "root", 80)
+        middle = post(session, channel, user_id, "reply", 70, parent=root)
+        post(session, channel, user_id, "recent reply", 1, parent=middle)
+        channel_id, ids = channel.id, (loose.id, root.id, middle.id)
+
+    asyncio.run(message_archiver.archive_channel(channel_id, datetime.utcnow() - timedelta(days=30)))
+
+    with Session(engine) as session:
+        hot = set(session.exec(select(Message.id).where(Message.channel_id == channel_id)).all())
+    assert ids[0] not in hot
+    assert {ids[1], ids[2]} <= hot
+
+    async def history():
+        async with get_async_session() as session:
+            return await history_page(session, channel_id, None, 10)
+    # Archived or not, history still reads as one timeline
+    assert [r["content"] for r in asyncio.run(history())] == ["recent reply", "reply", "root", "unrelated"]
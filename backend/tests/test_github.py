@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import app.core.http as http
+from app.core import github
+from app.core.http import http_client
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Route the shared HTTP client to a fake GitHub; returns the requests it received."""
+    routes, received = {}, []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append(request)
+        respond = routes[(request.method, request.url.path)]
+        return respond(request) if callable(respond) else respond.pop(0)
+
+    monkeypatch.setattr(github, "GITHUB_OAUTH_URL", "http://github.test")
+    monkeypatch.setattr(github, "GITHUB_API_URL", "http://api.github.test")
+    monkeypatch.setattr(github, "GITHUB_CLIENT_ID", "client-id")
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    async def no_backoff(seconds):
+        pass
+    monkeypatch.setattr(http, "asyncio", SimpleNamespace(sleep=no_backoff))
+    return SimpleNamespace(routes=routes, received=received)
+
+
+def test_exchange_code_and_fetch_user(upstream):
+    upstream.routes[("POST", "/login/oauth/access_token")] = lambda r: httpx.Response(200, json={"access_token": "gho_token"})
+    upstream.routes[("GET", "/user")] = lambda r: httpx.Response(200, json={"id": 7, "login": "octo"})
+
+    assert asyncio.run(github.exchange_code("the-code")) == "gho_token"
+    assert asyncio.run(github.fetch_user("gho_token")) == {"id": 7, "login": "octo"}
+
+    exchange, user = upstream.received
+    assert b"client_id=client-id" in exchange.content and b"code=the-code" in exchange.content
+    assert exchange.headers["Accept"] == "application/json"
+    assert user.url.host == "api.github.test"
+    assert user.headers["Authorization"] == "token gho_token"
+
+
+def test_idempotent_calls_retry_gateway_errors(upstream):
+    upstream.routes[("GET", "/user")] = [httpx.Response(503), httpx.Response(502), httpx.Response(200, json={"id": 7, "login": "octo"})]
+    assert asyncio.run(github.fetch_user("gho_token"))["login"] == "octo"
+    assert len(upstream.received) == 3
+
+
+def test_retries_give_up_after_the_limit(upstream):
+    upstream.routes[("GET", "/user")] = lambda r: httpx.Response(503)
+    with pytest.raises(github.GitHubError):
+        asyncio.run(github.fetch_user("gho_token"))
+    assert len(upstream.received) == 1 + http.HTTP_RETRIES
+
+
+def test_code_exchange_is_not_retried(upstream):
+    def unreachable(request):
+        raise httpx.ConnectError("connection refused", request=request)
+    upstream.routes[("POST", "/login/oauth/access_token")] = unreachable
+    with pytest.raises(github.GitHubError):
+        asyncio.run(github.exchange_code("the-code"))
+    assert len(upstream.received) == 1
+
+
+def test_callback_reports_upstream_failure_as_502(app, upstream):
+    upstream.routes[("POST", "/login/oauth/access_token")] = lambda r: httpx.Response(200, json={"access_token": "gho_token"})
+    upstream.routes[("GET", "/user")] = lambda r: httpx.Response(500)
+    response = TestClient(app, follow_redirects=False).get("/auth/callback", params={"code": "the-code"})
+    assert response.status_code == 502
+
+
+def test_callback_rejects_a_refused_code(app, upstream):
+    upstream.routes[("POST", "/login/oauth/access_token")] = lambda r: httpx.Response(200, json={"error": "bad_verification_code"})
+    response = TestClient(app, follow_redirects=False).get("/auth/callback", params={"code": "stale"})
+    assert response.status_code == 400
@@ -0,0 +1,42 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core import profiles
+from app.core.database import engine
+from app.models.profile import UserProfile
+from app.models.user import User
+
+
+def onboarding(skills):
+    return {
+        "first_name": "Ada", "last_name": "L", "country": "UK", "timezone": "Europe/London", "language": "English",
+        "primary_role": "Frontend Developer", "level": "Mid-Level", "bio": "", "skills": skills, "social_links": {},
+        "primary_goal": "Ship", "weekly_availability": "10-20h", "work_preference": {"mode": "team"}, "ai_preference": {},
+    }
+
+
+def test_skill_search_requires_login(app, make_user):
+    user = make_user()
+    assert user.put("/profile/onboarding", json=onboarding({"Elm": "Expert"})).status_code == 200
+
+    assert TestClient(app).get("/profile/search", params={"skill": "elm"}).status_code == 401
+
+    results = make_user().get("/profile/search", params={"skill": "elm", "min_level": "Advanced"}).json()
+    assert [r["id"] for r in results] == [user.user_id]
+
+
+def test_public_profile_reflects_other_workers_once_its_render_expires(app, make_user):
+    user = make_user()
+    assert user.put("/profile/onboarding", json=onboarding({"Elm": "Expert"})).status_code == 200
+    viewer = TestClient(app)
+    assert viewer.get(f"/profile/{user.user_id}").json()["skills"] == {"Elm": "Expert"}
+
+    # Another worker saves a change: this one's user and profile caches never hear of it
+    with Session(engine) as session:
+        session.get(User, user.user_id).bio = "Elsewhere"
+        session.get(UserProfile, user.user_id).skills = {"Elm": "Expert", "Rust": "Junior"}
+        session.commit()
+    profiles._public_cache.clear()
+
+    body = viewer.get(f"/profile/{user.user_id}").json()
+    assert (body["bio"], body["skills"]) == ("Elsewhere", {"Elm": "Expert", "Rust": "Junior"})
@@ -0,0 +1,39 @@
+import asyncio
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.core.database import engine
+from app.core.deletion import project_purger
+from app.models.project import Project
+from app.models.task import Task
+
+
+def remaining(project_id: int) -> tuple:
+    """(project rows, task rows) still stored, soft-deleted or not."""
+    with Session(engine) as session:
+        projects = session.exec(
+            select(func.count(Project.id)).where(Project.id == project_id).execution_options(include_deleted=True)
+        ).one()
+        tasks = session.exec(select(func.count(Task.id)).where(Task.project_id == project_id)).one()
+    return projects, tasks
+
+
+def test_deleted_project_disappears_then_is_purged(board):
+    owner, project_id, _ = board
+    assert owner.delete(f"/projects/{project_id}").status_code == 204
+
+    # Hidden at once, even before its rows are gone
+    assert owner.get(f"/projects/{project_id}").status_code == 404
+    assert owner.get(f"/tasks/{project_id}").status_code == 404
+    assert project_id not in [p["id"] for p in owner.get("/projects/").json()]
+
+    # What the background loop does once woken
+    asyncio.run(project_purger.purge_pending())
+    assert remaining(project_id) == (0, 0)
+
+
+def test_only_the_owner_can_delete(board, make_user):
+    owner, project_id, _ = board
+    assert make_user().delete(f"/projects/{project_id}").status_code == 404
+    assert owner.get(f"/projects/{project_id}").status_code == 200
@@ -0,0 +1,55 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+from sqlalchemy.pool import StaticPool
+
+from app.core.metrics import MetricsMiddleware, instrument_engine
+from app.core.query_budget import SQL_REPEAT_THRESHOLD, QueryBudgetExceeded
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Item(Base):
+    __tablename__ = "item"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str]
+
+
+@pytest.fixture
+def client():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    instrument_engine(engine)
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.post("/items")
+    def create_items():
+        # One flush, one INSERT per row: writes are not held to the budget
+        with Session(engine) as session:
+            session.add_all(Item(name=f"item {i}") for i in range(SQL_REPEAT_THRESHOLD * 2))
+            session.commit()
+        return {"ok": True}
+
+    @app.get("/items")
+    def list_items():
+        # The N+1 shape: one lookup per id
+        with Session(engine) as session:
+            return [session.scalar(select(Item.name).where(Item.id == i)) for i in range(1, SQL_REPEAT_THRESHOLD + 1)]
+
+    return TestClient(app)
+
+
+def test_flushed_writes_pass(client):
+    assert client.post("/items").status_code == 200
+
+
+def test_repeated_reads_fail_under_pytest(client):
+    client.post("/items")
+    with pytest.raises(QueryBudgetExceeded, match="GET /items"):
+        client.get("/items")
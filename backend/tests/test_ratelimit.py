@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.core.ratelimit as ratelimit
+from app.core.ratelimit import MemoryBackend, RateLimit, rate_limiter
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    rate_limiter.memory.reset()
+    yield
+    rate_limiter.memory.reset()
+
+
+def attempt(client, email="nobody@example.com", **headers):
+    return client.post("/auth/login/email", json={"email": email, "password": "wrong"}, headers=headers)
+
+
+def test_login_is_limited_per_ip(app, limits):
+    client = TestClient(app)
+    for _ in range(10):
+        assert attempt(client).status_code == 401
+    response = attempt(client)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.headers["X-RateLimit-Limit"] == "10"
+    assert response.headers["X-RateLimit-Remaining"] == "0"
+
+
+def test_login_is_limited_per_account_across_ips(app, limits, monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUST_PROXY_HEADERS", True)
+    client = TestClient(app)
+    for i in range(10):
+        assert attempt(client, **{"X-Forwarded-For": f"10.0.0.{i}"}).status_code == 401
+    assert attempt(client, **{"X-Forwarded-For": "10.0.0.99"}).status_code == 429
+    # Other accounts from a fresh address are unaffected
+    assert attempt(client, "somebody@example.com", **{"X-Forwarded-For": "10.0.0.100"}).status_code == 401
+
+
+def test_previous_window_still_counts(monkeypatch):
+    backend, rule = MemoryBackend(), RateLimit(10, 60)
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(time=lambda: 60 * 1000 + 50))
+    for _ in range(10):
+        asyncio.run(backend.hit("60:test:key", rule))
+
+    # 15s into the next window, 3/4 of the previous one still overlaps: 7.5 + 3 > 10
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(time=lambda: 60 * 1001 + 15))
+    results = [asyncio.run(backend.hit("60:test:key", rule)) for _ in range(3)]
+    assert [r.allowed for r in results] == [True, True, False]
@@ -0,0 +1,52 @@
+import asyncio
+
+from sqlmodel import Session, select
+
+import app.core.ai as ai
+import pregenerate_suggestions
+from app.core.database import engine
+from app.core.idea_index import idea_index
+from app.models.suggestion import ProjectSuggestion
+from app.models.user import User
+
+
+def idea(title, description="A board for tracking chores between flatmates"):
+    return {"title": title, "description": description, "stack": "Elixir, Phoenix", "difficulty": "Intermediate"}
+
+
+def generates(monkeypatch, module, ideas):
+    async def generate(role, level, skills):
+        return ideas
+    monkeypatch.setattr(module, "generate_personalized_ideas", generate)
+
+
+def indexed(title):
+    return idea_index._key(title) in idea_index._rows
+
+
+def test_refresh_drops_replaced_suggestions_from_the_index(make_user, monkeypatch):
+    user = make_user()
+    generates(monkeypatch, ai, [idea(f"Chore Wheel {user.user_id}")])
+    assert user.post("/projects/suggestions/refresh").status_code == 200
+    assert indexed(f"Chore Wheel {user.user_id}")
+
+    generates(monkeypatch, ai, [idea(f"Recipe Swap {user.user_id}", "Trade weeknight recipes with neighbours")])
+    assert user.post("/projects/suggestions/refresh").status_code == 200
+    assert not indexed(f"Chore Wheel {user.user_id}")
+    assert indexed(f"Recipe Swap {user.user_id}")
+
+
+def test_pregenerated_pool_skips_near_duplicates(make_user, monkeypatch):
+    user_id = make_user().user_id
+    generates(monkeypatch, pregenerate_suggestions, [
+        idea("TaskFlow"),
+        idea("Task Flow Pro"),
+        idea("Garden Planner", "Plan which vegetables to sow each month"),
+    ])
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+    assert asyncio.run(pregenerate_suggestions.fill_cohort([user], refresh=False)) == 2
+
+    with Session(engine) as session:
+        titles = session.exec(select(ProjectSuggestion.title).where(ProjectSuggestion.user_id == user_id)).all()
+    assert sorted(titles) == ["Garden Planner", "TaskFlow"]
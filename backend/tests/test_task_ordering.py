@@ -0,0 +1,59 @@
+def board_ids(client, project_id):
+    return [t["id"] for t in client.get(f"/tasks/{project_id}").json()]
+
+
+def test_move_between_neighbours(board):
+    owner, project_id, (first, second, third) = board
+    response = owner.post(f"/tasks/{project_id}/bulk", json={"changes": [
+        {"id": third["id"], "after_id": first["id"], "before_id": second["id"]}
+    ]})
+    assert response.status_code == 200
+    assert board_ids(owner, project_id) == [first["id"], third["id"], second["id"]]
+
+
+def test_move_to_start_and_end(board):
+    owner, project_id, (first, second, third) = board
+    response = owner.post(f"/tasks/{project_id}/bulk", json={"changes": [
+        {"id": third["id"], "after_id": None, "before_id": first["id"]},
+        {"id": first["id"], "after_id": second["id"], "before_id": None},
+    ]})
+    assert response.status_code == 200
+    assert board_ids(owner, project_id) == [third["id"], second["id"], first["id"]]
+
+
+def test_moves_into_an_exhausted_gap_rebalance(board):
+    owner, project_id, (first, second, third) = board
+    # Keep halving the gap after `first` until it runs out and the list is respaced
+    for _ in range(12):
+        response = owner.post(f"/tasks/{project_id}/bulk", json={"changes": [
+            {"id": third["id"], "after_id": first["id"], "before_id": second["id"]},
+            {"id": second["id"], "after_id": first["id"], "before_id": third["id"]},
+        ]})
+        assert response.status_code == 200
+    orders = [t["order"] for t in owner.get(f"/tasks/{project_id}").json()]
+    assert orders == sorted(set(orders))
+
+
+def test_inverted_neighbours_are_rejected(board):
+    owner, project_id, (first, second, third) = board
+    before = owner.get(f"/tasks/{project_id}").json()
+    response = owner.post(f"/tasks/{project_id}/bulk", json={"changes": [
+        {"id": third["id"], "after_id": second["id"], "before_id": first["id"]}
+    ]})
+    assert response.status_code == 400
+    # All or nothing: the batch left the board untouched
+    assert owner.get(f"/tasks/{project_id}").json() == before
+
+
+def test_task_cannot_be_its_own_neighbour(board):
+    owner, project_id, (first, second, _) = board
+    response = owner.post(f"/tasks/{project_id}/bulk", json={"changes": [
+        {"id": first["id"], "after_id": first["id"], "before_id": second["id"]}
+    ]})
+    assert response.status_code == 400
+
+
+def test_bulk_needs_ownership(board, make_user):
+    _, project_id, (first, _, _) = board
+    response = make_user().post(f"/tasks/{project_id}/bulk", json={"changes": [{"id": first["id"], "status": "done"}]})
+    assert response.status_code == 404
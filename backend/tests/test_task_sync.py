@@ -0,0 +1,40 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+
+def test_reconnect_replays_missed_changes(board):
+    owner, project_id, tasks = board
+    seq = int(owner.get(f"/tasks/{project_id}").headers["X-Task-Seq"])
+    owner.patch(f"/tasks/{tasks[0]['id']}", json={"status": "done"})
+    owner.delete(f"/tasks/{tasks[1]['id']}")
+
+    with owner.websocket_connect(f"/tasks/ws/{project_id}?since={seq}") as ws:
+        update, delete = ws.receive_json(), ws.receive_json()
+    assert (update["op"], update["task_id"], update["fields"]) == ("update", tasks[0]["id"], {"status": "done", "version": tasks[0]["version"] + 1})
+    assert (delete["op"], delete["task_id"]) == ("delete", tasks[1]["id"])
+    assert seq < update["seq"] < delete["seq"]
+
+
+def test_replay_from_the_start_includes_creates(board):
+    owner, project_id, tasks = board
+    with owner.websocket_connect(f"/tasks/ws/{project_id}?since=0") as ws:
+        creates = [ws.receive_json() for _ in tasks]
+    assert [(m["op"], m["task_id"]) for m in creates] == [("create", t["id"]) for t in tasks]
+
+
+def test_live_changes_are_pushed(board):
+    owner, project_id, tasks = board
+    with owner.websocket_connect(f"/tasks/ws/{project_id}") as ws:
+        resync = ws.receive_json()
+        owner.patch(f"/tasks/{tasks[2]['id']}", json={"status": "in_progress"})
+        message = ws.receive_json()
+    assert resync["type"] == "resync"
+    assert (message["op"], message["task_id"], message["seq"]) == ("update", tasks[2]["id"], resync["seq"] + 1)
+
+
+def test_non_members_are_refused(board, make_user):
+    _, project_id, _ = board
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with make_user().websocket_connect(f"/tasks/ws/{project_id}?since=0") as ws:
+            ws.receive_json()
+    assert closed.value.code == 1008
@@ -0,0 +1,48 @@
+def test_task_patch_with_stale_if_match_conflicts(board):
+    owner, _, (task, _, _) = board
+    response = owner.patch(f"/tasks/{task['id']}", json={"status": "in_progress"}, headers={"If-Match": f'"{task["version"]}"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{task["version"] + 1}"'
+
+    # A second client still holding the old version
+    response = owner.patch(f"/tasks/{task['id']}", json={"status": "done"}, headers={"If-Match": f'"{task["version"]}"'})
+    assert response.status_code == 409
+    assert response.headers["ETag"] == f'"{task["version"] + 1}"'
+    assert response.json()["detail"]["current"]["status"] == "in_progress"
+
+
+def test_task_patch_without_if_match_overwrites(board):
+    owner, _, (task, _, _) = board
+    owner.patch(f"/tasks/{task['id']}", json={"status": "in_progress"})
+    response = owner.patch(f"/tasks/{task['id']}", json={"status": "done"})
+    assert response.status_code == 200
+    assert response.json()["version"] == task["version"] + 2
+
+
+def test_bulk_with_stale_version_conflicts(board):
+    owner, project_id, (first, second, _) = board
+    owner.patch(f"/tasks/{first['id']}", json={"status": "done"})
+    response = owner.post(f"/tasks/{project_id}/bulk", json={"changes": [
+        {"id": second["id"], "status": "done", "version": second["version"]},
+        {"id": first["id"], "status": "in_progress", "version": first["version"]},
+    ]})
+    assert response.status_code == 409
+    assert [t["id"] for t in response.json()["detail"]["current"]] == [first["id"]]
+    # All or nothing: the fresh change in the batch was not applied either
+    statuses = {t["id"]: t["status"] for t in owner.get(f"/tasks/{project_id}").json()}
+    assert statuses[second["id"]] == second["status"]
+
+
+def test_project_patch_with_stale_if_match_conflicts(board):
+    owner, project_id, _ = board
+    response = owner.get(f"/projects/{project_id}")
+    etag = response.headers["ETag"]
+    assert owner.get(f"/projects/{project_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    response = owner.patch(f"/projects/{project_id}", json={"title": "Renamed"}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    response = owner.patch(f"/projects/{project_id}", json={"title": "Lost update"}, headers={"If-Match": etag})
+    assert response.status_code == 409
+    assert response.json()["detail"]["current"]["title"] == "Renamed"
@@ -8,9 +8,10 @@ import {
     Smile,
     Users,
     Menu,
-    Layers
+    Layers,
+    Lock
 } from "lucide-react";
-import axios from "axios";
+import { api, refreshBeforeReconnect, WS_BASE_URL } from "@/lib/api";
 import { toast } from "sonner";
 import dynamic from 'next/dynamic';
 import UserProfileModal from "@/components/dashboard/UserProfileModal";
@@ -24,8 +25,16 @@ interface Channel {
     name: string;
     description: string;
     type: string;
+    project_id?: number | null;
 }
 
+// Team channels are named after their project
+const channelLabel = (channel: Channel | null) =>
+    channel ? (channel.type === "project" ? channel.description : channel.name) : null;
+
+// Matches the API's default page size
+const HISTORY_PAGE_SIZE = 50;
+
 interface Message {
     id: number;
     content: string;
@@ -40,6 +49,8 @@ export default function GlobalChat() {
     const [channels, setChannels] = useState<Channel[]>([]);
     const [activeChannel, setActiveChannel] = useState<Channel | null>(null);
     const [messages, setMessages] = useState<Message[]>([]);
+    const [hasOlder, setHasOlder] = useState(false);
+    const loadingOlderRef = useRef(false);
     const [inputValue, setInputValue] = useState("");
     const [isConnected, setIsConnected] = useState(false);
     const [isSidebarOpen, setIsSidebarOpen] = useState(false); // Mobile toggle: Closed by default
@@ -61,8 +72,8 @@ export default function GlobalChat() {
         const init = async () => {
             try {
                 const [userRes, channelRes] = await Promise.all([
-                    axios.get("http://localhost:8000/profile/me", { withCredentials: true }),
-                    axios.get("http://localhost:8000/chat/channels", { withCredentials: true })
+                    api.get("/profile/me"),
+                    api.get("/chat/channels")
                 ]);
                 setCurrentUser(userRes.data);
                 setChannels(channelRes.data);
@@ -83,12 +94,14 @@ export default function GlobalChat() {
 
         let isMounted = true;
         setMessages([]); // Clear old messages
+        setHasOlder(false);
 
         const fetchHistory = async () => {
             try {
-                const res = await axios.get(`http://localhost:8000/chat/channels/${activeChannel.id}/messages`, { withCredentials: true });
+                const res = await api.get(`/chat/channels/${activeChannel.id}/messages`);
                 if (isMounted) {
                     setMessages(res.data);
+                    setHasOlder(res.data.length === HISTORY_PAGE_SIZE);
                     // Instant scroll to bottom after render
                     setTimeout(() => {
                         if (chatContainerRef.current) {
@@ -107,7 +120,9 @@ export default function GlobalChat() {
         return () => {
             isMounted = false;
             if (socketRef.current) {
-                socketRef.current.close();
+                const socket = socketRef.current;
+                socketRef.current = null;
+                socket.close();
             }
         };
     }, [activeChannel]);
@@ -115,11 +130,12 @@ export default function GlobalChat() {
     // 3. Connect WebSocket
     const connectWebSocket = (channelId: number) => {
         if (socketRef.current) {
-            socketRef.current.close();
+            const previous = socketRef.current;
+            socketRef.current = null; // Replaced on purpose: don't reconnect it
+            previous.close();
         }
 
-        const wsUrl = `ws://localhost:8000/chat/ws/${channelId}`;
-        const ws = new WebSocket(wsUrl);
+        const ws = new WebSocket(`${WS_BASE_URL}/chat/ws/${channelId}`);
 
         ws.onopen = () => {
             console.log("Connected to chat");
@@ -128,6 +144,11 @@ export default function GlobalChat() {
 
         ws.onmessage = (event) => {
             const data = JSON.parse(event.data);
+            if (data.type === "error") {
+                // e.g. rate limited: the message was not sent
+                console.warn("Chat error:", data.detail);
+                return;
+            }
             setMessages((prev) => [...prev, data]);
             scrollToBottom("smooth"); // Smooth for new incoming messages
         };
@@ -135,6 +156,11 @@ export default function GlobalChat() {
         ws.onclose = () => {
             console.log("Disconnected");
             setIsConnected(false);
+            // Dropped rather than closed by us: reconnect with a fresh access cookie
+            if (socketRef.current !== ws) return;
+            setTimeout(() => refreshBeforeReconnect().then(() => {
+                if (socketRef.current === ws) connectWebSocket(channelId);
+            }), 2000);
         };
 
         socketRef.current = ws;
@@ -160,7 +186,7 @@ export default function GlobalChat() {
     // 5. Fetch Projects for Picker
     useEffect(() => {
         if (showProjectPicker && myProjects.length === 0) {
-            axios.get("http://localhost:8000/projects", { withCredentials: true })
+            api.get("/projects")
                 .then(res => {
                     const teamProjects = res.data.filter((p: any) => p.type === 'team');
                     setMyProjects(teamProjects);
@@ -211,7 +237,7 @@ export default function GlobalChat() {
 
     const handleJoinRequest = async (projectId: number) => {
         try {
-            await axios.post(`http://localhost:8000/projects/${projectId}/join`, {}, { withCredentials: true });
+            await api.post(`/projects/${projectId}/join`, {});
             toast.success("Join request sent!");
         } catch (error: any) {
             toast.error(error.response?.data?.detail || "Failed to send request");
@@ -284,6 +310,33 @@ export default function GlobalChat() {
         ));
     };
 
+    // Scrolling to the top pages further back (older history comes from the archive)
+    const loadOlder = async () => {
+        if (!activeChannel || !hasOlder || loadingOlderRef.current || messages.length === 0) return;
+        const container = chatContainerRef.current;
+        if (!container || container.scrollTop > 0) return;
+
+        loadingOlderRef.current = true;
+        const channelId = activeChannel.id;
+        try {
+            const res = await api.get(`/chat/channels/${channelId}/messages`, {
+                params: { before: messages[0].id, limit: HISTORY_PAGE_SIZE }
+            });
+            if (activeChannel.id !== channelId) return;
+            const previousHeight = container.scrollHeight;
+            setMessages((prev) => [...res.data, ...prev]);
+            setHasOlder(res.data.length === HISTORY_PAGE_SIZE);
+            // Keep the viewport on the message the user was reading
+            setTimeout(() => {
+                container.scrollTop = container.scrollHeight - previousHeight;
+            }, 0);
+        } catch (error) {
+            console.error("Failed to load older messages", error);
+        } finally {
+            loadingOlderRef.current = false;
+        }
+    };
+
     const scrollToBottom = (behavior: ScrollBehavior = "smooth") => {
         if (chatContainerRef.current) {
             chatContainerRef.current.scrollTo({
@@ -352,8 +405,10 @@ export default function GlobalChat() {
                                         }}
                                         className={`w-full text-left px-4 py-3 rounded-xl flex items-center gap-3 transition-all ${activeChannel?.id === channel.id ? 'bg-primary/20 text-primary font-bold' : 'hover:bg-white/5 text-foreground/70 hover:text-foreground'}`}
                                     >
-                                        <Hash className="w-4 h-4 opacity-50" />
-                                        {channel.name}
+                                        {channel.type === "project"
+                                            ? <Lock className="w-4 h-4 opacity-50" />
+                                            : <Hash className="w-4 h-4 opacity-50" />}
+                                        {channelLabel(channel)}
                                     </button>
                                 ))}
                             </div>
@@ -380,7 +435,7 @@ export default function GlobalChat() {
                         <div>
                             <h3 className="font-bold flex items-center gap-2 text-lg">
                                 <Hash className="w-5 h-5 text-foreground/40" />
-                                {activeChannel?.name || "Loading..."}
+                                {channelLabel(activeChannel) || "Loading..."}
                             </h3>
                             <p className="text-xs text-foreground/50">{activeChannel?.description}</p>
                         </div>
@@ -394,6 +449,7 @@ export default function GlobalChat() {
                 {/* Messages */}
                 <div
                     ref={chatContainerRef}
+                    onScroll={loadOlder}
                     className="flex-1 overflow-y-auto p-4 md:p-6 custom-scrollbar flex flex-col"
                 >
                     {messages.map((msg, i) => {
@@ -530,7 +586,7 @@ export default function GlobalChat() {
                             value={inputValue}
                             onChange={(e) => setInputValue(e.target.value)}
                             // onClick={() => setShowEmojiPicker(false)} // Remove this so it doesn't close when typing
-                            placeholder={`Message #${activeChannel?.name || "chat"}...`}
+                            placeholder={`Message #${channelLabel(activeChannel) || "chat"}...`}
                             className="flex-1 bg-transparent border-none focus:outline-none px-2 text-sm h-10"
                         />
                         <button
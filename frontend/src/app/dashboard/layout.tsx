@@ -4,7 +4,7 @@ import { useEffect, useState } from "react";
 import { useRouter } from "next/navigation";
 import { Sidebar } from "@/components/dashboard/Sidebar";
 import { Header } from "@/components/dashboard/Header";
-import axios from "axios";
+import { api } from "@/lib/api";
 import { toast } from "sonner";
 
 export default function DashboardLayout({
@@ -19,7 +19,7 @@ export default function DashboardLayout({
         const checkStatus = async () => {
             try {
                 // Check if user has completed onboarding
-                const { data } = await axios.get("http://localhost:8000/profile/me", { withCredentials: true });
+                const { data } = await api.get("/profile/me");
                 if (!data.is_onboarding_completed) {
                     toast.info("Please set up your profile first.");
                     router.push("/onboarding");
@@ -3,8 +3,8 @@
 import { useState, useRef, useEffect } from "react";
 import { motion, AnimatePresence } from "framer-motion";
 import { Send, Bot, User, Sparkles, Terminal, Code2, Cpu, Zap } from "lucide-react";
-import axios from "axios";
 import { toast } from "sonner";
+import { apiFetch } from "@/lib/api";
 
 interface Message {
     id: string;
@@ -24,6 +24,7 @@ export default function MentorPage() {
     ]);
     const [inputValue, setInputValue] = useState("");
     const [isLoading, setIsLoading] = useState(false);
+    const [conversationId, setConversationId] = useState<number | null>(null);
     const messagesEndRef = useRef<HTMLDivElement>(null);
 
     const sendMessage = async (e?: React.FormEvent) => {
@@ -42,18 +43,36 @@ export default function MentorPage() {
         setIsLoading(true);
 
         try {
-            const res = await axios.post("http://localhost:8000/ai/chat", {
-                message: userMsg.content
+            // History lives on the server; only the new message is sent
+            const res = await apiFetch("/ai/chat/stream", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ message: userMsg.content, conversation_id: conversationId })
             });
-
-            const botMsg: Message = {
-                id: (Date.now() + 1).toString(),
-                role: "assistant",
-                content: res.data.response,
-                timestamp: new Date()
-            };
-
-            setMessages(prev => [...prev, botMsg]);
+            if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+            const botId = (Date.now() + 1).toString();
+            setMessages(prev => [...prev, { id: botId, role: "assistant", content: "", timestamp: new Date() }]);
+
+            // Newline-delimited JSON: {conversation_id}, {delta}..., {done}
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split("\n");
+                buffer = lines.pop() ?? "";
+                for (const line of lines) {
+                    if (!line.trim()) continue;
+                    const event = JSON.parse(line);
+                    if (event.conversation_id) setConversationId(event.conversation_id);
+                    if (event.delta) {
+                        setMessages(prev => prev.map(m => m.id === botId ? { ...m, content: m.content + event.delta } : m));
+                    }
+                }
+            }
         } catch (error) {
             console.error("AI Chat failed", error);
             toast.error("Systems Offline. Unable to reach AI Core.");
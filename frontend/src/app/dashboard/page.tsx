@@ -16,7 +16,7 @@ import {
     CheckCircle2,
     ArrowRight
 } from "lucide-react";
-import axios from "axios";
+import { api } from "@/lib/api";
 import { toast } from "sonner";
 import Link from "next/link";
 import { DayZeroDashboard } from "@/components/dashboard/DayZeroDashboard";
@@ -30,7 +30,7 @@ export default function DashboardPage() {
     useEffect(() => {
         const fetchUser = async () => {
             try {
-                const { data } = await axios.get("http://localhost:8000/profile/me", { withCredentials: true });
+                const { data } = await api.get("/profile/me");
                 setUser(data);
             } catch (error) {
                 console.error("Failed to load dashboard data", error);
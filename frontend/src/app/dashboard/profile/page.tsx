@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react";
 import { Github, Globe, Linkedin, Mail, MapPin, Share2, Code, Database, Layout, Clock, User, Edit2 } from "lucide-react";
 import Image from "next/image";
-import axios from "axios";
+import { api } from "@/lib/api";
 import { toast } from "sonner";
 import Link from "next/link";
 
@@ -30,7 +30,7 @@ export default function ProfilePage() {
         const fetchProfile = async () => {
             try {
                 // Try fetching from backend
-                const response = await axios.get("http://localhost:8000/profile/me", { withCredentials: true });
+                const response = await api.get("/profile/me");
                 setProfile(response.data);
             } catch (error) {
                 console.error("Failed to fetch profile", error);
@@ -1,8 +1,8 @@
 "use client";
 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useParams, useRouter } from "next/navigation";
-import axios from "axios";
+import { api, refreshBeforeReconnect, WS_BASE_URL } from "@/lib/api";
 import { motion } from "framer-motion";
 import {
     ArrowLeft,
@@ -33,6 +33,8 @@ export default function ProjectDetailPage() {
     const [requests, setRequests] = useState<any[]>([]);
     const [isOwner, setIsOwner] = useState(false);
     const [loading, setLoading] = useState(true);
+    // Last task change-log position applied to `tasks`
+    const lastSeqRef = useRef<number | null>(null);
 
     useEffect(() => {
         if (projectId) {
@@ -50,12 +52,13 @@ export default function ProjectDetailPage() {
         setLoading(true);
         try {
             const [projRes, tasksRes, userRes] = await Promise.all([
-                axios.get(`http://localhost:8000/projects/${projectId}`, { withCredentials: true }),
-                axios.get(`http://localhost:8000/tasks/${projectId}`, { withCredentials: true }),
-                axios.get("http://localhost:8000/profile/me", { withCredentials: true })
+                api.get(`/projects/${projectId}`),
+                api.get(`/tasks/${projectId}`),
+                api.get("/profile/me")
             ]);
             setProject(projRes.data);
             setTasks(tasksRes.data);
+            lastSeqRef.current = Number(tasksRes.headers["x-task-seq"] ?? 0);
             setIsOwner(projRes.data.owner_id === userRes.data.id);
             setLoading(false); // Make sure to start loading false here so we don't block UI if squad data is fetched later
         } catch (error) {
@@ -65,13 +68,82 @@ export default function ProjectDetailPage() {
         }
     };
 
+    // Live board: apply task deltas pushed by the server instead of polling
+    useEffect(() => {
+        if (loading || !projectId) return;
+        let closed = false;
+        let ws: WebSocket | null = null;
+        let retry: ReturnType<typeof setTimeout>;
+        // Deltas that arrive while the list is being refetched
+        let pending: any[] | null = null;
+
+        const applyDelta = (prev: any[], delta: any) => {
+            let next = prev;
+            if (delta.op === "delete") {
+                next = prev.filter(t => t.id !== delta.task_id);
+            } else if (prev.some(t => t.id === delta.task_id)) {
+                next = prev.map(t => t.id === delta.task_id ? { ...t, ...delta.fields } : t);
+            } else if (delta.op === "create") {
+                next = [...prev, { id: delta.task_id, ...delta.fields }];
+            }
+            return "order" in delta.fields ? [...next].sort((a, b) => a.order - b.order) : next;
+        };
+
+        const resync = async (seq: number) => {
+            pending = [];
+            try {
+                const res = await api.get(`/tasks/${projectId}`);
+                const queued = (pending ?? []).filter(d => d.seq > seq);
+                setTasks(queued.reduce(applyDelta, res.data));
+                lastSeqRef.current = Math.max(seq, ...queued.map(d => d.seq));
+            } catch (error) {
+                console.error("Failed to refresh tasks", error);
+            } finally {
+                pending = null;
+            }
+        };
+
+        const connect = () => {
+            const since = lastSeqRef.current !== null ? `?since=${lastSeqRef.current}` : "";
+            ws = new WebSocket(`${WS_BASE_URL}/tasks/ws/${projectId}${since}`);
+
+            ws.onmessage = (event) => {
+                const data = JSON.parse(event.data);
+                if (data.type === "resync") {
+                    resync(data.seq);
+                } else if (data.type === "task") {
+                    if (pending) {
+                        pending.push(data);
+                    } else if (lastSeqRef.current === null || data.seq > lastSeqRef.current) {
+                        lastSeqRef.current = data.seq;
+                        setTasks(prev => applyDelta(prev, data));
+                    }
+                }
+            };
+
+            ws.onclose = () => {
+                // Reconnect (with a fresh access cookie) and replay from the last seq we applied
+                if (!closed) retry = setTimeout(() => refreshBeforeReconnect().then(() => {
+                    if (!closed) connect();
+                }), 2000);
+            };
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(retry);
+            ws?.close();
+        };
+    }, [loading, projectId]);
+
     const fetchSquadData = async () => {
         try {
-            const membersRes = await axios.get(`http://localhost:8000/projects/${projectId}/members`, { withCredentials: true });
+            const membersRes = await api.get(`/projects/${projectId}/members`);
             setMembers(membersRes.data);
 
             if (isOwner) {
-                const requestsRes = await axios.get(`http://localhost:8000/projects/${projectId}/requests`, { withCredentials: true });
+                const requestsRes = await api.get(`/projects/${projectId}/requests`);
                 setRequests(requestsRes.data);
             }
         } catch (error) {
@@ -81,7 +153,7 @@ export default function ProjectDetailPage() {
 
     const handleRequestAction = async (reqId: number, action: "accept" | "reject") => {
         try {
-            await axios.post(`http://localhost:8000/projects/${projectId}/requests/${reqId}/${action}`, {}, { withCredentials: true });
+            await api.post(`/projects/${projectId}/requests/${reqId}/${action}`, {});
             toast.success(`Request ${action}ed`);
             fetchSquadData(); // Refresh list
         } catch (error) {
@@ -92,7 +164,7 @@ export default function ProjectDetailPage() {
     const handleShareProject = async () => {
         try {
             // 1. Get Channels to find "projects" or general
-            const channelsRes = await axios.get("http://localhost:8000/chat/channels", { withCredentials: true });
+            const channelsRes = await api.get("/chat/channels");
             const channels = channelsRes.data;
             const projectChannel = channels.find((c: any) => c.name === "projects") || channels[0];
 
@@ -111,7 +183,7 @@ export default function ProjectDetailPage() {
             };
             const message = `[PROJECT_SHARE:${JSON.stringify(payload)}]`;
 
-            await axios.post(`http://localhost:8000/chat/channels/${projectChannel.id}/messages`, { content: message }, { withCredentials: true });
+            await api.post(`/chat/channels/${projectChannel.id}/messages`, { content: message });
 
             toast.success("Project announced in Global Chat! 🚀");
             router.push("/dashboard/community");
@@ -123,7 +195,7 @@ export default function ProjectDetailPage() {
 
     const handleJoinRequest = async () => {
         try {
-            await axios.post(`http://localhost:8000/projects/${projectId}/join`, {}, { withCredentials: true });
+            await api.post(`/projects/${projectId}/join`, {});
             toast.success("Join request sent! The owner will review it soon.");
             // Refresh logic could be better, but simple re-fetch works for basic state if we stored request status
             // For now, simple success message is enough. Ideally we'd update local state to show "Pending"
@@ -140,11 +212,22 @@ export default function ProjectDetailPage() {
         setTasks((prev: any[]) => prev.map(t => t.id === task.id ? { ...t, status: newStatus } : t));
 
         try {
-            await axios.patch(`http://localhost:8000/tasks/${task.id}`, { status: newStatus }, { withCredentials: true });
+            // Only applies if nobody changed the task since we loaded it
+            const res = await api.patch(`/tasks/${task.id}`, { status: newStatus }, {
+                headers: { "If-Match": `"${task.version}"` }
+            });
+            setTasks(prev => prev.map(t => t.id === task.id ? { ...t, ...res.data } : t));
             if (newStatus === "done") {
                 toast.success("Task completed! 🎉");
             }
-        } catch (error) {
+        } catch (error: any) {
+            if (error.response?.status === 409) {
+                // Show what the teammate changed instead of overwriting it
+                const current = error.response.data.detail.current;
+                setTasks(prev => prev.map(t => t.id === task.id ? { ...t, ...current } : t));
+                toast.error("This task was just updated by a teammate");
+                return;
+            }
             console.error("Failed to update task", error);
             toast.error("Failed to update task");
             // Revert on failure
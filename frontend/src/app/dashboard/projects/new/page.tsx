@@ -15,7 +15,7 @@ import {
     CheckCircle2
 } from "lucide-react";
 import Link from "next/link";
-import axios from "axios";
+import { api } from "@/lib/api";
 import { toast } from "sonner";
 
 export default function NewProjectPage() {
@@ -61,7 +61,7 @@ export default function NewProjectPage() {
         setIsSubmitting(true);
         try {
             // Format stack string if needed, currently API takes string
-            await axios.post("http://localhost:8000/projects", formData, { withCredentials: true });
+            await api.post("/projects", formData);
             toast.success("Project created successfully!");
             router.push("/dashboard/projects"); // Will redirect to Project Hub
         } catch (error) {
@@ -20,7 +20,7 @@ import {
 } from "lucide-react";
 import Link from "next/link";
 import { useRouter } from "next/navigation";
-import axios from "axios";
+import { api } from "@/lib/api";
 import { toast } from "sonner";
 
 export default function ProjectHub() {
@@ -52,9 +52,9 @@ export default function ProjectHub() {
         setLoading(true);
         try {
             const [myRes, commRes, userRes] = await Promise.all([
-                axios.get("http://localhost:8000/projects", { withCredentials: true }),
-                axios.get("http://localhost:8000/projects/community/all", { withCredentials: true }),
-                axios.get("http://localhost:8000/profile/me", { withCredentials: true })
+                api.get("/projects"),
+                api.get("/projects/community/all"),
+                api.get("/profile/me")
             ]);
             setMyProjects(myRes.data);
             setCommunityProjects(commRes.data);
@@ -70,7 +70,7 @@ export default function ProjectHub() {
         setSuggestionsLoading(true);
         try {
             // We can allow this to fail silently or show a small error state, but let's try-catch it
-            const response = await axios.get("http://localhost:8000/projects/suggestions", { withCredentials: true });
+            const response = await api.get("/projects/suggestions");
             if (response.data && response.data.length > 0) {
                 setSuggestedIdeas(response.data);
             } else {
@@ -96,7 +96,7 @@ export default function ProjectHub() {
     const refreshSuggestions = async () => {
         setSuggestionsLoading(true);
         try {
-            const response = await axios.post("http://localhost:8000/projects/suggestions/refresh", {}, { withCredentials: true });
+            const response = await api.post("/projects/suggestions/refresh", {});
             if (response.data && response.data.length > 0) {
                 setSuggestedIdeas(response.data);
             }
@@ -111,7 +111,7 @@ export default function ProjectHub() {
     const handleJoin = async (projectId: number) => {
         setJoiningId(projectId);
         try {
-            await axios.post(`http://localhost:8000/projects/${projectId}/join`, {}, { withCredentials: true });
+            await api.post(`/projects/${projectId}/join`, {});
             toast.success("Join request sent successfully!");
         } catch (error: any) {
             toast.error(error.response?.data?.detail || "Failed to join project");
@@ -127,10 +127,10 @@ export default function ProjectHub() {
         }
         setBrainstormStep("loading");
         try {
-            const response = await axios.post("http://localhost:8000/projects/brainstorm", {
+            const response = await api.post("/projects/brainstorm", {
                 stack: brainstormStack,
                 level: brainstormLevel
-            }, { withCredentials: true });
+            });
             setBrainstormIdeas(response.data);
             setBrainstormStep("results");
         } catch (error) {
@@ -213,7 +213,7 @@ export default function ProjectHub() {
                                     onClick={async () => {
                                         if (idea.id) {
                                             try {
-                                                await axios.delete(`http://localhost:8000/projects/suggestions/${idea.id}`, { withCredentials: true });
+                                                await api.delete(`/projects/suggestions/${idea.id}`);
                                             } catch (e) {
                                                 console.error("Failed to remove suggestion", e);
                                             }
@@ -3,7 +3,7 @@
 import { motion } from "framer-motion";
 import { Users, UserPlus, MessageSquare, Github, Calendar, CheckCircle2, MoreHorizontal, Loader2 } from "lucide-react";
 import { useEffect, useState } from "react";
-import axios from "axios";
+import { api } from "@/lib/api";
 import { useRouter } from "next/navigation";
 import { toast } from "sonner";
 import Link from 'next/link';
@@ -33,9 +33,7 @@ export default function TeamsPage() {
 
     const fetchTeams = async () => {
         try {
-            const response = await axios.get("http://localhost:8000/projects/teams/mine", {
-                withCredentials: true
-            });
+            const response = await api.get("/projects/teams/mine");
             setTeams(response.data);
         } catch (error) {
             console.error("Failed to fetch teams:", error);
@@ -21,7 +21,7 @@ import {
 } from "lucide-react";
 import { useOnboardingStore } from "@/store/useOnboardingStore";
 import { toast } from "sonner";
-import axios from "axios";
+import { api } from "@/lib/api";
 
 // --- Components ---
 
@@ -155,7 +155,7 @@ export default function OnboardingPage() {
     useEffect(() => {
         const fetchProfile = async () => {
             try {
-                const { data: user } = await axios.get("http://localhost:8000/profile/me", { withCredentials: true });
+                const { data: user } = await api.get("/profile/me");
 
                 // If user has already completed onboarding, this is an "Edit" session.
                 // We populate the form with their existing data.
@@ -201,10 +201,7 @@ export default function OnboardingPage() {
         setIsSubmitting(true);
         try {
             // Assuming existing backend at /api/profile/onboarding based on previous exploration
-            // Using axios for better error handling
-            await axios.put("http://localhost:8000/profile/onboarding", data, {
-                withCredentials: true // Important since we saw Cookie auth in backend
-            });
+            await api.put("/profile/onboarding", data);
 
             toast.success("Profile setup complete!");
             reset(); // Clear store
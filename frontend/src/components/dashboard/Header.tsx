@@ -1,12 +1,66 @@
 "use client";
 
+import { useEffect, useState } from "react";
 import { Bell, Search } from "lucide-react";
 import { usePathname } from "next/navigation";
+import { api, refreshBeforeReconnect, WS_BASE_URL } from "@/lib/api";
+import { toast } from "sonner";
+
+const NOTIFICATION_TEXT: Record<string, (n: any) => string> = {
+    join_request: n => `${n.data.username ?? "Someone"} wants to join ${n.data.project_title}`,
+    join_accepted: n => `You're in! Welcome to ${n.data.project_title}`,
+    join_rejected: n => `Your request to join ${n.data.project_title} was declined`,
+};
 
 export function Header() {
     const pathname = usePathname();
     const pageName = pathname?.split('/').pop() || 'Overview';
     const formattedTitle = pageName.charAt(0).toUpperCase() + pageName.slice(1).replace('-', ' ');
+    const [unread, setUnread] = useState(0);
+
+    // Unread count and new notifications are pushed; nothing here polls
+    useEffect(() => {
+        let closed = false;
+        let ws: WebSocket | null = null;
+        let retry: ReturnType<typeof setTimeout>;
+
+        const connect = () => {
+            ws = new WebSocket(`${WS_BASE_URL}/notifications/ws`);
+            ws.onmessage = (event) => {
+                const data = JSON.parse(event.data);
+                if (data.type === "unread") {
+                    setUnread(data.count);
+                } else if (data.type === "notification") {
+                    setUnread(data.unread);
+                    const text = NOTIFICATION_TEXT[data.kind];
+                    if (text) toast.info(text(data));
+                }
+            };
+            ws.onclose = () => {
+                // The access cookie may have expired while we were connected
+                if (!closed) retry = setTimeout(() => refreshBeforeReconnect().then(() => {
+                    if (!closed) connect();
+                }), 5000);
+            };
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(retry);
+            ws?.close();
+        };
+    }, []);
+
+    const markAllRead = async () => {
+        if (!unread) return;
+        try {
+            const { data } = await api.post("/notifications/read-all", {});
+            setUnread(data.unread);
+        } catch (error) {
+            console.error("Failed to mark notifications read", error);
+        }
+    };
 
     return (
         <header className="hidden md:flex h-16 items-center justify-between px-8 border-b border-white/5 bg-background/50 backdrop-blur-sm sticky top-0 z-30">
@@ -29,9 +83,13 @@ export function Header() {
                 </div>
 
                 {/* Notifications */}
-                <button className="relative p-2 rounded-full hover:bg-white/5 text-foreground/60 hover:text-foreground transition-colors">
+                <button onClick={markAllRead} className="relative p-2 rounded-full hover:bg-white/5 text-foreground/60 hover:text-foreground transition-colors">
                     <Bell className="w-5 h-5" />
-                    <span className="absolute top-2 right-2 w-2 h-2 bg-rose-500 rounded-full animate-pulse shadow-lg shadow-rose-500/50"></span>
+                    {unread > 0 && (
+                        <span className="absolute top-1 right-1 min-w-4 h-4 px-1 bg-rose-500 rounded-full text-[10px] font-bold leading-4 text-white shadow-lg shadow-rose-500/50">
+                            {unread > 99 ? "99+" : unread}
+                        </span>
+                    )}
                 </button>
             </div>
         </header>
@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react";
 import { motion, AnimatePresence } from "framer-motion";
 import { X, MapPin, Briefcase, Award, Globe, Github, Linkedin, Twitter } from "lucide-react";
-import axios from "axios";
+import { api } from "@/lib/api";
 import { toast } from "sonner";
 
 interface UserProfileModalProps {
@@ -41,7 +41,7 @@ export default function UserProfileModal({ userId, onClose }: UserProfileModalPr
     const fetchProfile = async (id: number) => {
         setLoading(true);
         try {
-            const res = await axios.get(`http://localhost:8000/profile/${id}`, { withCredentials: true });
+            const res = await api.get(`/profile/${id}`);
             setProfile(res.data);
         } catch (error) {
             console.error(error);
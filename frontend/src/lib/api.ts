@@ -1,6 +1,8 @@
 import axios from 'axios';
 
-const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+export const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+// WebSockets live on the same host
+export const WS_BASE_URL = API_BASE_URL.replace(/^http/, 'ws');
 
 export const api = axios.create({
     baseURL: API_BASE_URL,
@@ -10,14 +12,54 @@ export const api = axios.create({
     },
 });
 
+// Access tokens are short-lived: on a 401, refresh once (shared by all
+// concurrent requests) and replay the original request
+let refreshPromise: Promise<void> | null = null;
+
+export const refreshSession = () => {
+    if (!refreshPromise) {
+        refreshPromise = axios
+            .post(`${API_BASE_URL}/auth/refresh`, null, { withCredentials: true })
+            .then(() => undefined)
+            .finally(() => {
+                refreshPromise = null;
+            });
+    }
+    return refreshPromise;
+};
+
 // Response interceptor to handle errors globally
 api.interceptors.response.use(
     (response) => response,
-    (error) => {
-        if (error.response?.status === 401) {
-            // Potentially clear local auth state if backend says 401
-            // For now, let the component handle it
+    async (error) => {
+        const original = error.config;
+        const isAuthCall = original?.url?.startsWith('/auth/refresh') || original?.url?.startsWith('/auth/login');
+        if (error.response?.status === 401 && original && !original._retry && !isAuthCall) {
+            original._retry = true;
+            try {
+                await refreshSession();
+                return api(original);
+            } catch {
+                // Refresh failed: the session is over, let the component handle it
+            }
         }
         return Promise.reject(error);
     }
 );
+
+// For requests axios can't make (streamed responses): same refresh-and-retry-once rule
+export const apiFetch = async (path: string, init: RequestInit = {}) => {
+    const send = () => fetch(`${API_BASE_URL}${path}`, { ...init, credentials: 'include' });
+    const res = await send();
+    if (res.status !== 401) return res;
+    try {
+        await refreshSession();
+    } catch {
+        return res;
+    }
+    return send();
+};
+
+// WebSockets authenticate with the access cookie when they connect, so a
+// socket that dropped after the token expired needs a fresh one first
+export const refreshBeforeReconnect = () => refreshSession().catch(() => undefined);
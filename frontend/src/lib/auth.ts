@@ -40,10 +40,14 @@ export const useAuthStore = create<AuthState>()(
         isLoading: false
       }),
 
-      logout: () => set({
-        user: null,
-        isAuthenticated: false
-      }),
+      logout: () => {
+        // Revoke the session server-side and clear the auth cookies
+        api.post('/auth/logout').catch(() => {});
+        set({
+          user: null,
+          isAuthenticated: false
+        });
+      },
 
       setLoading: (loading) => set({ isLoading: loading }),
 